@@ -3,19 +3,47 @@ import random
 import json
 import csv
 import os
+import argparse
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from page_probes import ProbeSession
+from browser_startup import launch_chrome
+from resource_blocking import ResourceBlocker, enable_performance_logging
+from page_cache import PageCache, open_cached, remember_page
+from managed_driver import ManagedDriver, DriverStats, BrowserLost
+from rate_limit import AdaptiveRateLimiter
+from http_fetch import HttpFetcher
+from page_check import PageRejected, RetryQueue, OK
+from sitemap_discovery import index_outline, discover_links
+
+CCPA_BUTTON = (By.CSS_SELECTOR, ".ccpa-overlay-accept-btn")
+INDEX_URL = "https://emedicine.medscape.com/clinical_procedures"
+ARTICLE_URL_PATTERN = r"^https?://emedicine\.medscape\.com/article/\d+-overview$"
+probes = ProbeSession()
+blocker = ResourceBlocker("diseases")
+# Pages are read from here before the network; delete the directory to force a full refetch
+page_cache = PageCache()
+# Paces every page request per host from how the site is responding
+pacer = AdaptiveRateLimiter()
+# Articles that loaded a challenge, login or error page, tried again after a backoff
+rejected_articles = RetryQueue()
 
 # ---------- Utility functions ----------
 def random_delay(a=2, b=5):
     time.sleep(random.uniform(a, b))
 
 def accept_cookies_if_present(driver, wait):
+    if probes.is_done(driver, "consent"):
+        return
+    if not probes.lookup(driver, "cookies", CCPA_BUTTON, grace=probes.grace)["visible"]:
+        print("No cookie popup.")
+        return
     try:
-        cookie_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, ".ccpa-overlay-accept-btn")))
+        cookie_button = wait.until(EC.element_to_be_clickable(CCPA_BUTTON))
         cookie_button.click()
+        probes.mark_done(driver, "consent")
         print("Accepted cookies.")
         random_delay(2, 3)
     except:
@@ -61,13 +89,28 @@ def collect_procedure_links(driver, wait):
 
     return links_data
 
+# ---------- Or discover them from the sitemaps ----------
+def discover_article_links(driver, sitemaps):
+    """Same records as collect_procedure_links, from the sitemaps plus the index source (no Expand All)."""
+    try:
+        outline = index_outline(driver.page_source, INDEX_URL)
+        records = discover_links(sitemaps, ARTICLE_URL_PATTERN, outline, HttpFetcher.from_driver(driver), pacer,
+                                 include_unmapped=True)
+    except Exception as e:
+        print("Sitemap discovery failed:", e)
+        return []
+    for r in records:
+        print(f"[{r['category']}] {r['title']} - {r['link']}")
+    return [{"category": r["category"], "title": r["title"], "link": r["link"]} for r in records]
+
 # ---------- Scrape article ----------
 def scrape_article(driver, wait, url):
     article_data = {"content": "", "references": [], "images": []}
 
     try:
-        driver.get(url)
-        random_delay(3, 6)
+        from_cache, verdict = open_cached(driver, page_cache, url, pacer)
+        if verdict != OK:
+            raise PageRejected(url, verdict)
 
         # Collect text content
         paragraphs = driver.find_elements(By.CSS_SELECTOR, "div.article-section p")
@@ -81,6 +124,14 @@ def scrape_article(driver, wait, url):
         imgs = driver.find_elements(By.CSS_SELECTOR, "img")
         article_data["images"] = [img.get_attribute("src") for img in imgs if img.get_attribute("src")]
 
+        if not from_cache:
+            blocker.page_report(driver, url)
+            if article_data["content"]:
+                remember_page(driver, page_cache, url)
+
+    except PageRejected:
+        # Nothing to extract from a challenge or login page; the caller queues it for a retry
+        raise
     except Exception as e:
         print(f"Error scraping {url}: {e}")
 
@@ -109,30 +160,75 @@ def save_data(articles, json_file="procedures_data.json", csv_file="procedures_d
     print(f"Data saved to {json_file} and {csv_file}")
 
 # ---------- Main ----------
+def create_driver():
+    options = uc.ChromeOptions()
+    enable_performance_logging(options)
+    driver = launch_chrome(options)
+    blocker.attach(driver)
+    return driver
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape Medscape clinical procedure articles by category.")
+    parser.add_argument("--sitemap", action="append", metavar="URL_OR_FILE",
+                        help="discover articles from this sitemap (or sitemap index, .xml or .xml.gz; repeatable) "
+                             "instead of clicking Expand All")
+    return parser.parse_args()
+
 def main():
-    driver = uc.Chrome()
+    args = parse_args()
+    driver = create_driver()
     wait = WebDriverWait(driver, 20)
 
-    url = "https://emedicine.medscape.com/clinical_procedures"
-    driver.get(url)
+    pacer.get(driver, INDEX_URL)
 
     accept_cookies_if_present(driver, wait)
-    expand_all_categories(driver, wait)
 
-    links_data = collect_procedure_links(driver, wait)
+    links_data = []
+    if args.sitemap:
+        links_data = discover_article_links(driver, args.sitemap)
+        if not links_data:
+            print("No articles found through the sitemaps, expanding the categories instead.")
+    if not links_data:
+        expand_all_categories(driver, wait)
+        links_data = collect_procedure_links(driver, wait)
     print(f"Found {len(links_data)} articles.")
 
+    # Fresh browser every few hundred articles, or right away (with a retry) if it crashes
+    driver_stats = DriverStats()
+    managed = ManagedDriver(create_driver, driver=driver, stats=driver_stats)
     articles = []
-    for idx, item in enumerate(links_data, 1):
-        print(f"Scraping {idx}/{len(links_data)}: {item['title']}")
-        data = scrape_article(driver, wait, item["link"])
+
+    def scrape(item):
+        try:
+            data = managed.run(scrape_article, item["link"])
+        except PageRejected as e:
+            print(f"{item['title']} loaded a {e.verdict} page")
+            rejected_articles.push(item, e.verdict)
+            return
+        except BrowserLost as e:
+            print(f"Skipping {item['link']}: {e}")
+            return
         item.update(data)
         articles.append(item)
-        random_delay(4, 7)
+
+    for idx, item in enumerate(links_data, 1):
+        print(f"Scraping {idx}/{len(links_data)}: {item['title']}")
+        scrape(item)
+    # Rejected pages get another go once their backoff is up; rejected again means requeued
+    for item, attempts in rejected_articles.drain():
+        print(f"Retrying {item['title']} after {attempts} rejected load(s)")
+        scrape(item)
+    position = {item["link"]: i for i, item in enumerate(links_data)}
+    articles.sort(key=lambda item: position[item["link"]])
 
     save_data(articles)
+    blocker.summary()
+    pacer.summary()
+    rejected_articles.summary()
+    driver_stats.summary()
+    page_cache.summary()
 
-    driver.quit()
+    managed.quit()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,513 @@
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.action_chains import ActionChains
+import time
+import random
+import undetected_chromedriver as uc
+import traceback
+import threading
+import argparse
+import asyncio
+from functools import partial
+from async_crawl import AsyncCrawler, HttpBackend, collect
+from worker_pool import run_worker_pool
+from tab_prefetch import run_prefetched
+from managed_driver import ManagedDriver, DriverStats, DEFAULT_MAX_PAGES, DEFAULT_MAX_RSS_MB
+from driver_calls import skip_page_count
+from storage import JsonlWriter, finalize_outputs, read_jsonl
+from browser_startup import launch_chrome, BrowserLauncher
+from resource_blocking import ResourceBlocker, BLOCK_PROFILES, enable_performance_logging
+from http_fetch import HttpFetcher
+from rate_limit import AdaptiveRateLimiter
+from behavior_budget import BehaviorBudget
+from page_check import check_page, PageRejected, RetryQueue, OK
+from article_html import parse_article_html
+from page_cache import PageCache, remember_page, DEFAULT_CACHE_DIR, DEFAULT_TTL, DEFAULT_MAX_BYTES
+from incremental import load_previous, ValidatorStore, ChangeProbe, plan_incremental, keep_previous, print_report
+from page_probes import COOKIE_BUTTON
+
+
+class ArticleCrawl:
+    """Index page, article links, then one {"title", "link", <body_field>, "Images", "References"}
+    record per article: the crawl the Medscape article guides (anatomy, clinical procedures) share.
+
+    A guide script supplies what differs between guides: its `name` (output files
+    <name>_articles.*), the index URL, the record field holding the article text,
+    collect_links(driver, wait, args, pacer) for the index page, extract_article(driver, wait,
+    extraction, title) returning (content, images, references) from a loaded article, and
+    optionally add_arguments(parser) for options of its own. `probes` is the guide's
+    page_probes.ProbeSession. Pacing, behavior budget, rejected-page retries and resource
+    blocking are the crawl's own (self.pacer, self.behavior, self.retries, self.blocker).
+    """
+
+    def __init__(self, name, description, index_url, body_field, collect_links, extract_article, probes,
+                 strategies=None, add_arguments=None):
+        self.name = name
+        self.description = description
+        self.index_url = index_url
+        self.body_field = body_field
+        self.collect_links = collect_links
+        self.extract_article = extract_article
+        self.probes = probes
+        # Reported and saved at the end of the run when given (the guide's StrategyCache)
+        self.strategies = strategies
+        self.add_arguments = add_arguments
+        self.jsonl_file = f"{name}_articles.jsonl"
+        self.json_file = f"{name}_articles.json"
+        self.csv_file = f"{name}_articles.csv"
+        self.validators_file = f"{name}_articles.validators.json"
+        # Paces every page and HTTP request per host from how the site is responding
+        self.pacer = AdaptiveRateLimiter()
+        # Human-like scrolling only where it pays off (lazy content) plus a small random share of pages
+        self.behavior = BehaviorBudget()
+        # Articles that came back as a challenge, login or error page, retried after a backoff
+        self.retries = RetryQueue()
+        self.blocker = ResourceBlocker(name)
+        self._worker_state = threading.local()
+
+    def accept_cookies_if_present(self, driver, wait):
+        # Consent is remembered per browser, so after the first page this costs nothing
+        if self.probes.is_done(driver, "consent"):
+            return
+        if not self.probes.lookup(driver, "cookies", COOKIE_BUTTON, grace=self.probes.grace)["visible"]:
+            print("No cookie consent popup found or button not clickable.")
+            return
+        try:
+            accept_button = wait.until(EC.element_to_be_clickable(COOKIE_BUTTON))
+            accept_button.click()
+            self.probes.mark_done(driver, "consent")
+            print("Clicked on 'I Accept' cookie button.")
+            time.sleep(1)
+        except TimeoutException:
+            print("No cookie consent popup found or button not clickable.")
+
+    def remove_cookie_overlay(self, driver):
+        try:
+            overlay = driver.find_element(By.CSS_SELECTOR, ".onetrust-pc-dark-filter")
+            driver.execute_script("arguments[0].style.display = 'none';", overlay)
+            print("Removed cookie overlay.")
+        except Exception:
+            print("No cookie overlay found or could not remove.")
+
+    def simulate_human_behavior(self, driver):
+        """Scroll (and, for stealth, move the mouse) only on pages the behavior budget picks."""
+        reason = self.behavior.decide(driver)
+        if reason is None:
+            return
+        with self.behavior.spending():
+            try:
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                time.sleep(random.uniform(1, 3))
+                if reason != "lazy-load":
+                    action = ActionChains(driver)
+                    action.move_by_offset(random.randint(10, 100), random.randint(10, 100)).perform()
+                    time.sleep(random.uniform(0.5, 2))
+                print(f"Simulated human behavior ({reason})")
+            except Exception as e:
+                print(f"Error simulating human behavior: {e}")
+
+    def create_driver(self):
+        options = uc.ChromeOptions()
+        options.add_argument('--ignore-certificate-errors')
+        options.add_argument('--ignore-ssl-errors')
+        enable_performance_logging(options)
+        driver = launch_chrome(options)
+        driver.maximize_window()
+        self.blocker.attach(driver)
+        return driver
+
+    def open_index(self, driver, wait):
+        """Load the guide index and get past the cookie popup (also used to warm up pool workers)."""
+        self.pacer.get(driver, self.index_url)
+        self.accept_cookies_if_present(driver, wait)
+        self.simulate_human_behavior(driver)
+        self.blocker.page_report(driver, "index")
+
+    def return_to_index(self, driver, wait):
+        self.pacer.get(driver, self.index_url)
+        self.accept_cookies_if_present(driver, wait)
+        self.remove_cookie_overlay(driver)
+        self.simulate_human_behavior(driver)
+        self.blocker.page_report(driver, "index")
+
+    def _http_fetcher(self, driver):
+        """One pooled HTTP session per worker thread, seeded with that worker's browser cookies."""
+        fetcher = getattr(self._worker_state, "fetcher", None)
+        if fetcher is None:
+            fetcher = HttpFetcher.from_driver(driver)
+            self._worker_state.fetcher = fetcher
+        return fetcher
+
+    def article_from_html(self, item, page_html):
+        """Build the article record from page HTML (HTTP response or cache); None if the content is missing."""
+        parsed = parse_article_html(page_html, item["link"])
+        if not parsed["content"]:
+            return None
+        return {
+            "title": item["title"],
+            "link": item["link"],
+            self.body_field: parsed["content"],
+            "Images": parsed["images"],
+            "References": parsed["references"]
+        }
+
+    def scrape_article_http(self, driver, item, cache=None):
+        """Fetch and parse an article without the browser; None means "use the browser instead"."""
+        title = item["title"]
+        link = item["link"]
+        result = self.pacer.fetch(self._http_fetcher(driver), link)
+        if result is None:
+            return None
+        if result.blocked:
+            print(f"HTTP fetch of {title} got a challenge or status {result.status}, falling back to browser.")
+            return None
+        article_data = self.article_from_html(item, result.html)
+        if article_data is None:
+            print(f"HTTP fetch of {title} is missing content, falling back to browser.")
+            return None
+        if cache is not None:
+            cache.put(link, result.html, result.status, result.headers)
+        print(f"Extracted {self.body_field}, Images, and References for {title} over HTTP in {result.elapsed:.2f}s")
+        return article_data
+
+    def fetch_concurrently(self, driver, links_data, writer, concurrency, cache=None):
+        """Fetch and parse articles over HTTP with up to `concurrency` requests in flight.
+
+        Records that parse are written; returns the items left for the browser (challenged,
+        missing content, network errors, or already in the page cache) in their original order.
+        """
+        fetcher = HttpFetcher.from_driver(driver, pool_size=concurrency)
+        order = {item["link"]: i for i, item in enumerate(links_data)}
+        left, to_fetch, saved = [], [], []
+        for item in links_data:
+            (left if cache is not None and cache.contains(item["link"]) else to_fetch).append(item)
+
+        def parse(item, result):
+            if result is None or result.blocked:
+                return None
+            article_data = self.article_from_html(item, result.html)
+            if article_data is not None and cache is not None:
+                cache.put(item["link"], result.html, result.status, result.headers)
+            return article_data
+
+        def on_result(item, article_data, error):
+            if error is not None:
+                print(f"HTTP fetch of {item['title']} failed: {error}")
+            if article_data is None:
+                left.append(item)
+                return
+            writer.write(article_data)
+            saved.append(item)
+            print(f"Saved data for {item['title']} over HTTP")
+
+        # Every request is paced by self.pacer, so the crawler itself only bounds concurrency
+        crawler = AsyncCrawler(HttpBackend(fetcher, parse, self.pacer), concurrency=concurrency,
+                               per_host=concurrency, rate=None, jitter=0)
+        asyncio.run(collect(crawler, to_fetch, on_result))
+        fetcher.close()
+        print(f"Fetched {len(saved)} of {len(to_fetch)} articles over HTTP; {len(left)} left for the browser")
+        left.sort(key=lambda item: order[item["link"]])
+        return left
+
+    def scrape_article(self, driver, wait, item, extraction="js", fetch="http", cache=None, loaded=False):
+        """Open one article and return its record."""
+        # Where the record came from, so callers don't count cache hits as page visits
+        self._worker_state.last_source = "cache"
+        # loaded=True: the current tab already shows the article (tab prefetch), so go straight to extraction
+        if cache is not None and not loaded:
+            cached = cache.get(item["link"])
+            if cached is not None:
+                article_data = self.article_from_html(item, cached.html)
+                if article_data is not None:
+                    print(f"Loaded {item['title']} from the page cache")
+                    skip_page_count()
+                    return article_data
+
+        self._worker_state.last_source = "network"
+        if fetch == "http" and not loaded:
+            article_data = self.scrape_article_http(driver, item, cache)
+            if article_data is not None:
+                return article_data
+
+        title = item["title"]
+        link = item["link"]
+        # Challenge, login and error pages are caught here instead of timing out in the extractors
+        verdict = check_page(driver) if loaded else self.pacer.get(driver, link)
+        if verdict != OK:
+            raise PageRejected(link, verdict)
+        # One probe for every optional element on the page; the extractors reuse its answers
+        self.probes.scan(driver)
+        self.accept_cookies_if_present(driver, wait)
+        self.remove_cookie_overlay(driver)
+        self.simulate_human_behavior(driver)
+
+        content, images, references = self.extract_article(driver, wait, extraction, title)
+        article_data = {
+            "title": title,
+            "link": link,
+            self.body_field: content,
+            "Images": images,
+            "References": references  # list of {"citation": ..., "urls": [...]}
+        }
+
+        print(f"Extracted {self.body_field}, Images, and References for {title}")
+        self.blocker.page_report(driver, title)
+        # Page source after Show All, so a cached copy holds every section
+        remember_page(driver, cache, link)
+        if fetch == "http":
+            # The browser may have just passed a challenge; let the HTTP session reuse its cookies
+            self._http_fetcher(driver).load_browser_cookies(driver)
+        return article_data
+
+    def process_article(self, driver, wait, item, warmup_every=0, **scrape_options):
+        """Worker-pool task: scrape one article; revisit the index every `warmup_every` articles (0 = never)."""
+        try:
+            article_data = self.scrape_article(driver, wait, item, **scrape_options)
+        except PageRejected as e:
+            # Dropped from this pass; the main thread retries it after the pool is done
+            self.retries.push(item, e.verdict)
+            return None
+        if self._worker_state.last_source == "cache":
+            return article_data
+        # Each worker thread counts its own articles
+        self._worker_state.articles = getattr(self._worker_state, "articles", 0) + 1
+        if warmup_every and self._worker_state.articles % warmup_every == 0:
+            self.return_to_index(driver, wait)
+        return article_data
+
+    def crawl_sequential(self, managed, links_data, writer, warmup_every=0, **scrape_options):
+        for idx, item in enumerate(links_data):
+            title = item["title"]
+            link = item["link"]
+            print(f"Processing article {idx+1}/{len(links_data)}: {title}")
+            try:
+                # A crashed browser is restarted and the article retried on the new one
+                article_data = managed.run(self.scrape_article, item, **scrape_options)
+                writer.write(article_data)
+
+                print(f"Saved data for {title}")
+                if self._worker_state.last_source == "cache":
+                    continue
+                # Go straight to the next article; only revisit the index as a referer warm-up
+                if warmup_every and (idx + 1) % warmup_every == 0:
+                    managed.run(self.return_to_index)
+            except PageRejected as e:
+                self.retries.push(item, e.verdict)
+            except Exception as e:
+                print(f"Error processing {link}: {e}")
+                print(f"Stack trace: {traceback.format_exc()}")
+                continue
+
+    def crawl_pipelined(self, managed, links_data, writer, depth, **scrape_options):
+        """Sequential crawl that keeps the next `depth` articles loading in background tabs.
+
+        Cached articles are written first; everything else goes through the browser (the HTTP
+        path would not use the prefetched tabs). A browser that dies mid-pipeline is restarted
+        and the remaining articles re-queued on it (see tab_prefetch.run_prefetched).
+        """
+        cache = scrape_options.get("cache")
+        to_load = []
+        for item in links_data:
+            if cache is None or not cache.contains(item["link"]):
+                to_load.append(item)
+                continue
+            try:
+                # An entry can expire or be evicted between contains() and the read, which then loads the page
+                writer.write(managed.run(self.scrape_article, item, **scrape_options))
+                print(f"Saved data for {item['title']}")
+            except PageRejected as e:
+                self.retries.push(item, e.verdict)
+            except Exception as e:
+                print(f"Error processing {item['link']}: {e}")
+                print(f"Stack trace: {traceback.format_exc()}")
+
+        position = {item["link"]: idx for idx, item in enumerate(to_load, 1)}
+
+        def process(driver, wait, item):
+            print(f"Processing article {position[item['link']]}/{len(to_load)}: {item['title']}")
+            try:
+                article_data = self.scrape_article(driver, wait, item, loaded=True, **scrape_options)
+                writer.write(article_data)
+                print(f"Saved data for {item['title']}")
+            except PageRejected as e:
+                self.retries.push(item, e.verdict)
+            except Exception as e:
+                print(f"Error processing {item['link']}: {e}")
+                print(f"Stack trace: {traceback.format_exc()}")
+
+        run_prefetched(managed, to_load, process, depth, prepare=partial(self.blocker.attach, quiet=True),
+                       pacer=self.pacer)
+
+    def retry_rejected(self, managed, writer, **scrape_options):
+        """Give every rejected article another go once its backoff is up; rejected again means requeued."""
+        for item, attempts in self.retries.drain():
+            print(f"Retrying {item['title']} after {attempts} rejected load(s)")
+            try:
+                writer.write(managed.run(self.scrape_article, item, **scrape_options))
+                print(f"Saved data for {item['title']}")
+            except PageRejected as e:
+                self.retries.push(item, e.verdict)
+            except Exception as e:
+                print(f"Error processing {item['link']}: {e}")
+                print(f"Stack trace: {traceback.format_exc()}")
+
+    def parse_args(self):
+        parser = argparse.ArgumentParser(description=self.description)
+        parser.add_argument("--workers", type=int, default=1,
+                            help="number of independent browser instances scraping articles in parallel")
+        parser.add_argument("--extraction", choices=["js", "dom", "compare"], default="js",
+                            help="js: one batched script per article; dom: per-element WebDriver calls; "
+                                 "compare: run both and print timings")
+        parser.add_argument("--fetch", choices=["http", "browser"], default="http",
+                            help="http: try a pooled HTTP client with the browser's cookies first and fall back to "
+                                 "the browser on challenges or missing content; browser: always use the browser")
+        parser.add_argument("--http-concurrency", type=int, default=1, metavar="N",
+                            help="with --fetch http, fetch up to N articles over HTTP at once before the browser "
+                                 "crawl, which then only handles what HTTP couldn't (1 = one at a time in the crawl)")
+        parser.add_argument("--warmup-every", type=int, default=0, metavar="K",
+                            help="revisit the index page every K articles (0 = never, 1 = after every article)")
+        parser.add_argument("--prefetch", type=int, default=0, metavar="K",
+                            help="single browser: load the next K articles in background tabs while the current one "
+                                 "is extracted (articles not in the page cache go through the browser)")
+        parser.add_argument("--keep-warm", type=int, default=0, metavar="N",
+                            help="keep N browsers launching in the background so pool workers start without waiting "
+                                 "for Chrome")
+        parser.add_argument("--recycle-after", type=int, default=DEFAULT_MAX_PAGES, metavar="N",
+                            help="replace each browser with a fresh one after N pages (0 = never)")
+        parser.add_argument("--max-browser-mb", type=int, default=DEFAULT_MAX_RSS_MB,
+                            help="replace a browser once Chrome's memory passes this many MB (0 = no limit)")
+        parser.add_argument("--min-delay", type=float, default=self.pacer.min_delay,
+                            help="shortest interval between requests to one host once the site responds well (seconds)")
+        parser.add_argument("--min-jitter", type=float, default=self.pacer.min_jitter,
+                            help="random extra pause of min-jitter to 2x min-jitter seconds added to every request")
+        parser.add_argument("--behavior-share", type=float, default=self.behavior.share,
+                            help="fraction of pages that get the scroll-and-mouse routine (pages with lazy images "
+                                 "always do)")
+        parser.add_argument("--behavior-interval", type=float, default=self.behavior.min_interval,
+                            help="minimum seconds between two optional scroll-and-mouse routines")
+        parser.add_argument("--behavior-max-seconds", type=float, default=self.behavior.max_seconds,
+                            help="stop optional human-like interaction once this many seconds were spent on it "
+                                 "(0 = no cap)")
+        parser.add_argument("--block-profile", choices=sorted(BLOCK_PROFILES), default=None,
+                            help=f"resources blocked through CDP (default: {self.blocker.profile})")
+        parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                            help="directory of the on-disk page cache consulted before any network fetch")
+        parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL / 3600,
+                            help="hours a cached page stays valid")
+        parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                            help="size budget of the page cache; least recently used pages are evicted beyond it")
+        parser.add_argument("--no-cache", action="store_true", help="always fetch pages from the network")
+        parser.add_argument("--incremental", action="store_true",
+                            help=f"reuse unchanged records from the previous {self.json_file} and only re-extract "
+                                 "new or changed articles (checked with conditional requests / content hashes)")
+        parser.add_argument("--no-finalize", action="store_true",
+                            help=f"only stream records to {self.jsonl_file}; skip building {self.json_file} and "
+                                 f"{self.csv_file}")
+        parser.add_argument("--finalize-only", action="store_true",
+                            help=f"rebuild {self.json_file} and {self.csv_file} from an existing {self.jsonl_file} "
+                                 "and exit")
+        if self.add_arguments:
+            self.add_arguments(parser)
+        return parser.parse_args()
+
+    def finalize(self):
+        finalize_outputs(self.jsonl_file, self.json_file, self.csv_file, self.body_field)
+
+    def main(self):
+        args = self.parse_args()
+        if args.finalize_only:
+            self.finalize()
+            return
+
+        if args.block_profile:
+            self.blocker.set_profile(args.block_profile)
+        self.pacer.min_delay = args.min_delay
+        self.pacer.min_jitter = args.min_jitter
+        self.behavior.share = args.behavior_share
+        self.behavior.min_interval = args.behavior_interval
+        self.behavior.max_seconds = args.behavior_max_seconds
+        launcher = BrowserLauncher(self.create_driver, keep_warm=args.keep_warm)
+        driver_stats = DriverStats()
+        driver = launcher.get()
+        wait = WebDriverWait(driver, 20)
+        self.open_index(driver, wait)
+
+        links_data = self.collect_links(driver, wait, args, self.pacer)
+        print(f"Found {len(links_data)} articles.")
+
+        cache = None
+        if not args.no_cache:
+            cache = PageCache(args.cache_dir, ttl=args.cache_ttl * 3600, max_bytes=args.cache_max_mb * 1024 ** 2)
+        scrape_options = {"extraction": args.extraction, "fetch": args.fetch, "cache": cache}
+
+        # Must be read before the JSONL writer truncates the previous stream
+        report = None
+        if args.incremental:
+            previous = load_previous(self.json_file, self.jsonl_file)
+            validators = ValidatorStore(self.validators_file)
+            probe = ChangeProbe(HttpFetcher.from_driver(driver), self.body_field, cache, self.pacer)
+            links_to_scrape, reused, report = plan_incremental(links_data, previous, probe, validators)
+            print_report(report)
+
+        # One line per article is appended as it is scraped; the pretty JSON/CSV are built once at the end
+        writer = JsonlWriter(self.jsonl_file)
+        if report is not None:
+            for record in reused:
+                writer.write(record)
+            links_data = links_to_scrape
+
+        if args.fetch == "http" and args.http_concurrency > 1:
+            links_data = self.fetch_concurrently(driver, links_data, writer, args.http_concurrency, cache)
+
+        if args.workers > 1:
+            # The index browser is only needed for link collection; each worker gets its own
+            driver.quit()
+
+            def collect(idx, item, article_data):
+                writer.write(article_data)
+                print(f"Saved data for {item['title']} ({writer.count}/{len(links_data)})")
+
+            process = partial(self.process_article, warmup_every=args.warmup_every, **scrape_options)
+            run_worker_pool(links_data, launcher.get, process, collect, workers=args.workers, setup=self.open_index,
+                            max_pages=args.recycle_after, max_rss_mb=args.max_browser_mb, stats=driver_stats)
+        else:
+            managed = ManagedDriver(launcher.get, setup=self.open_index, driver=driver, max_pages=args.recycle_after,
+                                    max_rss_mb=args.max_browser_mb, stats=driver_stats)
+            if args.prefetch:
+                self.crawl_pipelined(managed, links_data, writer, args.prefetch, **scrape_options)
+            else:
+                self.crawl_sequential(managed, links_data, writer, args.warmup_every, **scrape_options)
+            managed.quit()
+
+        if len(self.retries):
+            managed = ManagedDriver(launcher.get, setup=self.open_index, max_pages=args.recycle_after,
+                                    max_rss_mb=args.max_browser_mb, stats=driver_stats)
+            self.retry_rejected(managed, writer, **scrape_options)
+            managed.quit()
+
+        if report is not None:
+            # Validators only for what this run wrote; a failed re-extraction keeps the old record
+            written = {record["link"] for record in read_jsonl(self.jsonl_file) if record}
+            kept = keep_previous(links_to_scrape, previous, written, writer, report)
+            validators.commit(written)
+            validators.save(written | kept)
+
+        writer.close()
+        launcher.close()
+        print("Finished processing all articles.")
+        self.blocker.summary()
+        self.pacer.summary()
+        self.behavior.summary()
+        self.retries.summary()
+        driver_stats.summary()
+        if self.strategies is not None:
+            self.strategies.report()
+            self.strategies.save()
+        if report is not None:
+            print_report(report)
+        if cache is not None:
+            cache.summary()
+        if not args.no_finalize:
+            self.finalize()
@@ -0,0 +1,297 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import time
+import random
+import json
+from page_probes import SHOW_ALL_LINK, REFERENCES_LAYER, REFERENCES_LINK
+from article_html import CONTENT_XPATH
+
+CONTENT_CLASS = "refsection_content"
+IMAGES_SELECTOR = "div.inlineImage img"
+TOOLTIP_LINK_SELECTOR = "a.tooltip_link"
+TOOLTIP_REFS_SELECTOR = "div.tooltip p"
+
+# Text and link URLs of every citation paragraph matching arguments[0] under arguments[1]
+# (or the whole document). Text is only read from rendered nodes, like WebElement.text.
+CITATIONS_JS = r"""
+var selector = arguments[0];
+var root = arguments[1] || document;
+function visibleText(el) {
+    if (!el.getClientRects().length) { return ""; }
+    return (el.innerText || "").trim();
+}
+var out = [];
+root.querySelectorAll(selector).forEach(function (p) {
+    var urls = [];
+    p.querySelectorAll("a").forEach(function (a) {
+        var href = a.href || a.getAttribute("href");
+        if (href) { urls.push(href); }
+    });
+    out.push({citation: visibleText(p), urls: urls});
+});
+return out;
+"""
+
+# Collects everything extract_content, extract_images and _extract_inline_references_tooltips
+# read, in a single WebDriver round trip. Text is only taken from rendered elements, matching
+# what WebElement.text returns for hidden nodes (an empty string). Selectors come in as
+# arguments: content class, content XPath, image selector, tooltip link and tooltip paragraphs.
+ARTICLE_EXTRACTION_JS = r"""
+var contentClass = arguments[0], xpath = arguments[1], imageSelector = arguments[2],
+    tooltipLinkSelector = arguments[3], tooltipRefsSelector = arguments[4];
+function visibleText(el) {
+    if (!el.getClientRects().length) { return ""; }
+    return (el.innerText || "").trim();
+}
+var text = [];
+document.querySelectorAll("." + contentClass).forEach(function (div) {
+    var snap = document.evaluate(xpath, div, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var i = 0; i < snap.snapshotLength; i++) {
+        var t = visibleText(snap.snapshotItem(i));
+        if (t) { text.push(t); }
+    }
+});
+var images = [];
+document.querySelectorAll(imageSelector).forEach(function (img) {
+    images.push(img.src || img.getAttribute("src") || "");
+});
+var tooltips = [];
+document.querySelectorAll(tooltipLinkSelector).forEach(function (a) {
+    a.querySelectorAll(tooltipRefsSelector).forEach(function (p) {
+        var urls = [];
+        p.querySelectorAll("a").forEach(function (link) {
+            var href = link.href || link.getAttribute("href");
+            if (href) { urls.push(href); }
+        });
+        tooltips.push({citation: visibleText(p), urls: urls});
+    });
+});
+return JSON.stringify({text: text, images: images, tooltips: tooltips});
+"""
+
+
+def _dedup_preserve(seq):
+    seen = set()
+    out = []
+    for x in seq:
+        if x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+
+def _normalize_images(sources):
+    image_links = []
+    for src in sources:
+        if src and src.startswith("//"):
+            src = "https:" + src
+        if src:
+            image_links.append(src)
+    return _dedup_preserve(image_links)
+
+
+class ArticleExtractor:
+    """Content, images and references of a loaded Medscape article guide page.
+
+    The anatomy and clinical procedure guides share one page template, so a guide script only
+    supplies its `label` (used in messages), its page_probes.ProbeSession and its StrategyCache;
+    the selectors default to the template's and can be overridden per guide.
+    extract_article is the extract_article callback article_crawl.ArticleCrawl expects.
+    """
+
+    def __init__(self, label, probes, strategies, content_class=CONTENT_CLASS, content_xpath=CONTENT_XPATH,
+                 images_selector=IMAGES_SELECTOR, tooltip_link_selector=TOOLTIP_LINK_SELECTOR,
+                 tooltip_refs_selector=TOOLTIP_REFS_SELECTOR):
+        self.label = label
+        self.probes = probes
+        self.strategies = strategies
+        self.content_class = content_class
+        self.content_xpath = content_xpath
+        self.images_selector = images_selector
+        self.tooltip_link_selector = tooltip_link_selector
+        self.tooltip_refs_selector = tooltip_refs_selector
+
+    def click_show_all(self, driver, wait):
+        """Click "Show All" if present so every section is in the DOM"""
+        if not self.probes.lookup(driver, "show_all", SHOW_ALL_LINK)["visible"]:
+            print("'Show All' not found, continuing...")
+            return False
+        try:
+            show_all_link = wait.until(EC.element_to_be_clickable(SHOW_ALL_LINK))
+            driver.execute_script("arguments[0].click();", show_all_link)
+            time.sleep(random.uniform(2, 4))
+            return True
+        except TimeoutException:
+            print("'Show All' not found, continuing...")
+            return False
+
+    def expand_sections(self, driver, wait):
+        """Click "Show All", or skip it when the probe shows the page has none; recent pages decide which is tried first."""
+        self.strategies.run("show_all", [
+            ("click", lambda: self.click_show_all(driver, wait)),
+            ("no-show-all", lambda: not self.probes.lookup(driver, "show_all", SHOW_ALL_LINK)["visible"]),
+        ])
+
+    def extract_content(self, driver, wait, show_all=True):
+        try:
+            if show_all:
+                self.expand_sections(driver, wait)
+
+            all_text = []
+            content_divs = driver.find_elements(By.CLASS_NAME, self.content_class)
+            for div in content_divs:
+                for element in div.find_elements(By.XPATH, self.content_xpath):
+                    text = element.text.strip()
+                    if text:
+                        all_text.append(text)
+            return "\n".join(all_text) if all_text else ""
+        except Exception as e:
+            print(f"Error extracting {self.label} content: {e}")
+            return ""
+
+    def extract_images(self, driver):
+        """Collect inline image URLs, normalize protocol, and de-duplicate."""
+        try:
+            images = driver.find_elements(By.CSS_SELECTOR, self.images_selector)
+            return _normalize_images(img.get_attribute("src") for img in images)
+        except Exception as e:
+            print(f"Error extracting images: {e}")
+            return []
+
+    def _read_citations(self, driver, selector, root=None):
+        """Collect {"citation", "urls"} for every matching paragraph in a single execute_script."""
+        refs = []
+        for item in driver.execute_script(CITATIONS_JS, selector, root):
+            citation = item["citation"].strip()
+            if citation:
+                refs.append({"citation": citation, "urls": _dedup_preserve(item["urls"])})
+        return refs
+
+    def _extract_references_from_modal(self, driver, wait):
+        """Open the References modal and scrape all <p> citations + any links inside them."""
+        refs = []
+        # Without the layer or a link that opens it there is nothing to wait 20 s for
+        if not (self.probes.lookup(driver, "references_layer", REFERENCES_LAYER)["present"]
+                or self.probes.lookup(driver, "references_link", REFERENCES_LINK)["present"]):
+            print("References modal not found or not visible.")
+            return refs
+        try:
+            # Try clicking the References link if present
+            try:
+                ref_link = driver.find_element(
+                    By.XPATH,
+                    "//a[contains(@href, \"showModal('references-layer')\") or normalize-space()='References']"
+                )
+                driver.execute_script("arguments[0].click();", ref_link)
+            except Exception:
+                # Fall back to executing the page function directly
+                try:
+                    driver.execute_script("if (typeof showModal === 'function') { showModal('references-layer'); }")
+                except Exception:
+                    pass
+
+            # Wait for the modal to be visible
+            modal = wait.until(EC.visibility_of_element_located((By.ID, "references-layer")))
+
+            # Grab every paragraph in the modal (each is a citation block) in one script call
+            refs = self._read_citations(driver, "p", modal)
+
+        except TimeoutException:
+            print("References modal not found or not visible.")
+        except Exception as e:
+            print(f"Error extracting references from modal: {e}")
+        finally:
+            # Try to close/hide the modal to keep the DOM clean
+            try:
+                driver.execute_script(
+                    "if (typeof hideModal === 'function') { hideModal('references-layer'); }"
+                    "else { var m = document.getElementById('references-layer'); if (m) { m.style.display='none'; } }"
+                )
+            except Exception:
+                pass
+        return refs
+
+    def _extract_inline_references_tooltips(self, driver):
+        """Fallback: scrape hidden tooltip citations embedded in the article body (if any)."""
+        refs = []
+        try:
+            refs = self._read_citations(driver, f"{self.tooltip_link_selector} {self.tooltip_refs_selector}")
+        except Exception as e:
+            print(f"Error extracting inline tooltip references: {e}")
+        return refs
+
+    def extract_references(self, driver, wait, tooltip_refs=None):
+        """Modal-based refs, else inline tooltip refs; recent pages only decide which is probed first."""
+        if tooltip_refs is None:
+            read_tooltips = lambda: self._extract_inline_references_tooltips(driver)
+        else:
+            # Already collected by the batched extraction script
+            read_tooltips = lambda: tooltip_refs
+        refs = self.strategies.run("references", [
+            ("modal", lambda: self._extract_references_from_modal(driver, wait)),
+            ("tooltips", read_tooltips),
+        ])
+        return refs or []
+
+    def extract_article_batched(self, driver, wait, show_all=True):
+        """Batched variant of the content/images/tooltip extractors: one execute_script per article.
+
+        Returns {"content", "images", "tooltip_references"} shaped exactly like the per-element functions.
+        """
+        if show_all:
+            self.expand_sections(driver, wait)
+        payload = json.loads(driver.execute_script(
+            ARTICLE_EXTRACTION_JS, self.content_class, self.content_xpath, self.images_selector,
+            self.tooltip_link_selector, self.tooltip_refs_selector,
+        ))
+
+        all_text = [t.strip() for t in payload["text"] if t.strip()]
+        tooltip_refs = []
+        for ref in payload["tooltips"]:
+            citation = ref["citation"].strip()
+            if citation:
+                tooltip_refs.append({"citation": citation, "urls": _dedup_preserve(ref["urls"])})
+
+        return {
+            "content": "\n".join(all_text) if all_text else "",
+            "images": _normalize_images(payload["images"]),
+            "tooltip_references": tooltip_refs
+        }
+
+    def extract_article(self, driver, wait, extraction="js", title=""):
+        """Return (content, images, references) using the per-element ("dom") or batched ("js") path.
+
+        "compare" runs both, prints their timings and whether they agree, and keeps the DOM result.
+        """
+        if extraction == "dom":
+            content = self.extract_content(driver, wait)
+            images = self.extract_images(driver)
+            return content, images, self.extract_references(driver, wait)
+
+        if extraction == "compare":
+            self.expand_sections(driver, wait)
+            start = time.perf_counter()
+            content = self.extract_content(driver, wait, show_all=False)
+            images = self.extract_images(driver)
+            tooltip_refs = self._extract_inline_references_tooltips(driver)
+            dom_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            batched = self.extract_article_batched(driver, wait, show_all=False)
+            js_seconds = time.perf_counter() - start
+
+            mismatches = [name for name, dom_value, js_value in (
+                ("content", content, batched["content"]),
+                ("images", images, batched["images"]),
+                ("tooltip references", tooltip_refs, batched["tooltip_references"]),
+            ) if dom_value != js_value]
+            print(f"Extraction timings for {title}: dom {dom_seconds:.2f}s, js {js_seconds:.2f}s "
+                  f"({'match' if not mismatches else 'MISMATCH in ' + ', '.join(mismatches)})")
+        else:
+            batched = self.extract_article_batched(driver, wait)
+            content = batched["content"]
+            images = batched["images"]
+            tooltip_refs = batched["tooltip_references"]
+
+        return content, images, self.extract_references(driver, wait, tooltip_refs)
@@ -0,0 +1,119 @@
+import re
+from urllib.parse import urljoin
+from lxml import html as lxml_html
+
+# Same selectors as the browser extractors in article_extraction.py (which reads CONTENT_XPATH from here)
+CONTENT_XPATH = (
+    ".//*[self::p or self::h2 or self::ul or self::li or self::h3]"
+    "[not(contains(@class, 'AdUnit') or contains(@id, 'ads-pos-'))]"
+)
+CONTENT_DIVS_XPATH = "//*[contains(concat(' ', normalize-space(@class), ' '), ' refsection_content ')]"
+IMAGES_XPATH = "//div[contains(concat(' ', normalize-space(@class), ' '), ' inlineImage ')]//img"
+MODAL_REFS_XPATH = "//*[@id='references-layer']//p"
+TOOLTIP_REFS_XPATH = (
+    "//a[contains(concat(' ', normalize-space(@class), ' '), ' tooltip_link ')]"
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' tooltip ')]//p"
+)
+
+BLOCK_TAGS = {"p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "br", "tr", "table", "section"}
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+_HIDDEN_STYLE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.I)
+
+
+def _dedup_preserve(seq):
+    seen = set()
+    out = []
+    for x in seq:
+        if x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+
+def _is_hidden(el):
+    return bool(_HIDDEN_STYLE.search(el.get("style", ""))) or el.get("hidden") is not None
+
+
+def _rendered_text(el):
+    """Approximate WebElement.text for a parsed node: block children start new lines,
+    runs of whitespace collapse, inline-hidden subtrees are dropped."""
+    parts = []
+
+    def walk(node):
+        if not isinstance(node.tag, str) or node.tag in SKIP_TAGS or _is_hidden(node):
+            return
+        block = node.tag in BLOCK_TAGS
+        if block:
+            parts.append("\n")
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if block:
+            parts.append("\n")
+
+    walk(el)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _has_hidden_ancestor(el):
+    node = el
+    while node is not None:
+        if isinstance(node.tag, str) and _is_hidden(node):
+            return True
+        node = node.getparent()
+    return False
+
+
+def _citations(nodes, base_url, skip_hidden=True):
+    refs = []
+    for p in nodes:
+        if skip_hidden and _has_hidden_ancestor(p):
+            continue
+        citation = _rendered_text(p).strip()
+        if not citation:
+            continue
+        urls = [urljoin(base_url, a.get("href")) for a in p.iter("a") if a.get("href")]
+        refs.append({"citation": citation, "urls": _dedup_preserve(urls)})
+    return refs
+
+
+def parse_article_html(page_html, base_url):
+    """Parse a saved/fetched article page into {"content", "images", "references"}.
+
+    Mirrors the browser extractors: content is the joined text of the refsection_content
+    blocks, images are de-duplicated inline image URLs, references come from the References
+    layer when the page ships it and from inline tooltips otherwise.
+    """
+    tree = lxml_html.fromstring(page_html)
+
+    all_text = []
+    for div in tree.xpath(CONTENT_DIVS_XPATH):
+        for element in div.xpath(CONTENT_XPATH):
+            if _has_hidden_ancestor(element):
+                continue
+            text = _rendered_text(element).strip()
+            if text:
+                all_text.append(text)
+
+    image_links = []
+    for img in tree.xpath(IMAGES_XPATH):
+        src = img.get("src")
+        if src and src.startswith("//"):
+            src = "https:" + src
+        if src:
+            image_links.append(urljoin(base_url, src))
+
+    # The modal is hidden until opened, so its paragraphs are read regardless of visibility
+    references = _citations(tree.xpath(MODAL_REFS_XPATH), base_url, skip_hidden=False)
+    if not references:
+        references = _citations(tree.xpath(TOOLTIP_REFS_XPATH), base_url)
+
+    return {
+        "content": "\n".join(all_text) if all_text else "",
+        "images": _dedup_preserve(image_links),
+        "references": references,
+    }
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+
+class AsyncRateLimiter:
+    """Token bucket for coroutines: at most `rate` acquisitions per second, bursts up to `burst`.
+
+    `jitter` adds a random extra delay (in seconds) to every acquisition so requests don't
+    leave on an exact cadence.
+    """
+
+    def __init__(self, rate, burst=1, jitter=0.0):
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        if self.jitter:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+
+
+class AsyncCrawler:
+    """Runs backend.fetch(item) for a list of link records with bounded concurrency.
+
+    Limits are global (`concurrency`), per host (`per_host`) and by rate per host (`rate`
+    requests/second). Pass rate=None when the backend paces its own requests, so two
+    limiters don't stack. Results are yielded as (item, result, error) in completion order.
+    Any object with an `async fetch(item)` method can be the backend.
+    """
+
+    def __init__(self, backend, concurrency=4, per_host=2, rate=0.5, jitter=1.0):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.jitter = jitter
+        self._host_slots = {}
+        self._host_limiters = {}
+
+    def _host(self, item):
+        return urlsplit(item["link"]).netloc
+
+    def _slots(self, host):
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+            self._host_limiters[host] = AsyncRateLimiter(self.rate, jitter=self.jitter) if self.rate else None
+        return self._host_slots[host], self._host_limiters[host]
+
+    async def crawl(self, items):
+        queue = asyncio.Queue()
+        pending = list(items)
+        global_slots = asyncio.Semaphore(self.concurrency)
+
+        async def run(item):
+            host_slots, limiter = self._slots(self._host(item))
+            try:
+                async with host_slots, global_slots:
+                    if limiter is not None:
+                        await limiter.acquire()
+                    result = await self.backend.fetch(item)
+                await queue.put((item, result, None))
+            except Exception as e:
+                await queue.put((item, None, e))
+
+        tasks = [asyncio.create_task(run(item)) for item in pending]
+        try:
+            for _ in range(len(tasks)):
+                yield await queue.get()
+        finally:
+            for t in tasks:
+                t.cancel()
+
+
+class HttpBackend:
+    """Fetches through an http_fetch.HttpFetcher in worker threads; `parse(item, result)` shapes the output.
+
+    With a rate_limit.AdaptiveRateLimiter as `pacer` every request goes through it (run the
+    crawler with rate=None then).
+    """
+
+    def __init__(self, fetcher, parse=None, pacer=None):
+        self.fetcher = fetcher
+        self.parse = parse
+        self.pacer = pacer
+
+    async def fetch(self, item):
+        if self.pacer is not None:
+            result = await asyncio.to_thread(self.pacer.fetch, self.fetcher, item["link"])
+        else:
+            result = await asyncio.to_thread(self.fetcher.fetch, item["link"])
+        if self.parse:
+            return self.parse(item, result)
+        return result
+
+
+class BrowserBackend:
+    """Hands each item to a free browser slot and runs `scrape(driver, item)` in a thread.
+
+    A WebDriver session only drives one tab at a time, so each slot is its own driver;
+    the scheduler decides how many of them are busy at once.
+    """
+
+    def __init__(self, drivers, scrape):
+        self.drivers = list(drivers)
+        self.scrape = scrape
+        self._free = None
+
+    async def fetch(self, item):
+        if self._free is None:
+            self._free = asyncio.Queue()
+            for driver in self.drivers:
+                self._free.put_nowait(driver)
+        driver = await self._free.get()
+        try:
+            return await asyncio.to_thread(self.scrape, driver, item)
+        finally:
+            self._free.put_nowait(driver)
+
+
+async def collect(crawler, items, on_result):
+    """Drive a crawl to completion, passing every (item, result, error) to on_result."""
+    async for item, result, error in crawler.crawl(items):
+        on_result(item, result, error)
@@ -0,0 +1,78 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Placeholder images (data-src without the real src yet) that only get it once a scroll brings
+# them into view. Native loading="lazy" images already carry their src, readable without
+# loading, and with images blocked nothing ever finishes loading, so neither says anything
+# about content behind a scroll.
+LAZY_PENDING_JS = r"""
+var pending = 0;
+var imgs = document.querySelectorAll("img[data-src], img[data-lazy-src]");
+for (var i = 0; i < imgs.length; i++) {
+    var lazySrc = imgs[i].getAttribute("data-src") || imgs[i].getAttribute("data-lazy-src");
+    // No src yet, or a placeholder (blank gif, data: URI) that the real one replaces on scroll
+    if (lazySrc && imgs[i].getAttribute("src") !== lazySrc) { pending++; }
+}
+return pending;
+"""
+
+
+class BehaviorBudget:
+    """Decides on which pages human-like interaction is worth its time, and accounts for it.
+
+    decide() returns why a page should get the scroll/mouse routine, or None to skip it:
+    "required" when the caller needs it, "lazy-load" when the page still has lazy images
+    waiting for a scroll, otherwise "budget" on a random `share` of pages, at most once per
+    `min_interval` seconds and until `max_seconds` of stealth time is spent (0 = no cap).
+    """
+
+    def __init__(self, share=0.15, min_interval=30.0, max_seconds=0):
+        self.share = share
+        self.min_interval = min_interval
+        self.max_seconds = max_seconds
+        self._last = None
+        self._lock = threading.Lock()
+        self.stats = {"pages": 0, "required": 0, "lazy-load": 0, "budget": 0, "seconds": 0.0}
+
+    def lazy_content_pending(self, driver):
+        try:
+            return bool(driver.execute_script(LAZY_PENDING_JS))
+        except Exception:
+            return False
+
+    def decide(self, driver=None, required=False):
+        reason = None
+        if required:
+            reason = "required"
+        elif driver is not None and self.lazy_content_pending(driver):
+            reason = "lazy-load"
+        with self._lock:
+            self.stats["pages"] += 1
+            if reason is None:
+                now = time.monotonic()
+                over_budget = self.max_seconds and self.stats["seconds"] >= self.max_seconds
+                too_soon = self._last is not None and now - self._last < self.min_interval
+                if not over_budget and not too_soon and random.random() < self.share:
+                    reason = "budget"
+            if reason is not None:
+                self.stats[reason] += 1
+                self._last = time.monotonic()
+        return reason
+
+    @contextmanager
+    def spending(self):
+        """Count the time spent inside the block as stealth time."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stats["seconds"] += time.perf_counter() - start
+
+    def summary(self):
+        s = self.stats
+        acted = s["required"] + s["lazy-load"] + s["budget"]
+        print(f"Stealth behavior: {acted}/{s['pages']} pages ({s['lazy-load']} for lazy loading, "
+              f"{s['budget']} from the budget, {s['required']} required), {s['seconds']:.0f}s spent")
@@ -0,0 +1,159 @@
+import glob
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import undetected_chromedriver as uc
+from undetected_chromedriver.patcher import Patcher
+
+DRIVER_CACHE_DIR = ".driver_cache"
+
+_VERSION = re.compile(r"(\d+)\.\d+\.\d+\.\d+")
+_resolve_lock = threading.Lock()
+# uc.Chrome starts the driver service and Chrome itself; one launch at a time keeps it predictable
+_launch_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def detect_chrome_major():
+    """Major version of the installed Chrome, or None when it can't be found."""
+    chrome = uc.find_chrome_executable()
+    if not chrome:
+        return None
+    try:
+        out = subprocess.run([chrome, "--version"], capture_output=True, text=True, timeout=10).stdout
+        match = _VERSION.search(out)
+        if match:
+            return int(match.group(1))
+    except (OSError, subprocess.SubprocessError):
+        pass
+    # chrome.exe --version prints nothing on Windows; the install folder has a version-named directory
+    for path in glob.glob(os.path.join(os.path.dirname(chrome), "*")):
+        match = _VERSION.fullmatch(os.path.basename(path))
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def resolve_driver(version_main=None):
+    """Path of a patched chromedriver for the installed Chrome, downloaded and patched only once.
+
+    Drivers live in DRIVER_CACHE_DIR/<major version>/, so later launches (and runs without
+    network access) reuse the binary instead of fetching and re-patching it every time.
+    Returns (driver_path, major_version).
+    """
+    major = version_main or detect_chrome_major()
+    exe_name = "chromedriver.exe" if os.name == "nt" else "chromedriver"
+    with _resolve_lock:
+        if major:
+            cached = os.path.abspath(os.path.join(DRIVER_CACHE_DIR, str(major), exe_name))
+            if os.path.exists(cached) and Patcher(executable_path=cached).is_binary_patched():
+                return cached, major
+
+        print(f"⬇️ Preparing chromedriver for Chrome {major or '(latest)'}...")
+        patcher = Patcher(version_main=major or 0)
+        patcher.auto()
+        major = int(patcher.version_main)
+        cached = os.path.abspath(os.path.join(DRIVER_CACHE_DIR, str(major), exe_name))
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = cached + ".tmp"
+        shutil.copy2(patcher.executable_path, tmp)
+        os.replace(tmp, cached)
+        return cached, major
+
+
+def launch_chrome(options, version_main=None, **kwargs):
+    """uc.Chrome with the cached, already patched driver; falls back to uc's own download."""
+    start = time.perf_counter()
+    driver_path = None
+    try:
+        driver_path, version_main = resolve_driver(version_main)
+    except Exception as e:
+        print(f"⚠️ No cached chromedriver ({e}), letting undetected_chromedriver fetch one.")
+    with _launch_lock:
+        driver = uc.Chrome(options=options, driver_executable_path=driver_path, version_main=version_main, **kwargs)
+    print(f"🚀 Browser ready in {time.perf_counter() - start:.1f}s")
+    return driver
+
+
+def _alive(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+class BrowserLauncher:
+    """Hands out browsers from `factory`, keeping `keep_warm` spares launching in the background.
+
+    With a spare ready, get() costs no launch time, which matters for restarted workers and
+    short runs. Spares that died while waiting are replaced. Call close() to quit the unused ones.
+    """
+
+    def __init__(self, factory, keep_warm=0):
+        self.factory = factory
+        self.keep_warm = keep_warm
+        self._spares = deque()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1) if keep_warm else None
+        self.stats = {"launched": 0, "warm": 0}
+
+    def _launch(self):
+        driver = self.factory()
+        with self._lock:
+            self.stats["launched"] += 1
+        return driver
+
+    def _refill(self):
+        if not self._executor:
+            return
+        with self._lock:
+            while len(self._spares) < self.keep_warm:
+                self._spares.append(self._executor.submit(self._launch))
+
+    def get(self):
+        spare = None
+        with self._lock:
+            if self._spares:
+                spare = self._spares.popleft()
+        driver = None
+        if spare is not None:
+            try:
+                driver = spare.result()
+            except Exception as e:
+                print(f"⚠️ Spare browser failed to start: {e}")
+            if driver is not None and not _alive(driver):
+                _quit(driver)
+                driver = None
+            if driver is not None:
+                with self._lock:
+                    self.stats["warm"] += 1
+        if driver is None:
+            driver = self._launch()
+        self._refill()
+        return driver
+
+    def close(self):
+        if not self._executor:
+            return
+        with self._lock:
+            spares, self._spares = list(self._spares), deque()
+        for spare in spares:
+            try:
+                _quit(spare.result())
+            except Exception:
+                pass
+        self._executor.shutdown(wait=False)
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
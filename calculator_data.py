@@ -0,0 +1,203 @@
+import base64
+import json
+import re
+
+# Client-side apps keep their initial data in one of these globals (or an inline JSON script)
+STATE_GLOBALS = ("__NEXT_DATA__", "__INITIAL_STATE__", "__PRELOADED_STATE__", "__APOLLO_STATE__", "__NUXT__")
+
+PAGE_STATE_JS = r"""
+var found = [];
+document.querySelectorAll('script[type="application/json"]').forEach(function (s) {
+    found.push(s.textContent);
+});
+arguments[0].forEach(function (name) {
+    try { if (window[name]) { found.push(JSON.stringify(window[name])); } } catch (e) {}
+});
+return found;
+"""
+
+_JSON_SCRIPT = re.compile(r"<script\b[^>]*type=[\"']application/json[\"'][^>]*>(.*?)</script\s*>", re.I | re.S)
+_STATE_ASSIGNMENT = re.compile(r"window\.(?:%s)\s*=\s*" % "|".join(STATE_GLOBALS))
+_TAG = re.compile(r"<[^>]+>")
+
+TEXT_KEYS = ("question", "questionText", "text", "label", "title", "name", "prompt")
+OPTION_KEYS = ("options", "answers", "choices", "responses", "values", "items")
+SCORE_KEYS = ("points", "score", "value", "weight")
+INPUT_KEYS = ("unit", "units", "inputType", "min", "max")
+
+
+def _clean(text):
+    return " ".join(_TAG.sub(" ", text).split())
+
+
+def _text_of(d):
+    for key in TEXT_KEYS:
+        if isinstance(d.get(key), str) and d[key].strip():
+            return _clean(d[key])
+    return None
+
+
+def _options_of(d):
+    for key in OPTION_KEYS:
+        value = d.get(key)
+        if isinstance(value, list) and value and all(isinstance(o, (dict, str)) for o in value):
+            return value
+    return None
+
+
+def _is_question(d):
+    return isinstance(d, dict) and _text_of(d) is not None and (
+        _options_of(d) is not None or any(key in d for key in INPUT_KEYS))
+
+
+def _normalize_option(option):
+    if isinstance(option, str):
+        return {"label": _clean(option)}
+    normalized = {"label": _text_of(option) or ""}
+    for key in SCORE_KEYS:
+        if isinstance(option.get(key), (int, float)) and not isinstance(option.get(key), bool):
+            normalized["points"] = option[key]
+            break
+    return normalized
+
+
+def normalize_question(d):
+    """{"question", "type", "unit", "options": [{"label", "points"}], "data"}; "data" is the app's own
+    definition, so scoring rules the fields above don't cover are kept too."""
+    question = {"question": _text_of(d)}
+    kind = d.get("type") or d.get("inputType")
+    if isinstance(kind, str):
+        question["type"] = kind
+    unit = d.get("unit") or d.get("units")
+    if unit:
+        question["unit"] = unit
+    options = _options_of(d)
+    if options is not None:
+        question["options"] = [_normalize_option(o) for o in options]
+    question["data"] = d
+    return question
+
+
+def find_questions(data):
+    """The largest list in a JSON document that reads as question definitions, normalized; None if none does."""
+    best = None
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+            hits = [d for d in node if _is_question(d)]
+            # Mostly question-shaped, and either a multiple choice entry or several numeric inputs
+            if hits and len(hits) >= 0.8 * len(node) and (len(hits) > 1 or _options_of(hits[0])):
+                if best is None or len(hits) > len(best):
+                    best = hits
+    return [normalize_question(d) for d in best] if best else None
+
+
+def _parse_all(texts):
+    for text in texts:
+        try:
+            yield json.loads(text)
+        except (TypeError, ValueError):
+            continue
+
+
+def _best(documents):
+    best = None
+    for doc in documents:
+        questions = find_questions(doc)
+        if questions and (best is None or len(questions) > len(best)):
+            best = questions
+    return best
+
+
+def state_from_html(html):
+    """JSON documents embedded in a page's HTML: application/json scripts and window.__STATE__ = {...}."""
+    texts = [m.group(1) for m in _JSON_SCRIPT.finditer(html)]
+    docs = list(_parse_all(texts))
+    decoder = json.JSONDecoder()
+    for m in _STATE_ASSIGNMENT.finditer(html):
+        try:
+            docs.append(decoder.raw_decode(html, m.end())[0])
+        except ValueError:
+            continue
+    return docs
+
+
+class CalculatorDataCapture:
+    """Reads calculator question definitions from the data the app renders them from.
+
+    The page state (inline JSON and well-known state globals) is tried first, then the JSON
+    responses the page fetched, taken from the CDP performance log. One script call or a few
+    CDP calls per calculator replace a WebDriver call per rendered question, and options and
+    scoring come along, which the rendered list doesn't show.
+    """
+
+    def __init__(self):
+        self.stats = {"state": 0, "network": 0, "html": 0, "missing": 0}
+
+    def from_html(self, html):
+        questions = _best(state_from_html(html))
+        if questions:
+            self.stats["html"] += 1
+        return questions
+
+    def from_cached(self, page):
+        """Questions of a page_cache.CachedPage: the ones stored with it when it was cached (data
+        fetched over the network isn't in the HTML), else what the HTML's page state holds."""
+        questions = page.meta.get("extracted", {}).get("questions")
+        if questions:
+            self.stats["html"] += 1
+            return questions
+        return self.from_html(page.html)
+
+    def _from_network(self, driver, entries):
+        json_requests = []
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            if message.get("method") != "Network.responseReceived":
+                continue
+            params = message.get("params", {})
+            if "json" in params.get("response", {}).get("mimeType", ""):
+                json_requests.append(params["requestId"])
+        bodies = []
+        for request_id in json_requests:
+            try:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except Exception:
+                # Evicted, or the request was not finished
+                continue
+            text = body.get("body", "")
+            bodies.append(base64.b64decode(text).decode("utf-8", "replace") if body.get("base64Encoded") else text)
+        return _best(_parse_all(bodies))
+
+    def from_browser(self, driver):
+        """(questions or None, performance log entries read on the way).
+
+        The entries are handed back so the caller can still pass them to
+        ResourceBlocker.page_report; reading the log drains it.
+        """
+        try:
+            questions = _best(_parse_all(driver.execute_script(PAGE_STATE_JS, list(STATE_GLOBALS)) or []))
+        except Exception:
+            questions = None
+        if questions:
+            self.stats["state"] += 1
+            return questions, None
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            entries = []
+        questions = self._from_network(driver, entries)
+        self.stats["network" if questions else "missing"] += 1
+        return questions, entries
+
+    def summary(self):
+        s = self.stats
+        print(f"Calculator data: {s['state']} from page state, {s['network']} from network responses, "
+              f"{s['html']} from cached pages, {s['missing']} not found (rendered list used)")
@@ -0,0 +1,19 @@
+import threading
+
+# State of the ManagedDriver.run call in progress on this thread. Kept free of selenium so
+# modules like page_cache can flag a cache hit without importing the browser stack.
+_call_state = threading.local()
+
+
+def skip_page_count():
+    """Call from inside a ManagedDriver.run task that loaded nothing from the site (a cache hit),
+    so it doesn't count toward recycling the browser."""
+    _call_state.skip = True
+
+
+def start_call():
+    _call_state.skip = False
+
+
+def page_count_skipped():
+    return getattr(_call_state, "skip", False)
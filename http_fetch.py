@@ -0,0 +1,112 @@
+import re
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Anti-bot interstitials are recognised by their structure: a challenge title, or the
+# challenge form/widget itself. Loose words are not enough; Cloudflare injects its
+# /cdn-cgi/challenge-platform/ script into ordinary pages and "Access Denied" can be article text.
+CHALLENGE_TITLES = ("just a moment", "attention required", "access denied", "pardon our interruption",
+                    "are you a robot", "security check", "verify you are human", "please verify you are a human",
+                    "request unsuccessful")
+CHALLENGE_ELEMENTS = re.compile(
+    r"""<[a-z]+\b[^>]*\b(?:id|class)\s*=\s*["'][^"']*\b(?:challenge-form|challenge-stage|challenge-running|"""
+    r"""cf-challenge-running|cf-browser-verification|px-captcha)\b"""
+    r"""|<iframe\b[^>]*\bsrc\s*=\s*["'][^"']*(?:captcha-delivery\.com|_Incapsula_Resource)""",
+    re.I,
+)
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+
+
+def page_title(html):
+    match = _TITLE.search(html)
+    return " ".join(match.group(1).split()) if match else ""
+
+
+def is_challenge_title(title):
+    return " ".join(title.split()).lower().startswith(CHALLENGE_TITLES)
+
+
+def is_challenge(html):
+    """True when an HTML document (its first 20 KB are enough) is an anti-bot interstitial."""
+    head = html[:20000]
+    return is_challenge_title(page_title(head)) or CHALLENGE_ELEMENTS.search(head) is not None
+
+
+class FetchResult:
+    def __init__(self, url, status, html, elapsed, headers=None):
+        self.url = url
+        self.status = status
+        self.html = html
+        self.elapsed = elapsed
+        self.headers = headers or {}
+
+    @property
+    def blocked(self):
+        """True for error statuses and challenge pages that the browser has to handle."""
+        if self.status != 200:
+            return True
+        return is_challenge(self.html)
+
+
+class HttpFetcher:
+    """Pooled keep-alive HTTP client that borrows the browser's cookies and user agent.
+
+    Server-rendered pages can be fetched in tens of milliseconds this way; callers fall back
+    to the browser when a result is blocked or the parsed page is missing content.
+    """
+
+    def __init__(self, pool_size=10, timeout=15, user_agent=None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        self.stats = {"fetched": 0, "blocked": 0, "errors": 0}
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        try:
+            user_agent = driver.execute_script("return navigator.userAgent;")
+        except Exception:
+            user_agent = None
+        fetcher = cls(user_agent=user_agent, **kwargs)
+        fetcher.load_browser_cookies(driver)
+        return fetcher
+
+    def load_browser_cookies(self, driver):
+        """Copy the cookies of the browser's current domain into the HTTP session."""
+        try:
+            cookies = driver.get_cookies()
+        except Exception as e:
+            print(f"Could not read browser cookies: {e}")
+            return 0
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+        return len(cookies)
+
+    def fetch(self, url, headers=None):
+        """GET a page; returns a FetchResult, or None on a network error."""
+        start = time.perf_counter()
+        try:
+            resp = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.stats["errors"] += 1
+            print(f"HTTP fetch failed for {url}: {e}")
+            return None
+        result = FetchResult(resp.url, resp.status_code, resp.text, time.perf_counter() - start, resp.headers)
+        self.stats["fetched"] += 1
+        if result.blocked:
+            self.stats["blocked"] += 1
+        return result
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+from article_html import parse_article_html
+from storage import read_jsonl
+
+
+def content_hash(text):
+    """Hash of the article text with whitespace collapsed, so text parsed from HTML and text read
+    from the browser hash alike when only their line breaks and spacing differ."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def load_previous(json_path, jsonl_path=None):
+    """Records of the last run keyed by link, from the finalized JSON or the JSONL stream, whichever is newer."""
+    records = []
+    use_jsonl = jsonl_path and os.path.exists(jsonl_path) and (
+        not os.path.exists(json_path) or os.path.getmtime(jsonl_path) > os.path.getmtime(json_path)
+    )
+    if use_jsonl:
+        records = list(read_jsonl(jsonl_path))
+    elif os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    return {r["link"]: r for r in records if r.get("link")}
+
+
+class ValidatorStore:
+    """ETag / Last-Modified / content hash per article link, kept next to the output file.
+
+    Validators of an article that is about to be re-extracted are staged and only replace the
+    stored ones once its new record has been written (commit), so a failed re-extraction is
+    detected as changed again on the next run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        self.staged = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def get(self, link):
+        return self.data.get(link, {})
+
+    def set(self, link, validators):
+        self.data[link] = validators
+
+    def stage(self, link, validators):
+        self.staged[link] = validators
+
+    def commit(self, links):
+        """Store the staged validators of the articles in `links`; the rest are dropped."""
+        for link, validators in self.staged.items():
+            if link in links:
+                self.data[link] = validators
+        self.staged = {}
+
+    def save(self, links=None):
+        """Write the store, keeping only `links` when given so removed articles drop out."""
+        data = self.data if links is None else {k: v for k, v in self.data.items() if k in links}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+class ChangeProbe:
+    """Decides whether an article changed since the last run with one cheap HTTP request.
+
+    A conditional GET (If-None-Match / If-Modified-Since) answers directly when the server
+    supports it (304 = unchanged). Otherwise the article text is parsed from the response and
+    its hash compared with the stored one, or with the hash of the previous record's text.
+    Anything that can't be decided (challenge page, network error) counts as changed.
+    With a page cache the fetched page is stored, so re-extraction doesn't fetch it again.
+    Requests go through `pacer` (a rate_limit.AdaptiveRateLimiter) when one is given.
+    """
+
+    def __init__(self, fetcher, body_field, cache=None, pacer=None):
+        self.fetcher = fetcher
+        self.body_field = body_field
+        self.cache = cache
+        self.pacer = pacer
+
+    def check(self, link, validators, previous=None):
+        """Returns (status, new_validators) with status "unchanged", "changed", "unknown" or
+        "seeded": no stored hash yet and the previous record's text (read from the browser)
+        differs from the parsed page, which says more about the two extractions than the article."""
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        if self.pacer is not None:
+            result = self.pacer.fetch(self.fetcher, link, headers=headers)
+        else:
+            result = self.fetcher.fetch(link, headers=headers)
+        if result is None:
+            return "unknown", validators
+        if result.status == 304:
+            return "unchanged", validators
+        if result.blocked:
+            return "unknown", validators
+        if self.cache is not None:
+            # A changed article is then re-extracted from this response instead of a second fetch
+            self.cache.put(link, result.html, result.status, result.headers)
+
+        new_validators = {
+            "etag": result.headers.get("ETag"),
+            "last_modified": result.headers.get("Last-Modified"),
+            "content_hash": content_hash(parse_article_html(result.html, link)["content"]),
+        }
+        baseline = validators.get("content_hash")
+        if baseline is None and previous is not None:
+            if content_hash(previous.get(self.body_field, "")) == new_validators["content_hash"]:
+                return "unchanged", new_validators
+            # From now on parsed text is compared with parsed text
+            return "seeded", new_validators
+        if baseline is not None and baseline == new_validators["content_hash"]:
+            return "unchanged", new_validators
+        return "changed", new_validators
+
+
+def plan_incremental(links_data, previous, probe, validator_store):
+    """Split the current link list into articles to reuse and articles to (re-)extract.
+
+    Returns (to_scrape, reused_records, report) where report counts new, changed,
+    unchanged, seeded (see ChangeProbe.check) and removed articles. Validators of the articles
+    to scrape are only staged in `validator_store`.
+    """
+    report = {"new": 0, "changed": 0, "unchanged": 0, "seeded": 0, "removed": 0}
+    to_scrape = []
+    reused = []
+    for idx, item in enumerate(links_data):
+        link = item["link"]
+        old = previous.get(link)
+        status, validators = probe.check(link, validator_store.get(link), old)
+        if old is not None and status in ("unchanged", "seeded"):
+            report[status] += 1
+            reused.append(old)
+            validator_store.set(link, validators)
+        else:
+            report["new" if old is None else "changed"] += 1
+            to_scrape.append(item)
+            if status != "unknown":
+                validator_store.stage(link, validators)
+        print(f"Checked {idx + 1}/{len(links_data)}: {item['title']} - {'new' if old is None else status}")
+
+    current = {item["link"] for item in links_data}
+    report["removed"] = sum(1 for link in previous if link not in current)
+    return to_scrape, reused, report
+
+
+def keep_previous(to_scrape, previous, written, writer, report):
+    """Write the previous record of every article that was to be re-extracted but wasn't written
+    this run (rejected, failed, browser lost), so it stays in the output; returns their links."""
+    kept = set()
+    for item in to_scrape:
+        link = item["link"]
+        if link not in written and link in previous:
+            writer.write(previous[link])
+            kept.add(link)
+    report["kept"] = len(kept)
+    if kept:
+        print(f"Kept the previous record of {len(kept)} changed articles that could not be re-extracted")
+    return kept
+
+
+def print_report(report):
+    print(f"Incremental refresh: {report['new']} new, {report['changed']} changed, "
+          f"{report['unchanged']} unchanged, {report['seeded']} seeded, {report['removed']} removed"
+          + (f", {report['kept']} kept from the last run" if report.get("kept") else ""))
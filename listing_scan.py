@@ -0,0 +1,70 @@
+from selenium.common.exceptions import TimeoutException
+from page_cache import canonical_url
+
+# Listing entries not read yet; each one is tagged as soon as it is read, so a list that grows
+# through a "more" button is only ever read from where the last page ended. Text is only read
+# from rendered nodes, like WebElement.text.
+NEW_ENTRIES_JS = r"""
+function text(el) {
+    if (!el || !el.getClientRects().length) { return ""; }
+    return (el.innerText || "").trim();
+}
+var entries = [];
+document.querySelectorAll("li:not([data-scanned]) a.title").forEach(function (a) {
+    var li = a.closest("li");
+    li.setAttribute("data-scanned", "1");
+    entries.push({
+        title: text(a),
+        link: a.href,
+        teaser: text(li.querySelector("span.teaser")),
+        date: text(li.querySelector("div.byline"))
+    });
+});
+return entries;
+"""
+PENDING_JS = 'return document.querySelectorAll("li:not([data-scanned]) a.title").length;'
+
+
+class ListingScanner:
+    """Collects {"title", "link", "teaser", "date"} listing entries page by page.
+
+    Every scan reads only the entries added since the previous one, in one script call, so a
+    page costs the same however long the list has grown ("Next" buttons that replace the
+    list simply start from an untagged page). Entries are de-duplicated on their canonical URL.
+    """
+
+    def __init__(self):
+        self.items = []
+        self._seen = set()
+        self.stats = {"pages": 0, "entries": 0, "duplicates": 0}
+
+    def wait_for_entries(self, wait):
+        """Block until unread entries are on the page; False if none show up within the wait's timeout."""
+        try:
+            wait.until(lambda d: d.execute_script(PENDING_JS) > 0)
+            return True
+        except TimeoutException:
+            return False
+
+    def scan(self, driver):
+        """Read the new entries; returns the ones not collected before."""
+        new = []
+        entries = driver.execute_script(NEW_ENTRIES_JS) or []
+        self.stats["pages"] += 1
+        for entry in entries:
+            if not entry["title"] or not entry["link"]:
+                continue
+            self.stats["entries"] += 1
+            key = canonical_url(entry["link"])
+            if key in self._seen:
+                self.stats["duplicates"] += 1
+                continue
+            self._seen.add(key)
+            self.items.append(entry)
+            new.append(entry)
+        return new
+
+    def summary(self):
+        s = self.stats
+        print(f"Listing: {s['pages']} pages, {s['entries']} entries read, {s['duplicates']} duplicates, "
+              f"{len(self.items)} collected")
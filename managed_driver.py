@@ -0,0 +1,185 @@
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from driver_calls import start_call, page_count_skipped
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_MAX_PAGES = 200
+DEFAULT_MAX_RSS_MB = 2000
+
+class BrowserLost(RuntimeError):
+    """Raised by ManagedDriver.run when the browser died on every attempt of a call."""
+
+
+def browser_rss_mb(driver):
+    """Resident memory of Chrome and its renderer/GPU processes in MB, or None when unknown.
+
+    Without psutil the page's JS heap (from CDP Performance metrics) stands in for it.
+    """
+    pid = getattr(driver, "browser_pid", None)
+    if psutil is not None and pid:
+        try:
+            browser = psutil.Process(pid)
+            procs = [browser] + browser.children(recursive=True)
+            return sum(p.memory_info().rss for p in procs) / 1024 ** 2
+        except psutil.Error:
+            pass
+    try:
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        heap = next(m["value"] for m in metrics if m["name"] == "JSHeapTotalSize")
+        return heap / 1024 ** 2
+    except Exception:
+        return None
+
+
+class DriverStats:
+    """Page, recycle and restart counters shared by every ManagedDriver of a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"pages": 0, "recycled_pages": 0, "recycled_memory": 0, "restarts": 0, "retries": 0}
+        self.peak_rss_mb = 0.0
+
+    def add(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def observe_rss(self, rss):
+        with self._lock:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.counts, peak_rss_mb=round(self.peak_rss_mb, 1))
+
+    def summary(self):
+        m = self.metrics()
+        print(f"Browser sessions: {m['pages']} pages, recycled {m['recycled_pages']}x by page count and "
+              f"{m['recycled_memory']}x by memory, {m['restarts']} crash restarts, {m['retries']} retried pages, "
+              f"peak {m['peak_rss_mb']:.0f} MB")
+
+
+class ManagedDriver:
+    """A browser that is replaced before it degrades and restarted when it dies.
+
+    run(fn, ...) calls fn(driver, wait, ...) (or fn(driver, ...) with pass_wait=False). After
+    every call the session is health-checked; a dead browser is relaunched, `setup` runs on
+    the new one (cookies, login, warm-up page) and the same call is retried up to `retries`
+    times, after which BrowserLost is raised. Healthy browsers are recycled after `max_pages`
+    calls (cache hits, see driver_calls.skip_page_count, excluded) or once their memory passes `max_rss_mb`
+    (0 disables either limit).
+    """
+
+    def __init__(self, launch, setup=None, driver=None, max_pages=DEFAULT_MAX_PAGES, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 retries=1, wait_timeout=20, pass_wait=True, stats=None):
+        self.launch = launch
+        self.setup = setup
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.retries = retries
+        self.wait_timeout = wait_timeout
+        self.pass_wait = pass_wait
+        self.stats = stats if stats is not None else DriverStats()
+        self.driver = None
+        self.wait = None
+        self.pages = 0
+        if driver is not None:
+            self._adopt(driver)
+
+    def _adopt(self, driver):
+        self.driver = driver
+        self.wait = WebDriverWait(driver, self.wait_timeout)
+        self.pages = 0
+        try:
+            driver.execute_cdp_cmd("Performance.enable", {})
+        except Exception:
+            pass
+
+    def start(self):
+        self._adopt(self.launch())
+        if self.setup:
+            if self.pass_wait:
+                self.setup(self.driver, self.wait)
+            else:
+                self.setup(self.driver)
+        return self.driver
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+        self.wait = None
+
+    def healthy(self):
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def restart(self, reason):
+        print(f"♻️ Restarting browser ({reason})")
+        self.quit()
+        self.start()
+
+    def _recycle_due(self):
+        """(counter, reason) when the browser should be replaced now, else None."""
+        if self.max_pages and self.pages >= self.max_pages:
+            return "recycled_pages", f"{self.pages} pages"
+        if self.max_rss_mb:
+            rss = browser_rss_mb(self.driver)
+            if rss is None:
+                return None
+            self.stats.observe_rss(rss)
+            if rss > self.max_rss_mb:
+                return "recycled_memory", f"{rss:.0f} MB in use"
+        return None
+
+    def count_page(self):
+        """Count a page loaded from the site; returns what recycle() needs once the browser is due
+        for it (None otherwise). run() does both itself, this is for pages loaded outside it."""
+        self.pages += 1
+        self.stats.add("pages")
+        return self._recycle_due()
+
+    def recycle(self, due):
+        counter, reason = due
+        self.stats.add(counter)
+        self.restart(reason)
+
+    def run(self, fn, *args, **kwargs):
+        if self.driver is None:
+            self.start()
+        for attempt in range(self.retries + 1):
+            error = None
+            start_call()
+            try:
+                if self.pass_wait:
+                    result = fn(self.driver, self.wait, *args, **kwargs)
+                else:
+                    result = fn(self.driver, *args, **kwargs)
+            except Exception as e:
+                error = e
+                result = None
+            # The scrapers catch most errors themselves, so a crash may only show up here
+            if self.healthy():
+                if error is not None:
+                    raise error
+                if page_count_skipped():
+                    return result
+                due = self.count_page()
+                if due:
+                    self.recycle(due)
+                return result
+            self.stats.add("restarts")
+            self.restart("browser session lost")
+            if attempt < self.retries:
+                self.stats.add("retries")
+                print(f"🔁 Retrying on a fresh browser (attempt {attempt + 2}/{self.retries + 1})")
+        raise BrowserLost(f"browser session lost on all {self.retries + 1} attempts") from error
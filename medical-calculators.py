@@ -2,21 +2,61 @@ import csv
 import json
 import time
 import random
+import argparse
+from functools import partial
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
+from page_probes import ProbeSession, COOKIE_BUTTON
+from resource_blocking import ResourceBlocker, enable_performance_logging
+from browser_startup import launch_chrome
+from page_cache import PageCache, open_cached, remember_page
+from managed_driver import ManagedDriver, DriverStats, BrowserLost
+from tab_prefetch import run_prefetched
+from rate_limit import AdaptiveRateLimiter
+from http_fetch import HttpFetcher
+from sitemap_discovery import index_links, index_outline, discover_links
+from calculator_data import CalculatorDataCapture
+from page_check import PageRejected, RetryQueue, OK, check_page
+
+INDEX_URL = "https://reference.medscape.com/guide/medical-calculators"
+CALCULATOR_URL_PATTERN = r"^https?://reference\.medscape\.com/calculator/"
+# Clicks every category open, then every subsection that appeared; returns how many it clicked
+EXPAND_CATALOG_JS = r"""
+var done = arguments[arguments.length - 1];
+var heads = document.querySelectorAll("div.topic-head");
+heads.forEach(function (h) { h.click(); });
+setTimeout(function () {
+    var subheads = document.querySelectorAll("div.topic-subhead");
+    subheads.forEach(function (h) { h.click(); });
+    setTimeout(function () { done(heads.length + subheads.length); }, 1000);
+}, 1000);
+"""
+
+probes = ProbeSession()
+blocker = ResourceBlocker("calculators")
+# Rendered calculator pages are read from here before the network
+page_cache = PageCache()
+# Paces every page request per host from how the site is responding
+pacer = AdaptiveRateLimiter()
+# Question definitions straight from the calculator app's data
+data_capture = CalculatorDataCapture()
+# Calculators that loaded a challenge, login or error page, tried again after a backoff
+rejected_calculators = RetryQueue()
 
 
 def accept_cookies_if_present(driver, wait):
+    if probes.is_done(driver, "consent"):
+        return
+    if not probes.lookup(driver, "cookies", COOKIE_BUTTON, grace=probes.grace)["visible"]:
+        print("⚠️ No cookie popup found.")
+        return
     try:
-        accept_button = wait.until(
-            EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-        )
+        accept_button = wait.until(EC.element_to_be_clickable(COOKIE_BUTTON))
         accept_button.click()
+        probes.mark_done(driver, "consent")
         print("✅ Clicked cookie consent button.")
         time.sleep(1)
     except TimeoutException:
@@ -40,12 +80,38 @@ def simulate_human_behavior(driver):
         print(f"⚠️ Error in simulate_human_behavior: {e}")
 
 
-def collect_questions(driver, wait, calculator_url):
+def collect_questions(driver, wait, calculator_url, loaded=False, capture="data"):
+    """Questions of one calculator as {"question": ...} records, with options and scoring when
+    capture="data" finds the app's data; loaded=True when the current tab already shows it (tab prefetch)"""
     try:
-        driver.get(calculator_url)
-        time.sleep(random.uniform(2, 4))
-        remove_cookie_overlay(driver)
-
+        if capture == "data" and not loaded:
+            cached = page_cache.get(calculator_url)
+            questions = data_capture.from_cached(cached) if cached is not None else None
+            if questions:
+                print(f"    📦 Read {len(questions)} questions from the cached calculator data")
+                return questions
+
+        if loaded:
+            from_cache, verdict = False, check_page(driver)
+        else:
+            from_cache, verdict = open_cached(driver, page_cache, calculator_url, pacer)
+        if verdict != OK:
+            # Waiting for questions would only time out; the caller queues it for a retry
+            raise PageRejected(calculator_url, verdict)
+        if not from_cache and not loaded:
+            remove_cookie_overlay(driver)
+
+        entries = None
+        if capture == "data" and not from_cache:
+            questions, entries = data_capture.from_browser(driver)
+            if questions:
+                print(f"    📦 Read {len(questions)} questions from the calculator data")
+                blocker.page_report(driver, calculator_url, entries)
+                # Stored with the page: data captured from the network can't be read back from its HTML
+                remember_page(driver, page_cache, calculator_url, extracted={"questions": questions})
+                return questions
+
+        # The rendered question list: texts only, one WebDriver call per question
         questions = []
         try:
             question_elements = wait.until(
@@ -57,134 +123,110 @@ def collect_questions(driver, wait, calculator_url):
                 question_text = q.find_element(By.CSS_SELECTOR,
                                                "div.QuestionListItem__Section-sc-8dcub9-1 span:last-child").text.strip()
                 if question_text:
-                    questions.append(question_text)
+                    questions.append({"question": question_text})
                     print(f"    ❓ Collected question: {question_text}")
         except TimeoutException:
             print(f"⚠️ No questions found for {calculator_url}")
+        if not from_cache:
+            blocker.page_report(driver, calculator_url, entries)
+            if questions:
+                remember_page(driver, page_cache, calculator_url)
         return questions
+    except PageRejected:
+        raise
     except Exception as e:
         print(f"⚠️ Error collecting questions for {calculator_url}: {e}")
         return []
 
 
-def collect_all_calculator_links(driver, wait):
-    links_data = []
-    seen_urls = set()
+def collect_or_queue(managed, item, capture):
+    """Store the questions of one calculator, or queue it for a retry when its page was rejected"""
+    try:
+        store_questions(item, managed.run(collect_questions, item['link'], capture=capture))
+    except PageRejected as e:
+        print(f"🚫 {item['title']} loaded a {e.verdict} page")
+        rejected_calculators.push(item, e.verdict)
+        return
+    except BrowserLost as e:
+        print(f"⚠️ Skipping questions for {item['link']}: {e}")
+        store_questions(item, [])
+        return
+    print(f"✅ Collected {len(item['questions'])} questions for {item['title']}")
 
-    # Retry logic for category expansion
-    def try_click(element, description, retries=3):
-        for attempt in range(retries):
-            try:
-                driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                time.sleep(random.uniform(0.5, 1.5))
-                driver.execute_script("arguments[0].click();", element)
-                time.sleep(random.uniform(1, 2))
-                return True
-            except (StaleElementReferenceException, TimeoutException) as e:
-                print(f"⚠️ Retry {attempt + 1}/{retries} for {description}: {e}")
-                time.sleep(1)
-        return False
-
-    # Get all categories
-    categories = driver.find_elements(By.CSS_SELECTOR, "div.topic-head")
-    print(f"Found {len(categories)} categories.")
-
-    for i, cat in enumerate(categories):
-        try:
-            category_name = cat.text.strip()
-            print(f"Processing category: {category_name}")
-
-            # Expand category
-            if not try_click(cat, f"category {category_name}"):
-                print(f"⚠️ Failed to expand category {category_name} after retries.")
-                continue
-
-            # Find subsections within the category
-            subsections = cat.find_elements(By.XPATH, "./following-sibling::div[contains(@class, 'topic-subsection')]")
-            for sub in subsections:
-                try:
-                    # Get subsection name
-                    subhead = sub.find_element(By.CSS_SELECTOR, "div.topic-subhead")
-                    subsection_name = subhead.text.strip()
-
-                    # Expand subsection
-                    if not try_click(subhead, f"subsection {subsection_name}"):
-                        print(f"⚠️ Failed to expand subsection {subsection_name} after retries.")
-                        continue
-
-                    # Collect links under subsection
-                    sub_links = sub.find_elements(By.CSS_SELECTOR, "ul a")
-                    for a in sub_links:
-                        try:
-                            title = a.text.strip()
-                            href = a.get_attribute("href")
-                            if title and href and href not in seen_urls:
-                                if not href.startswith("http"):
-                                    href = "https://reference.medscape.com" + href
-                                links_data.append({
-                                    "category": category_name,
-                                    "subcategory": subsection_name,
-                                    "title": title,
-                                    "link": href,
-                                    "questions": []  # Questions will be filled later
-                                })
-                                seen_urls.add(href)
-                                print(f"🔗 Collected: {category_name} > {subsection_name} > {title} - {href}")
-                        except Exception as e:
-                            print(f"⚠️ Error processing link in {category_name} > {subsection_name}: {e}")
-                            continue
-
-                except Exception as e:
-                    print(f"⚠️ Error processing subsection under {category_name}: {e}")
-                    continue
-
-            # Collect links directly under category (not in a subsection)
-            direct_links = cat.find_elements(By.XPATH,
-                                             "./following-sibling::ul[not(preceding-sibling::div[contains(@class, 'topic-subsection')])]/li/a")
-            for a in direct_links:
-                try:
-                    title = a.text.strip()
-                    href = a.get_attribute("href")
-                    if title and href and href not in seen_urls:
-                        if not href.startswith("http"):
-                            href = "https://reference.medscape.com" + href
-                        links_data.append({
-                            "category": category_name,
-                            "subcategory": "",
-                            "title": title,
-                            "link": href,
-                            "questions": []  # Questions will be filled later
-                        })
-                        seen_urls.add(href)
-                        print(f"🔗 Collected: {category_name} > {title} - {href}")
-                except Exception as e:
-                    print(f"⚠️ Error processing direct link in {category_name}: {e}")
-                    continue
-
-        except Exception as e:
-            print(f"⚠️ Error processing category {category_name}: {e}")
-            continue
 
+def store_questions(item, questions):
+    item['questions'] = [q['question'] for q in questions]
+    # Options and scoring only exist when the app data was captured
+    if any(len(q) > 1 for q in questions):
+        item['question_data'] = questions
+
+
+def add_question_slots(links_data):
+    for r in links_data:
+        r["questions"] = []  # Questions will be filled later
+        path = " > ".join(part for part in (r["category"], r["subcategory"], r["title"]) if part)
+        print(f"🔗 Collected: {path} - {r['link']}")
     return links_data
 
 
-def main():
+def collect_all_calculator_links(driver, wait):
+    """The whole catalog from one read of the page source; categories are only opened (all in one
+    script) when their links aren't in the HTML yet"""
+    links_data = index_links(driver.page_source, INDEX_URL, CALCULATOR_URL_PATTERN)
+    if not links_data:
+        opened = driver.execute_async_script(EXPAND_CATALOG_JS)
+        print(f"Opened {opened} catalog sections.")
+        links_data = index_links(driver.page_source, INDEX_URL, CALCULATOR_URL_PATTERN)
+    print(f"Found {len({r['category'] for r in links_data})} categories.")
+    return add_question_slots(links_data)
+
+
+def discover_calculator_links(driver, sitemaps):
+    """Calculator links from the sitemaps, placed in the catalog's category > subcategory tree
+    read from the page source (nothing is clicked)"""
+    try:
+        outline = index_outline(driver.page_source, INDEX_URL)
+        records = discover_links(sitemaps, CALCULATOR_URL_PATTERN, outline, HttpFetcher.from_driver(driver), pacer,
+                                 include_unmapped=True)
+    except Exception as e:
+        print(f"⚠️ Sitemap discovery failed: {e}")
+        return []
+    return add_question_slots(records)
+
+
+def create_driver():
     options = uc.ChromeOptions()
     options.add_argument('--ignore-certificate-errors')
     options.add_argument('--ignore-ssl-errors')
+    enable_performance_logging(options)
+    driver = launch_chrome(options, use_subprocess=True)
+    driver.maximize_window()
+    blocker.attach(driver)
+    return driver
+
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect Medscape medical calculators and their questions.")
+    parser.add_argument("--prefetch", type=int, default=0, metavar="K",
+                        help="load the next K calculators in background tabs while the current one is read")
+    parser.add_argument("--questions", choices=["data", "dom"], default="data",
+                        help="data: read questions, options and scoring from the calculator app's page state or "
+                             "JSON responses, falling back to the rendered list; dom: always read the rendered list")
+    parser.add_argument("--sitemap", action="append", metavar="URL_OR_FILE",
+                        help="discover calculators from this sitemap (or sitemap index, .xml or .xml.gz; repeatable) "
+                             "instead of expanding every catalog category")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
     try:
-        driver_path = ChromeDriverManager().install()
-        service = Service(driver_path)
-        driver = uc.Chrome(options=options, service=service, use_subprocess=True)
+        driver = create_driver()
     except Exception as e:
         print(f"⚠️ Error setting up ChromeDriver: {e}")
         return
 
-    driver.maximize_window()
-
-    url = "https://reference.medscape.com/guide/medical-calculators"
-    driver.get(url)
+    pacer.get(driver, INDEX_URL)
     wait = WebDriverWait(driver, 20)
 
     accept_cookies_if_present(driver, wait)
@@ -193,20 +235,58 @@ def main():
 
     # Step 1: Collect all calculator links
     print("Collecting all calculator links...")
-    links_data = collect_all_calculator_links(driver, wait)
+    links_data = []
+    if args.sitemap:
+        links_data = discover_calculator_links(driver, args.sitemap)
+        if not links_data:
+            print("⚠️ No calculators found through the sitemaps, reading the catalog page instead.")
+    if not links_data:
+        links_data = collect_all_calculator_links(driver, wait)
     print(f"✅ Collected {len(links_data)} calculator links.")
 
     # Step 2: Collect questions for each calculator
     print("Collecting questions for each calculator...")
-    for i, item in enumerate(links_data):
-        print(f"Processing calculator {i + 1}/{len(links_data)}: {item['title']}")
-        questions = collect_questions(driver, wait, item['link'])
-        item['questions'] = questions
-        print(f"✅ Collected {len(questions)} questions for {item['title']}")
+    # Fresh browser every few hundred calculators, or right away (with a retry) if it crashes
+    driver_stats = DriverStats()
+    managed = ManagedDriver(create_driver, driver=driver, stats=driver_stats)
+    if args.prefetch:
+        # Cached calculators first, then the rest through tabs loading args.prefetch pages ahead
+        cached, to_load = [], []
+        for item in links_data:
+            (cached if page_cache.contains(item['link']) else to_load).append(item)
+        for item in cached:
+            # An entry that expired since the split is loaded by collect_questions itself
+            collect_or_queue(managed, item, args.questions)
+        position = {item['link']: i for i, item in enumerate(to_load, 1)}
+
+        def collect_loaded(driver, wait, item):
+            print(f"Processing calculator {position[item['link']]}/{len(to_load)}: {item['title']}")
+            remove_cookie_overlay(driver)
+            try:
+                store_questions(item, collect_questions(driver, wait, item['link'], loaded=True, capture=args.questions))
+            except PageRejected as e:
+                print(f"🚫 {item['title']} loaded a {e.verdict} page")
+                rejected_calculators.push(item, e.verdict)
+                return
+            print(f"✅ Collected {len(item['questions'])} questions for {item['title']}")
+
+        # A crashed browser is restarted and the pipeline picks up where it stopped
+        run_prefetched(managed, to_load, collect_loaded, args.prefetch, prepare=partial(blocker.attach, quiet=True),
+                       pacer=pacer)
+    else:
+        for i, item in enumerate(links_data):
+            print(f"Processing calculator {i + 1}/{len(links_data)}: {item['title']}")
+            collect_or_queue(managed, item, args.questions)
+
+    # Rejected pages get another go once their backoff is up; rejected again means requeued
+    for item, attempts in rejected_calculators.drain():
+        print(f"Retrying {item['title']} after {attempts} rejected load(s)")
+        collect_or_queue(managed, item, args.questions)
 
     # Save CSV
     with open("medscape_calculators.csv", "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["category", "subcategory", "title", "link", "questions"])
+        writer = csv.DictWriter(f, fieldnames=["category", "subcategory", "title", "link", "questions"],
+                                extrasaction="ignore")
         writer.writeheader()
         for row in links_data:
             row["questions"] = "; ".join(row["questions"])  # Join questions for CSV
@@ -218,7 +298,14 @@ def main():
         json.dump(links_data, f, indent=4, ensure_ascii=False)
     print("💾 Data saved to medscape_calculators.json")
 
-    driver.quit()
+    blocker.summary()
+    pacer.summary()
+    rejected_calculators.summary()
+    if args.questions == "data":
+        data_capture.summary()
+    driver_stats.summary()
+    page_cache.summary()
+    managed.quit()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from page_check import OK, check_html, check_page
+from driver_calls import skip_page_count
+
+DEFAULT_CACHE_DIR = ".page_cache"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|src|ref|faf|icd|gclid|fbclid)$", re.I)
+# Executable scripts only; JSON data blocks never run and extractors may read the page data from them
+_SCRIPT_TAG = re.compile(r"<script\b(?![^>]*\btype\s*=\s*[\"']application/(?:ld\+)?json[\"'])[^>]*>.*?</script\s*>",
+                         re.I | re.S)
+_HEAD_TAG = re.compile(r"<head\b[^>]*>", re.I)
+
+
+def canonical_url(url):
+    """Lowercase scheme/host, drop the fragment and tracking parameters, sort the query."""
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING_PARAMS.match(k))
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), path, urlencode(query), ""))
+
+
+class CachedPage:
+    def __init__(self, url, html, meta):
+        self.url = url
+        self.html = html
+        self.meta = meta
+
+    @property
+    def age(self):
+        return time.time() - self.meta["fetched_at"]
+
+
+class PageCache:
+    """On-disk cache of rendered pages keyed by canonical URL.
+
+    Bodies are stored once per content hash under blobs/, and each URL gets a small metadata
+    file under entries/ (fetch time, status, content hash, size, last access, and any data
+    extracted from the live page that its HTML doesn't hold, under "extracted"). Entries older
+    than `ttl` seconds are misses; once the blobs exceed `max_bytes` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries_dir = os.path.join(directory, "entries")
+        self._blobs_dir = os.path.join(directory, "blobs")
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._blobs_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        # How many entries point at each blob; a blob goes when its last entry does
+        self._refs = {}
+        for _, _, meta in self._entries():
+            self._refs[meta["content_hash"]] = self._refs.get(meta["content_hash"], 0) + 1
+        self._total_bytes = 0
+        for name in os.listdir(self._blobs_dir):
+            path = os.path.join(self._blobs_dir, name)
+            if name[:-len(".html")] in self._refs:
+                self._total_bytes += os.path.getsize(path)
+            else:
+                # Left behind by older versions that didn't release replaced blobs
+                os.remove(path)
+
+    def _entry_path(self, url):
+        key = hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self._entries_dir, key + ".json")
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self._blobs_dir, content_hash + ".html")
+
+    def _read_meta(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _entries(self):
+        """(last_access, path, meta) for every entry file."""
+        entries = []
+        for name in os.listdir(self._entries_dir):
+            path = os.path.join(self._entries_dir, name)
+            meta = self._read_meta(path) if name.endswith(".json") else None
+            if meta:
+                entries.append((meta.get("last_access", 0), path, meta))
+        return entries
+
+    def _release(self, content_hash):
+        """Drop one reference to a blob and delete it once nothing uses it (lock held)."""
+        self._refs[content_hash] = self._refs.get(content_hash, 1) - 1
+        if self._refs[content_hash] > 0:
+            return
+        del self._refs[content_hash]
+        blob = self._blob_path(content_hash)
+        if os.path.exists(blob):
+            self._total_bytes -= os.path.getsize(blob)
+            os.remove(blob)
+
+    def _write_meta(self, path, meta):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def contains(self, url):
+        """True if url has a fresh entry (cheap: reads only the metadata file)."""
+        meta = self._read_meta(self._entry_path(url))
+        return meta is not None and not (self.ttl and time.time() - meta["fetched_at"] > self.ttl)
+
+    def get(self, url):
+        """Return a CachedPage for url, or None when missing or older than the TTL."""
+        path = self._entry_path(url)
+        with self._lock:
+            meta = self._read_meta(path)
+            if meta is None or (self.ttl and time.time() - meta["fetched_at"] > self.ttl):
+                self.stats["misses"] += 1
+                return None
+            try:
+                with open(self._blob_path(meta["content_hash"]), "r", encoding="utf-8") as f:
+                    html = f.read()
+            except OSError:
+                self.stats["misses"] += 1
+                return None
+            meta["last_access"] = time.time()
+            self._write_meta(path, meta)
+            self.stats["hits"] += 1
+        return CachedPage(url, html, meta)
+
+    def put(self, url, html, status=200, headers=None, extracted=None):
+        """Store a page; headers may carry ETag / Last-Modified for later conditional requests, and
+        `extracted` (JSON-serializable) what was read from the live page beyond its HTML."""
+        body = html.encode("utf-8")
+        content_hash = hashlib.sha256(body).hexdigest()
+        now = time.time()
+        meta = {
+            "url": canonical_url(url),
+            "fetched_at": now,
+            "last_access": now,
+            "status": status,
+            "content_hash": content_hash,
+            "size": len(body),
+        }
+        for name in ("ETag", "Last-Modified"):
+            if headers and headers.get(name):
+                meta[name.lower()] = headers.get(name)
+        if extracted is not None:
+            meta["extracted"] = extracted
+        with self._lock:
+            path = self._entry_path(url)
+            previous = self._read_meta(path)
+            blob = self._blob_path(content_hash)
+            if not os.path.exists(blob):
+                with open(blob, "wb") as f:
+                    f.write(body)
+                self._total_bytes += len(body)
+            self._write_meta(path, meta)
+            self._refs[content_hash] = self._refs.get(content_hash, 0) + 1
+            if previous is not None:
+                # A re-rendered page rarely hashes the same; its old body must not linger on disk
+                self._release(previous["content_hash"])
+            self.stats["stores"] += 1
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict()
+        return meta
+
+    def _evict(self):
+        """Drop least recently used entries until the blobs fit in max_bytes again (lock held)."""
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        target = self.max_bytes * 0.9
+        for _, path, meta in entries:
+            if self._total_bytes <= target:
+                break
+            os.remove(path)
+            self.stats["evictions"] += 1
+            self._release(meta["content_hash"])
+
+    def summary(self):
+        s = self.stats
+        print(f"Page cache: {s['hits']} hits, {s['misses']} misses, {s['stores']} stored, "
+              f"{s['evictions']} evicted, {self._total_bytes / 1_000_000:.1f} MB on disk")
+
+
+def render_snapshot(driver, url, html):
+    """Show a cached page in the browser so the normal Selenium extractors can run on it.
+
+    Scripts are stripped (they would refetch and rebuild the page), except JSON data blocks,
+    and a <base> tag keeps relative links and image sources resolving against the original URL.
+    """
+    html = _SCRIPT_TAG.sub("", html)
+    base = f'<base href="{url}">'
+    html = _HEAD_TAG.sub(lambda m: m.group(0) + base, html, count=1) if _HEAD_TAG.search(html) else base + html
+    driver.get("about:blank")
+    driver.execute_script("document.open(); document.write(arguments[0]); document.close();", html)
+
+
+def open_cached(driver, cache, url, pacer=None):
+    """Load url from the cache into the browser if possible, otherwise navigate to it
+    (through pacer, a rate_limit.AdaptiveRateLimiter, when given).
+
+    Returns (from_cache, verdict): whether the page came from the cache, and the page_check
+    verdict of what is in the browser now (cached pages were OK when stored). Anything but OK
+    is a challenge, login-wall or error page that is not worth extracting. After extracting
+    from a live page, call remember_page so the next run can skip the network.
+    """
+    if cache is not None:
+        cached = cache.get(url)
+        if cached is not None:
+            print(f"Cache hit for {url} (age {cached.age / 3600:.1f} h)")
+            render_snapshot(driver, url, cached.html)
+            skip_page_count()
+            return True, OK
+    if pacer is not None:
+        return False, pacer.get(driver, url)
+    driver.get(url)
+    return False, check_page(driver)
+
+
+def remember_page(driver, cache, url, extracted=None):
+    """Store the live page, unless it is a challenge, login-wall or error page. `extracted` is
+    kept with it for data the HTML alone can't give back (e.g. responses the page fetched)."""
+    if cache is None:
+        return
+    try:
+        html = driver.page_source
+        verdict = check_html(html, url)
+        if verdict != OK:
+            print(f"Not caching {url}: {verdict} page")
+            return
+        cache.put(url, html, extracted=extracted)
+    except Exception as e:
+        print(f"Could not cache {url}: {e}")
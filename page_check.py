@@ -0,0 +1,119 @@
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from http_fetch import CHALLENGE_ELEMENTS, is_challenge_title, page_title
+from session_store import LOGIN_URL_MARKERS
+
+OK = "ok"
+CHALLENGE = "challenge"
+LOGIN_WALL = "login-wall"
+ERROR = "error"
+
+LOGIN_TITLES = ("log in", "login", "sign in")
+_ERROR_TITLE = re.compile(r"^\s*(4\d\d|5\d\d)\b|not found|service unavailable|bad gateway|server error|gateway time-?out", re.I)
+# Real article pages are tens of KB; anything this small is an error or an interstitial
+MIN_PAGE_BYTES = 5000
+
+# Title, final URL, size and the first 20 KB of the document in one round trip
+PAGE_FINGERPRINT_JS = r"""
+var html = document.documentElement ? document.documentElement.outerHTML : "";
+return {title: document.title || "", url: location.href, size: html.length, head: html.slice(0, 20000)};
+"""
+
+
+def classify_page(title, url, head, size, status=None):
+    """OK, CHALLENGE, LOGIN_WALL or ERROR from a cheap fingerprint of a loaded page."""
+    lowered = title.lower()
+    if is_challenge_title(title) or CHALLENGE_ELEMENTS.search(head):
+        return CHALLENGE
+    if any(m in url for m in LOGIN_URL_MARKERS) or any(lowered.startswith(t) for t in LOGIN_TITLES):
+        return LOGIN_WALL
+    if (status is not None and status >= 400) or _ERROR_TITLE.search(title) or size < MIN_PAGE_BYTES:
+        return ERROR
+    return OK
+
+
+def check_page(driver):
+    """Classify the page the browser just loaded; ERROR when it can't even be read."""
+    try:
+        fp = driver.execute_script(PAGE_FINGERPRINT_JS)
+    except Exception:
+        return ERROR
+    return classify_page(fp["title"], fp["url"], fp["head"], fp["size"])
+
+
+def check_html(html, url, status=None):
+    """Same classification for an HTTP response body."""
+    return classify_page(page_title(html[:20000]), url, html[:20000], len(html), status)
+
+
+class PageRejected(Exception):
+    """Raised instead of extracting from a challenge, login-wall or error page."""
+
+    def __init__(self, url, verdict):
+        super().__init__(f"{verdict} page at {url}")
+        self.url = url
+        self.verdict = verdict
+
+
+class RetryQueue:
+    """Items whose page was rejected, each due again after an exponential backoff.
+
+    The n-th rejection of an item schedules it `base_delay` * 2**(n-1) seconds (plus up to
+    25% jitter) later; after `max_attempts` rejections it is given up and reported.
+    Thread safe, so pool workers can push while the main thread drains later.
+    """
+
+    def __init__(self, base_delay=60.0, max_attempts=3):
+        self.base_delay = base_delay
+        self.max_attempts = max_attempts
+        self._heap = []
+        self._attempts = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.gave_up = []
+
+    def push(self, item, reason, key="link"):
+        """Schedule item again; returns False once it has used up its attempts."""
+        with self._lock:
+            self.stats[reason] = self.stats.get(reason, 0) + 1
+            attempts = self._attempts.get(item[key], 0) + 1
+            self._attempts[item[key]] = attempts
+            if attempts >= self.max_attempts:
+                self.gave_up.append((item, reason))
+                print(f"Giving up on {item[key]} after {self.max_attempts} {reason} pages")
+                return False
+            delay = self.base_delay * 2 ** (attempts - 1)
+            delay += random.uniform(0, delay / 4)
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._order), item, attempts))
+        print(f"Queued {item[key]} for retry in {delay:.0f}s ({reason})")
+        return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def drain(self):
+        """Yield (item, attempt) as each item comes due, sleeping until then; items pushed
+        back while draining are picked up too."""
+        while True:
+            with self._lock:
+                if not self._heap:
+                    return
+                ready_at, _, item, attempts = heapq.heappop(self._heap)
+            pause = ready_at - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            yield item, attempts
+
+    def summary(self):
+        if not self.stats:
+            return
+        reasons = ", ".join(f"{n} {reason}" for reason, n in sorted(self.stats.items()))
+        print(f"Rejected pages: {reasons}; gave up on {len(self.gave_up)}")
+        for item, reason in self.gave_up:
+            print(f"  {item.get('title', '')} ({reason}): {item.get('link', '')}")
@@ -0,0 +1,144 @@
+import time
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Locators for optional elements shared by the scrapers, in Selenium (By, value) form
+COOKIE_BUTTON = (By.ID, "onetrust-accept-btn-handler")
+COOKIE_OVERLAY = (By.CSS_SELECTOR, ".onetrust-pc-dark-filter")
+SHOW_ALL_LINK = (By.LINK_TEXT, "Show All")
+REFERENCES_LAYER = (By.ID, "references-layer")
+REFERENCES_LINK = (By.XPATH, "//a[contains(@href, \"showModal('references-layer')\") or normalize-space()='References']")
+POPUP_CLOSE = (By.CSS_SELECTOR, "button[aria-label='Close Patient Chart'], .popup-close, .modal-close")
+
+# Everything an article page may or may not have, checked together right after navigation
+ARTICLE_PROBES = {
+    "cookies": COOKIE_BUTTON,
+    "overlay": COOKIE_OVERLAY,
+    "show_all": SHOW_ALL_LINK,
+    "references_layer": REFERENCES_LAYER,
+    "references_link": REFERENCES_LINK,
+}
+
+# Returns {name: {"present": bool, "visible": bool}} for every locator, plus whether the
+# OneTrust consent cookie is already set, in one round trip.
+PROBE_JS = r"""
+var specs = arguments[0];
+function visible(el) { return !!el && el.getClientRects().length > 0; }
+function find(by, value) {
+    if (by === "id") { var el = document.getElementById(value); return el ? [el] : []; }
+    if (by === "css selector") { return Array.prototype.slice.call(document.querySelectorAll(value)); }
+    if (by === "link text") {
+        return Array.prototype.filter.call(document.querySelectorAll("a"), function (a) {
+            return (a.innerText || "").trim() === value;
+        });
+    }
+    if (by === "xpath") {
+        var snap = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var out = [];
+        for (var i = 0; i < snap.snapshotLength; i++) { out.push(snap.snapshotItem(i)); }
+        return out;
+    }
+    return [];
+}
+var found = {};
+for (var name in specs) {
+    var els = find(specs[name][0], specs[name][1]);
+    found[name] = {present: els.length > 0, visible: els.some(visible)};
+}
+return {
+    found: found,
+    consent_cookie: document.cookie.indexOf("OptanonAlertBoxClosed") !== -1,
+    ready: document.readyState
+};
+"""
+
+
+class ProbeSession:
+    """Cheap presence checks for optional elements, with per-browser memory.
+
+    One JS call answers "is X there?" for every optional element at once, so missing popups
+    and links cost milliseconds instead of a full WebDriverWait timeout. State such as
+    "consent already given" is kept per browser session (so pool workers don't share it) and
+    lets probes that can no longer succeed be skipped without touching the page.
+    """
+
+    def __init__(self, ready_timeout=10, grace=1.5, interval=0.25):
+        self.ready_timeout = ready_timeout
+        self.grace = grace
+        self.interval = interval
+        self._state = {}
+        self.stats = {"probes": 0, "skipped": 0}
+
+    def _session(self, driver):
+        return self._state.setdefault(driver.session_id, {"done": set(), "url": None, "found": {}})
+
+    def is_done(self, driver, flag):
+        """True once `flag` (e.g. "consent") was recorded for this browser; counts as a skipped probe."""
+        if flag in self._session(driver)["done"]:
+            self.stats["skipped"] += 1
+            return True
+        return False
+
+    def mark_done(self, driver, flag):
+        self._session(driver)["done"].add(flag)
+
+    def wait_ready(self, driver):
+        try:
+            WebDriverWait(driver, self.ready_timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+        except TimeoutException:
+            pass
+
+    def probe(self, driver, locators, grace=None):
+        """Check all locators in one script call; poll for up to `grace` seconds until one is visible.
+
+        The result is cached for the current URL so later helpers on the same page can reuse it.
+        """
+        grace = self.grace if grace is None else grace
+        specs = {name: [by, value] for name, (by, value) in locators.items()}
+        deadline = time.monotonic() + grace
+        session = self._session(driver)
+        while True:
+            self.stats["probes"] += 1
+            try:
+                result = driver.execute_script(PROBE_JS, specs)
+            except WebDriverException as e:
+                print(f"Probe failed: {e}")
+                return {name: {"present": False, "visible": False} for name in locators}
+            if result.get("consent_cookie"):
+                session["done"].add("consent")
+            found = result["found"]
+            if any(v["visible"] for v in found.values()) or time.monotonic() >= deadline:
+                break
+            time.sleep(self.interval)
+        try:
+            url = driver.current_url
+        except WebDriverException:
+            url = None
+        if session["url"] != url:
+            session["url"] = url
+            session["found"] = {}
+        session["found"].update(found)
+        return found
+
+    def scan(self, driver, locators=None):
+        """Wait for the ready state, then probe every optional element of the page at once."""
+        self.wait_ready(driver)
+        return self.probe(driver, locators or ARTICLE_PROBES)
+
+    def lookup(self, driver, name, locator, grace=0):
+        """Probe result for one element, reusing the last scan of this page when available."""
+        session = self._session(driver)
+        try:
+            url = driver.current_url
+        except WebDriverException:
+            url = None
+        if session["url"] == url and name in session["found"]:
+            self.stats["skipped"] += 1
+            return session["found"][name]
+        return self.probe(driver, {name: locator}, grace=grace)[name]
+
+    def forget(self, driver):
+        self._state.pop(driver.session_id, None)
@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from page_check import check_page, CHALLENGE, ERROR
+from http_fetch import is_challenge
+
+# Status codes that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+class _HostState:
+    def __init__(self, delay):
+        self.delay = delay
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        # Page loads and plain HTTP fetches take very different times; each is judged against its own
+        self.latency = {}
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "challenges": 0, "waited": 0.0}
+
+
+class AdaptiveRateLimiter:
+    """Per-host token bucket whose refill rate follows how the site is responding.
+
+    Every host starts at one request per `delay` seconds. Fast, clean responses shorten the
+    interval by `speedup` down to `min_delay`; responses much slower than the running average
+    lengthen it (each `channel` - "browser" loads, "http" fetches - keeps its own average), and errors, throttling statuses and challenge pages back off exponentially
+    (x2, x4 for challenges) up to `max_delay`. Each wait also adds a random
+    `min_jitter`..2*`min_jitter` seconds so requests never leave on an exact cadence.
+    Safe to share between threads.
+    """
+
+    def __init__(self, delay=3.0, min_delay=0.5, max_delay=300.0, min_jitter=0.5, speedup=0.85, slow_factor=2.0):
+        self.initial_delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_jitter = min_jitter
+        self.speedup = speedup
+        self.slow_factor = slow_factor
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, url):
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostState(self.initial_delay)
+            return self._hosts[host]
+
+    def wait(self, url):
+        """Block until the host of url may be hit again; returns the seconds waited."""
+        state = self._state(url)
+        with state.lock:
+            now = time.monotonic()
+            state.tokens = min(1.0, state.tokens + (now - state.updated) / state.delay)
+            state.updated = now
+            # Taking the token even when it isn't there yet reserves the next slot for this caller
+            pause = max(0.0, (1 - state.tokens) * state.delay)
+            state.tokens -= 1
+        if self.min_jitter:
+            pause += random.uniform(self.min_jitter, 2 * self.min_jitter)
+        if pause:
+            time.sleep(pause)
+        with state.lock:
+            state.stats["waited"] += pause
+        return pause
+
+    def record(self, url, elapsed=None, ok=True, status=None, challenged=False, channel="browser"):
+        """Feed back how a request went so the host's pace can adapt."""
+        state = self._state(url)
+        with state.lock:
+            latency = state.latency.get(channel)
+            state.stats["requests"] += 1
+            if challenged:
+                state.stats["challenges"] += 1
+                state.delay = min(self.max_delay, state.delay * 4)
+            elif not ok or status in THROTTLE_STATUSES:
+                state.stats["errors"] += 1
+                state.delay = min(self.max_delay, state.delay * 2)
+            elif elapsed is not None and latency is not None and elapsed > self.slow_factor * latency:
+                state.delay = min(self.max_delay, state.delay * 1.5)
+            else:
+                state.delay = max(self.min_delay, state.delay * self.speedup)
+            if ok and not challenged and elapsed is not None:
+                state.latency[channel] = elapsed if latency is None else 0.8 * latency + 0.2 * elapsed
+
+    def get(self, driver, url):
+        """driver.get(url) at the host's pace, reporting latency, errors and challenge pages.
+
+        Returns the page_check verdict for the loaded page (OK, CHALLENGE, LOGIN_WALL or ERROR).
+        """
+        self.wait(url)
+        start = time.perf_counter()
+        try:
+            driver.get(url)
+        except Exception:
+            self.record(url, time.perf_counter() - start, ok=False)
+            raise
+        elapsed = time.perf_counter() - start
+        verdict = check_page(driver)
+        self.record(url, elapsed, ok=verdict != ERROR, challenged=verdict == CHALLENGE)
+        return verdict
+
+    def fetch(self, fetcher, url, headers=None):
+        """HttpFetcher.fetch at the host's pace; same result (None on network errors)."""
+        self.wait(url)
+        result = fetcher.fetch(url, headers=headers)
+        if result is None:
+            self.record(url, ok=False, channel="http")
+        else:
+            self.record(url, result.elapsed, status=result.status,
+                        challenged=result.status == 200 and is_challenge(result.html), channel="http")
+        return result
+
+    def delay(self, url):
+        return self._state(url).delay
+
+    def summary(self):
+        if not self._hosts:
+            return
+        print("Request pacing:")
+        for host, state in sorted(self._hosts.items()):
+            s = state.stats
+            latency = ", ".join(f"{channel} {value:.2f}s" for channel, value in sorted(state.latency.items())) or "-"
+            print(f"  {host}: {s['requests']} requests, {s['errors']} errors, {s['challenges']} challenges, "
+                  f"now 1 per {state.delay:.1f}s, avg latency {latency}, {s['waited']:.0f}s waited")
@@ -0,0 +1,153 @@
+import json
+import threading
+
+# URL patterns understood by Network.setBlockedURLs; "*" matches anything, including query strings
+ADS_AND_TRACKERS = [
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*googletagservices.com*",
+    "*googletagmanager.com*",
+    "*google-analytics.com*",
+    "*adservice.google.*",
+    "*amazon-adsystem.com*",
+    "*adsrvr.org*",
+    "*scorecardresearch.com*",
+    "*facebook.net*",
+    "*hotjar.com*",
+    "*taboola.com*",
+    "*outbrain.com*",
+    "*moatads.com*",
+    "*krxd.net*",
+    "*chartbeat.com*",
+    "*newrelic.com*",
+    "*nr-data.net*",
+]
+FONTS = ["*.woff*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
+MEDIA = ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*jwplayer*", "*brightcove*"]
+IMAGES = ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.svg*", "*.ico*"]
+
+# <img src> attributes are still readable when the image itself is blocked, so only
+# scrapers that need the pixels (or lazy-load on image events) keep images.
+BLOCK_PROFILES = {
+    "none": [],
+    "keep-images": ADS_AND_TRACKERS + FONTS + MEDIA,
+    "text-only": ADS_AND_TRACKERS + FONTS + MEDIA + IMAGES,
+}
+
+SECTION_PROFILES = {
+    "anatomy": "text-only",
+    "procedures": "text-only",
+    "diseases": "text-only",
+    "calculators": "text-only",
+    "simulations": "text-only",
+    "simulation-charts": "text-only",
+    "slideshows": "text-only",
+    "slideshow-decks": "keep-images",
+}
+
+# Rough transfer sizes used to estimate what a blocked request would have cost; a blocked
+# request never reaches the network so its real size is unknown.
+TYPICAL_BYTES = {
+    "Image": 60_000,
+    "Font": 40_000,
+    "Media": 500_000,
+    "Script": 30_000,
+    "XHR": 5_000,
+    "Fetch": 5_000,
+    "Stylesheet": 20_000,
+}
+DEFAULT_TYPICAL_BYTES = 10_000
+
+
+def enable_performance_logging(options):
+    """Ask ChromeDriver to keep CDP Network events so traffic can be reported per page."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def _fmt_bytes(n):
+    if n >= 1_000_000:
+        return f"{n / 1_000_000:.1f} MB"
+    return f"{n / 1000:.0f} KB"
+
+
+class ResourceBlocker:
+    """Blocks ads, trackers, fonts, media (and optionally images) through CDP and reports savings."""
+
+    def __init__(self, section=None, profile=None):
+        self.set_profile(profile or SECTION_PROFILES.get(section, "text-only"))
+        self.totals = {"pages": 0, "requests": 0, "blocked": 0, "bytes": 0, "saved_bytes": 0, "load_ms": 0}
+        self._lock = threading.Lock()
+
+    def set_profile(self, profile):
+        self.profile = profile
+        self.patterns = BLOCK_PROFILES[profile]
+
+    def attach(self, driver, quiet=False):
+        """Apply the profile to the driver's current tab (CDP network settings are per tab)."""
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+            if not quiet:
+                print(f"Resource blocking profile '{self.profile}' active ({len(self.patterns)} patterns).")
+        except Exception as e:
+            print(f"Could not enable resource blocking: {e}")
+        return driver
+
+    def _read_traffic(self, driver, entries=None):
+        """Drain the performance log and summarize the network activity since the last call."""
+        try:
+            # Plus whatever the log still holds after a caller read it first
+            entries = (entries or []) + driver.get_log("performance")
+        except Exception:
+            return None
+        types = {}
+        stats = {"requests": 0, "blocked": 0, "bytes": 0, "saved_bytes": 0}
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                stats["requests"] += 1
+                types[params.get("requestId")] = params.get("type", "Other")
+            elif method == "Network.loadingFinished":
+                stats["bytes"] += int(params.get("encodedDataLength", 0))
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                stats["blocked"] += 1
+                resource_type = types.get(params.get("requestId")) or params.get("type", "Other")
+                stats["saved_bytes"] += TYPICAL_BYTES.get(resource_type, DEFAULT_TYPICAL_BYTES)
+        return stats
+
+    def page_report(self, driver, label="", entries=None):
+        """Print requests blocked, bytes transferred/saved and load time for the page just visited.
+
+        `entries` are performance log entries the caller already drained for its own use.
+        """
+        stats = self._read_traffic(driver, entries)
+        if stats is None:
+            return None
+        try:
+            stats["load_ms"] = int(driver.execute_script(
+                "var n = performance.getEntriesByType('navigation')[0];"
+                "return n ? n.loadEventEnd - n.startTime : 0;"
+            ) or 0)
+        except Exception:
+            stats["load_ms"] = 0
+        with self._lock:
+            self.totals["pages"] += 1
+            for key in ("requests", "blocked", "bytes", "saved_bytes", "load_ms"):
+                self.totals[key] += stats[key]
+        print(f"Traffic {label}: {stats['requests']} requests, {stats['blocked']} blocked, "
+              f"{_fmt_bytes(stats['bytes'])} transferred, ~{_fmt_bytes(stats['saved_bytes'])} saved, "
+              f"load {stats['load_ms']} ms")
+        return stats
+
+    def summary(self):
+        t = self.totals
+        pages = max(t["pages"], 1)
+        print(f"Resource blocking ({self.profile}) over {t['pages']} pages: {t['blocked']} of {t['requests']} "
+              f"requests blocked, {_fmt_bytes(t['bytes'])} transferred, ~{_fmt_bytes(t['saved_bytes'])} saved, "
+              f"average load {t['load_ms'] // pages} ms")
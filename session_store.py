@@ -0,0 +1,177 @@
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+from http_fetch import HttpFetcher
+
+DEFAULT_SESSION_FILE = os.path.join(".sessions", "medscape.json")
+DEFAULT_MAX_AGE = 14 * 24 * 3600
+
+# Where Medscape sends a browser that isn't logged in
+LOGIN_URL_MARKERS = ("login.medscape.com", "/login", "/signin")
+
+READ_LOCAL_STORAGE_JS = """
+var out = {};
+for (var i = 0; i < window.localStorage.length; i++) {
+    var key = window.localStorage.key(i);
+    out[key] = window.localStorage.getItem(key);
+}
+return out;
+"""
+
+WRITE_LOCAL_STORAGE_JS = """
+var items = arguments[0];
+for (var key in items) { window.localStorage.setItem(key, items[key]); }
+"""
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def looks_logged_out(url):
+    return any(marker in url for marker in LOGIN_URL_MARKERS)
+
+
+class SessionStore:
+    """Cookies and local storage of a logged-in browser, saved to disk for later runs.
+
+    After one manual login the session is written to `path`; later runs (and every extra
+    browser of a concurrent run) inject it instead of asking for the login again. Cookies
+    come with the consent cookie, so the OneTrust banner stays closed too. A saved session
+    older than `max_age` seconds, or one the site no longer accepts, is treated as missing.
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_FILE, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._data = None
+
+    def load(self):
+        """The saved session dict, or None when there is none or it has expired."""
+        if self._data is None:
+            if not os.path.exists(self.path):
+                return None
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read saved session {self.path}: {e}")
+                return None
+        if self.max_age and time.time() - self._data.get("saved_at", 0) > self.max_age:
+            return None
+        now = time.time()
+        cookies = [c for c in self._data.get("cookies", []) if not c.get("expires") or c["expires"] < 0 or c["expires"] > now]
+        if not cookies:
+            return None
+        return dict(self._data, cookies=cookies)
+
+    def save(self, driver):
+        """Write the browser's cookies (all domains) and the current origin's local storage."""
+        try:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        except Exception:
+            # Without CDP only the current domain's cookies are visible
+            cookies = [dict(c, expires=c.pop("expiry", -1)) for c in driver.get_cookies()]
+        local_storage = dict((self._data or {}).get("local_storage", {}))
+        try:
+            local_storage[_origin(driver.current_url)] = driver.execute_script(READ_LOCAL_STORAGE_JS)
+        except Exception as e:
+            print(f"⚠️ Could not read local storage: {e}")
+        self._data = {"saved_at": time.time(), "cookies": cookies, "local_storage": local_storage}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=1)
+        os.replace(tmp, self.path)
+        print(f"💾 Saved browser session to {self.path} ({len(cookies)} cookies)")
+
+    def restore(self, driver, url):
+        """Inject the saved session into a fresh browser and open url; False when there is nothing to inject."""
+        data = self.load()
+        if data is None:
+            return False
+        via_cdp = True
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            for c in data["cookies"]:
+                cookie = {k: c[k] for k in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite") if k in c}
+                if c.get("expires", -1) > 0:
+                    cookie["expires"] = c["expires"]
+                driver.execute_cdp_cmd("Network.setCookie", cookie)
+        except Exception:
+            via_cdp = False
+        driver.get(url)
+        if not via_cdp:
+            # Plain WebDriver can only set cookies for the page that is open
+            for c in data["cookies"]:
+                cookie = {k: c[k] for k in ("name", "value", "domain", "path", "secure", "httpOnly") if k in c}
+                try:
+                    driver.add_cookie(cookie)
+                except Exception:
+                    pass
+        items = data.get("local_storage", {}).get(_origin(url))
+        if items:
+            driver.execute_script(WRITE_LOCAL_STORAGE_JS, items)
+        if items or not via_cdp:
+            driver.refresh()
+        return True
+
+    def apply_to_http(self, session):
+        """Copy the saved cookies into a requests.Session; returns how many were set."""
+        data = self.load()
+        if data is None:
+            return 0
+        for c in data["cookies"]:
+            session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+        return len(data["cookies"])
+
+    def validate(self, url, timeout=10):
+        """Cheap check without a browser: does the site still accept the saved cookies for url?
+
+        Only a redirect to the login page or a 401 counts as invalid; challenge pages and
+        network errors can't be judged over plain HTTP, so the browser gets to try.
+        """
+        fetcher = HttpFetcher(timeout=timeout)
+        try:
+            if not self.apply_to_http(fetcher.session):
+                return False
+            result = fetcher.fetch(url)
+        finally:
+            fetcher.close()
+        if result is None:
+            return True
+        return result.status != 401 and not looks_logged_out(result.url)
+
+
+def resume_session(driver, store, url):
+    """Open url with the saved session when the site still accepts it.
+
+    Returns False (with url opened logged out) when there is no usable session, so the caller
+    can fall back to manual_login once popups are out of the way.
+    """
+    if store.load() is not None and store.validate(url) and store.restore(driver, url):
+        if not looks_logged_out(driver.current_url):
+            print(f"🔑 Reusing saved browser session from {store.path}")
+            return True
+    print("⚠️ No valid saved session.")
+    driver.get(url)
+    return False
+
+
+def manual_login(driver, store, prompt):
+    """Wait for a login in the browser window and save the session for the next run.
+
+    Unattended runs (no terminal) can't log in, so they carry on without one.
+    """
+    if not sys.stdin.isatty():
+        print("⚠️ No terminal for a manual login, continuing without one.")
+        return False
+    print(prompt)
+    input()
+    store.save(driver)
+    return True
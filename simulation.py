@@ -7,17 +7,31 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from page_probes import ProbeSession, COOKIE_BUTTON
+from resource_blocking import ResourceBlocker, enable_performance_logging
+from browser_startup import launch_chrome
+from session_store import SessionStore, resume_session, manual_login
+from rate_limit import AdaptiveRateLimiter
+from listing_scan import ListingScanner
+
+
+probes = ProbeSession()
+sessions = SessionStore()
+pacer = AdaptiveRateLimiter()
+blocker = ResourceBlocker("simulations")
 
 
 def accept_cookies_if_present(driver, wait):
     """Accept Medscape cookie popup if it appears"""
+    if probes.is_done(driver, "consent"):
+        return
+    if not probes.lookup(driver, "cookies", COOKIE_BUTTON, grace=probes.grace)["visible"]:
+        print("⚠️ No cookie popup found.")
+        return
     try:
-        accept_button = wait.until(
-            EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-        )
+        accept_button = wait.until(EC.element_to_be_clickable(COOKIE_BUTTON))
         accept_button.click()
+        probes.mark_done(driver, "consent")
         print("✅ Clicked cookie consent button.")
         time.sleep(1)
     except TimeoutException:
@@ -44,48 +58,15 @@ def simulate_human_behavior(driver):
 
 
 def collect_slideshows(driver, wait):
-    """Collect all slideshows across pagination"""
-    slideshows = []
-    seen_titles = set()
-
-    while True:
-        try:
-            wait.until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "li a.title"))
-            )
-        except TimeoutException:
-            break
+    """Collect all slideshows across pagination, reading only the entries each page adds"""
+    scanner = ListingScanner()
 
+    while scanner.wait_for_entries(wait):
         simulate_human_behavior(driver)
+        blocker.page_report(driver, "listing page")
 
-        blocks = driver.find_elements(By.CSS_SELECTOR, "li")
-        for block in blocks:
-            try:
-                title_el = block.find_element(By.CSS_SELECTOR, "a.title")
-                title = title_el.text.strip()
-                link = title_el.get_attribute("href")
-                teaser, date = "", ""
-
-                try:
-                    teaser = block.find_element(By.CSS_SELECTOR, "span.teaser").text.strip()
-                except:
-                    pass
-                try:
-                    date = block.find_element(By.CSS_SELECTOR, "div.byline").text.strip()
-                except:
-                    pass
-
-                if title and title not in seen_titles:
-                    slideshows.append({
-                        "title": title,
-                        "link": link,
-                        "teaser": teaser,
-                        "date": date
-                    })
-                    seen_titles.add(title)
-                    print(f"📌 Collected: {title}")
-            except:
-                continue
+        for item in scanner.scan(driver):
+            print(f"📌 Collected: {item['title']}")
 
         # pagination
         try:
@@ -95,41 +76,42 @@ def collect_slideshows(driver, wait):
                 button = driver.find_element(By.XPATH, "//a[text()='Next']")
 
             driver.execute_script("arguments[0].scrollIntoView(true);", button)
-            time.sleep(random.uniform(1, 2))
+            # The next page of results is a request to the site, so it waits for the host's pace
+            pacer.wait(driver.current_url)
             driver.execute_script("arguments[0].click();", button)
             print("👉 Clicked pagination button.")
-            time.sleep(random.uniform(2, 4))
         except:
             print("✅ No more pages found, finished.")
             break
 
-    return slideshows
+    scanner.summary()
+    return scanner.items
 
 
 def main():
     options = uc.ChromeOptions()
     options.add_argument('--ignore-certificate-errors')
     options.add_argument('--ignore-ssl-errors')
+    enable_performance_logging(options)
 
     try:
-        driver_path = ChromeDriverManager().install()
-        service = Service(driver_path)
-        driver = uc.Chrome(options=options, service=service, use_subprocess=True)
+        driver = launch_chrome(options, use_subprocess=True)
     except Exception as e:
         print(f"⚠️ Error setting up ChromeDriver: {e}")
         return
 
     driver.maximize_window()
+    blocker.attach(driver)
 
     url = "https://reference.medscape.com/sites/patient-simulations"
-    driver.get(url)
+    logged_in = resume_session(driver, sessions, url)
     wait = WebDriverWait(driver, 20)
 
     accept_cookies_if_present(driver, wait)
     remove_cookie_overlay(driver)
 
-    print("⏳ Please log in manually if required. Press ENTER in terminal when done...")
-    input()
+    if not logged_in:
+        manual_login(driver, sessions, "⏳ Please log in manually if required. Press ENTER in terminal when done...")
 
     slideshows = collect_slideshows(driver, wait)
     print(f"✅ Collected {len(slideshows)} simulations.")
@@ -147,6 +129,8 @@ def main():
         json.dump(slideshows, f, indent=4, ensure_ascii=False)
     print("💾 Data saved to medscape_simulation.json")
 
+    blocker.summary()
+    pacer.summary()
     driver.quit()
 
 
@@ -1,125 +1,272 @@
 import json
+import asyncio
+import argparse
+from functools import partial
 import time
-import random
 import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
+from page_probes import ProbeSession, POPUP_CLOSE
+from browser_startup import launch_chrome
+from resource_blocking import ResourceBlocker, enable_performance_logging
+from async_crawl import AsyncCrawler, BrowserBackend, collect
+from page_cache import PageCache, open_cached, remember_page
+from session_store import SessionStore, resume_session, manual_login
+from managed_driver import ManagedDriver, DriverStats
+from rate_limit import AdaptiveRateLimiter
+from page_check import PageRejected, RetryQueue, OK, LOGIN_WALL
 
 # Load JSON file with article links
 with open("medscape_simulation.json", "r", encoding="utf-8") as f:
     articles_list = json.load(f)
 
+probes = ProbeSession()
+sessions = SessionStore()
+blocker = ResourceBlocker("simulation-charts")
+# Paces chart requests per host from how the site is responding
+pacer = AdaptiveRateLimiter()
+# Charts that loaded a challenge, login or error page, tried again after a backoff
+rejected_articles = RetryQueue()
+
 def close_popups(driver, wait):
     """Close pop-ups if present"""
+    # One short probe instead of waiting out the full timeout on pages without a popup
+    if not probes.lookup(driver, "popup_close", POPUP_CLOSE, grace=probes.grace)["visible"]:
+        return
     try:
-        close_btn = wait.until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label='Close Patient Chart'], .popup-close, .modal-close"))
-        )
+        close_btn = wait.until(EC.element_to_be_clickable(POPUP_CLOSE))
         close_btn.click()
         time.sleep(1)
         print("✅ Closed popup.")
     except TimeoutException:
         pass
 
+# Every right-hand, then left-hand chart section in one call: its title, its first table
+# (header texts plus the cell texts of each later row) and its paragraph texts. Text is only
+# read from rendered nodes, like WebElement.text (innerText of a hidden node is its textContent).
+CHART_SECTIONS_JS = r"""
+function text(el) {
+    if (!el.getClientRects().length) { return ""; }
+    return (el.innerText || "").trim();
+}
+var sections = [];
+[".info-section.css-1i2ky5l", ".chart-content .info-section"].forEach(function (selector) {
+    document.querySelectorAll(selector).forEach(function (section) {
+        var title = section.querySelector(".info-title, .info-subtitle");
+        var table = section.querySelector("table");
+        var rows = null;
+        if (table) {
+            rows = [];
+            table.querySelectorAll("tr").forEach(function (tr, i) {
+                var cells = tr.querySelectorAll(i === 0 ? "th" : "td");
+                rows.push(Array.prototype.map.call(cells, text));
+            });
+        }
+        sections.push({
+            title: title ? text(title) : null,
+            rows: rows,
+            paragraphs: Array.prototype.map.call(section.querySelectorAll("p"), text)
+        });
+    });
+});
+return sections;
+"""
+
 def get_section_content(section):
-    """Extract text or table from a section"""
-    try:
-        title_elem = section.find_element(By.CSS_SELECTOR, ".info-title, .info-subtitle")
-        title = title_elem.text.strip()
-        if "Tests" in title:
-            return None, None
-    except NoSuchElementException:
+    """Title and table or text of one serialized section; (None, None) for "Tests" and untitled sections"""
+    title = section["title"]
+    if not title or "Tests" in title:
         return None, None
 
-    # Try extracting table first
-    try:
-        table = section.find_element(By.TAG_NAME, "table")
-        rows = table.find_elements(By.TAG_NAME, "tr")
-        if not rows:
-            return title, None
-        headers = [th.text.strip() for th in rows[0].find_elements(By.TAG_NAME, "th")]
-        table_data = []
-        for row in rows[1:]:
-            cells = row.find_elements(By.TAG_NAME, "td")
-            if len(cells) != len(headers):
-                # Skip malformed rows
-                continue
-            row_data = {headers[i]: cells[i].text.strip() for i in range(len(cells))}
-            table_data.append(row_data)
-        if table_data:
-            return title, table_data
-        else:
-            # Table exists but empty, fallback to paragraphs
-            raise NoSuchElementException
-    except NoSuchElementException:
-        # Extract paragraphs
-        paragraphs = section.find_elements(By.TAG_NAME, "p")
-        text = "\n".join([p.text.strip() for p in paragraphs if p.text.strip()])
-        if text:
-            return title, text
+    if section["rows"] == []:
+        # A table without rows leaves the section empty rather than falling back to its text
+        return title, None
+    # Both forms are read from data already serialized, so trying the table first costs nothing
+    result = _section_table(section)
+    if result is None:
+        result = _section_paragraphs(section)
+    if result is None:
         return None, None
+    return title, result
+
+
+def _section_table(section):
+    rows = section["rows"]
+    if not rows:
+        return None
+    headers = rows[0]
+    table_data = []
+    for cells in rows[1:]:
+        if len(cells) != len(headers):
+            # Skip malformed rows
+            continue
+        table_data.append(dict(zip(headers, cells)))
+    return table_data or None
+
 
+def _section_paragraphs(section):
+    text = "\n".join([p for p in section["paragraphs"] if p])
+    return text or None
 
-def scrape_article(driver, article):
-    driver.get(article['link'])
-    time.sleep(random.uniform(2, 4))
 
-    wait = WebDriverWait(driver, 10)
-    close_popups(driver, wait)
+def scrape_article(driver, article, cache=None):
+    from_cache, verdict = open_cached(driver, cache, article['link'], pacer)
+    if verdict != OK:
+        raise PageRejected(article['link'], verdict)
+    if not from_cache:
+        wait = WebDriverWait(driver, 10)
+        close_popups(driver, wait)
 
     content = {}
 
-    # Right sections
+    # Right sections, then left sections, all read in one round trip
     try:
-        right_sections = driver.find_elements(By.CSS_SELECTOR, ".info-section.css-1i2ky5l")
-        for section in right_sections:
+        for section in driver.execute_script(CHART_SECTIONS_JS):
             title, data = get_section_content(section)
             if title and data:
                 content[title] = data
     except Exception as e:
-        print(f"⚠️ Error scraping right section: {e}")
+        print(f"⚠️ Error scraping chart sections: {e}")
 
-    # Left sections
-    try:
-        left_sections = driver.find_elements(By.CSS_SELECTOR, ".chart-content .info-section")
-        for section in left_sections:
-            title, data = get_section_content(section)
-            if title and data:
-                content[title] = data
-    except Exception as e:
-        print(f"⚠️ Error scraping left section: {e}")
+    if not from_cache:
+        blocker.page_report(driver, article['link'])
+        if content:
+            remember_page(driver, cache, article['link'])
 
     article_data = article.copy()
     article_data['content'] = content
     return article_data
 
-def main():
+SITE_URL = "https://reference.medscape.com"
+
+def create_driver(headless=False):
     options = uc.ChromeOptions()
     options.add_argument('--ignore-certificate-errors')
     options.add_argument('--ignore-ssl-errors')
-    driver = uc.Chrome(options=options)
+    if headless:
+        options.add_argument('--window-size=1920,1080')
+    enable_performance_logging(options)
+    driver = launch_chrome(options, headless=headless)
     driver.maximize_window()
+    blocker.attach(driver)
+    return driver
 
-    print("⏳ Please log in manually and complete human verification. Press ENTER here when done...")
-    input()
-
-    scraped_articles = []
-    for idx, article in enumerate(articles_list, 1):
-        print(f"⏳ Scraping article {idx}/{len(articles_list)}: {article['title']}")
+def copy_login(source, target, url=SITE_URL):
+    """Give another browser the logged-in cookies of `source`"""
+    target.get(url)
+    for cookie in source.get_cookies():
         try:
-            data = scrape_article(driver, article)
+            target.add_cookie(cookie)
+        except Exception:
+            pass
+    target.refresh()
+
+def scrape_concurrently(drivers, args, cache=None):
+    """Scrape articles_list with the asyncio engine, one browser slot per ManagedDriver"""
+    order = {article['link']: i for i, article in enumerate(articles_list)}
+    scraped = []
+
+    def on_result(article, data, error):
+        if isinstance(error, PageRejected):
+            print(f"🚫 {article['title']} loaded a {error.verdict} page")
+            rejected_articles.push(article, error.verdict)
+            return
+        if error is not None:
+            print(f"⚠️ Failed to scrape {article['link']}: {error}")
+            return
+        scraped.append(data)
+        print(f"✅ Scraped {len(scraped)}/{len(articles_list)}: {article['title']}")
+
+    backend = BrowserBackend(drivers, lambda managed, article: managed.run(scrape_article, article, cache))
+    # scrape_article loads through the adaptive pacer, which --rate starts at; a second limiter here
+    # would cap the crawl at whichever of the two is slower
+    pacer.initial_delay = 1 / args.rate
+    crawler = AsyncCrawler(backend, concurrency=len(drivers), per_host=len(drivers), rate=None)
+    asyncio.run(collect(crawler, articles_list, on_result))
+    scraped.sort(key=lambda a: order.get(a['link'], len(order)))
+    return scraped
+
+def scrape_or_queue(managed, article, cache=None):
+    """Chart data of one article, or None when it failed or was queued for a retry"""
+    try:
+        return managed.run(scrape_article, article, cache)
+    except PageRejected as e:
+        print(f"🚫 {article['title']} loaded a {e.verdict} page")
+        if e.verdict == LOGIN_WALL:
+            sessions.restore(managed.driver, SITE_URL)
+        rejected_articles.push(article, e.verdict)
+    except Exception as e:
+        print(f"⚠️ Failed to scrape {article['link']}: {e}")
+    return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape Medscape patient simulation charts.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of browsers fetching charts at once through the asyncio engine")
+    parser.add_argument("--rate", type=float, default=0.5,
+                        help="page loads per second per host to start from in concurrent mode (the pacer adapts it)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore the on-disk page cache and load every chart from the site")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the browsers headless with the saved login session (log in once without it first)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.headless and sessions.load() is None:
+        print("⚠️ No saved login session for a headless run. Run once without --headless to log in.")
+        return
+    cache = None if args.no_cache else PageCache()
+    driver = create_driver(args.headless)
+
+    if not resume_session(driver, sessions, SITE_URL):
+        manual_login(driver, sessions, "⏳ Please log in manually and complete human verification. Press ENTER here when done...")
+
+    # Browsers are recycled every few hundred charts and restarted with the saved login after a crash
+    driver_stats = DriverStats()
+    relaunch = partial(create_driver, args.headless)
+    restore_login = partial(sessions.restore, url=SITE_URL)
+    managed = ManagedDriver(relaunch, setup=restore_login, driver=driver, pass_wait=False, stats=driver_stats)
+
+    if args.concurrency > 1:
+        drivers = [managed]
+        for _ in range(args.concurrency - 1):
+            extra = create_driver(args.headless)
+            if not sessions.restore(extra, SITE_URL):
+                copy_login(driver, extra)
+            drivers.append(ManagedDriver(relaunch, setup=restore_login, driver=extra, pass_wait=False, stats=driver_stats))
+        scraped_articles = scrape_concurrently(drivers, args, cache)
+        for extra in drivers[1:]:
+            extra.quit()
+    else:
+        scraped_articles = []
+        for idx, article in enumerate(articles_list, 1):
+            print(f"⏳ Scraping article {idx}/{len(articles_list)}: {article['title']}")
+            data = scrape_or_queue(managed, article, cache)
+            if data is not None:
+                scraped_articles.append(data)
+
+    # Rejected pages get another go once their backoff is up; rejected again means requeued
+    for article, attempts in rejected_articles.drain():
+        print(f"⏳ Retrying {article['title']} after {attempts} rejected load(s)")
+        data = scrape_or_queue(managed, article, cache)
+        if data is not None:
             scraped_articles.append(data)
-        except Exception as e:
-            print(f"⚠️ Failed to scrape {article['link']}: {e}")
-        time.sleep(random.uniform(2, 4))  # small delay between requests
+    order = {article['link']: i for i, article in enumerate(articles_list)}
+    scraped_articles.sort(key=lambda a: order.get(a['link'], len(order)))
 
     # Save JSON
     with open("medscape_simulations_detail.json", "w", encoding="utf-8") as f:
         json.dump(scraped_articles, f, indent=4, ensure_ascii=False)
 
-    driver.quit()
+    blocker.summary()
+    pacer.summary()
+    rejected_articles.summary()
+    driver_stats.summary()
+    if cache is not None:
+        cache.summary()
+    managed.quit()
     print("✅ Scraping complete! Data saved to scraped_articles.json")
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import gzip
+import io
+import os
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlsplit
+from lxml import html as lxml_html
+from http_fetch import HttpFetcher
+from page_cache import canonical_url
+
+_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+_HEAD = f"//div[{_CLASS.format('topic-head')}]"
+# Category headings, the link lists that follow them and the links of their subsections, in
+# document order; nothing else on the page (navigation, footer, "related" blocks) is read
+OUTLINE_XPATH = (
+    f"{_HEAD}"
+    f" | {_HEAD}/following-sibling::ul/li/a[@href]"
+    f" | {_HEAD}/following-sibling::div[{_CLASS.format('topic-subsection')}]//ul//a[@href]"
+)
+SUBSECTION_HEAD_XPATH = (
+    f"ancestor::div[{_CLASS.format('topic-subsection')}][1]//div[{_CLASS.format('topic-subhead')}]"
+)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(el):
+    return " ".join(el.text_content().split())
+
+
+def _open(source, fetcher=None, pacer=None):
+    """Binary stream of a local sitemap file or URL; gzipped sitemaps are inflated on the fly."""
+    if "://" not in source:
+        stream = open(source, "rb")
+    else:
+        fetcher = fetcher or HttpFetcher()
+        if pacer is not None:
+            pacer.wait(source)
+        resp = fetcher.session.get(source, stream=True, timeout=fetcher.timeout)
+        if pacer is not None:
+            pacer.record(source, status=resp.status_code, channel="http")
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        # urllib3 closes the response once Content-Length bytes are read, which would close a
+        # small sitemap under the buffered reader as soon as peek() below has read it all
+        resp.raw.auto_close = False
+        stream = io.BufferedReader(resp.raw)
+    # .xml.gz files are often served without Content-Encoding, so look at the bytes, not the name
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap(source, fetcher=None, pacer=None, follow=None):
+    """Yield (loc, lastmod) for every <url> of a sitemap, descending into sitemap indexes.
+
+    The XML is parsed incrementally and each entry is dropped once read, so memory stays flat
+    however large the sitemap is. `follow` (a regex) limits which child sitemaps of an index
+    are opened; relative child paths resolve against the parent file or URL.
+    """
+    children = []
+    with _open(source, fetcher, pacer) as stream:
+        root = None
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            kind = _local(elem.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            fields = {_local(child.tag): (child.text or "").strip() for child in elem}
+            loc = fields.get("loc")
+            if loc and kind == "sitemap":
+                children.append(loc)
+            elif loc:
+                yield loc, fields.get("lastmod")
+            root.clear()
+
+    for child in children:
+        if follow and not re.search(follow, child):
+            continue
+        if "://" in source:
+            child = urljoin(source, child)
+        elif "://" not in child:
+            child = os.path.join(os.path.dirname(source), child)
+        yield from iter_sitemap(child, fetcher, pacer, follow)
+
+
+def index_links(page_html, base_url, pattern=None):
+    """{"category", "subcategory", "title", "link"} for every link of a guide index page, in page order.
+
+    The index ships all of its links in the HTML, collapsed under div.topic-head categories
+    (and div.topic-subhead headings of div.topic-subsection blocks), so one lxml pass over
+    the page source replaces clicking every category open. Links are absolute and
+    de-duplicated on their canonical URL; `pattern` (a regex) keeps only matching ones.
+    """
+    tree = lxml_html.fromstring(page_html)
+    matcher = re.compile(pattern) if pattern else None
+    records = []
+    seen = set()
+    category = None
+    for el in tree.xpath(OUTLINE_XPATH):
+        if el.tag != "a":
+            category = _text(el)
+            continue
+        title = _text(el)
+        if category is None or not title:
+            continue
+        link = urljoin(base_url, el.get("href"))
+        if matcher is not None and not matcher.search(link):
+            continue
+        if canonical_url(link) in seen:
+            continue
+        seen.add(canonical_url(link))
+        subhead = el.xpath(SUBSECTION_HEAD_XPATH)
+        records.append({"category": category, "subcategory": _text(subhead[0]) if subhead else "",
+                        "title": title, "link": link})
+    return records
+
+
+def index_outline(page_html, base_url):
+    """{canonical url: (category, subcategory, title)} for every link on a guide index page."""
+    return {canonical_url(r["link"]): (r["category"], r["subcategory"], r["title"])
+            for r in index_links(page_html, base_url)}
+
+
+def _title_from_url(url):
+    slug = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+    return re.sub(r"^\d+-", "", slug).replace("-", " ").strip().title()
+
+
+def discover_links(sitemaps, pattern, outline, fetcher=None, pacer=None, follow=None, include_unmapped=False):
+    """Links from the sitemaps whose URL matches `pattern`, mapped to their index category.
+
+    Returns {"category", "subcategory", "title", "link"} records in index order. URLs that
+    are not on the index are skipped unless include_unmapped, in which case they follow
+    with an empty category and a title made from the URL.
+    """
+    matcher = re.compile(pattern)
+    position = {url: i for i, url in enumerate(outline)}
+    mapped, unmapped, seen = [], [], set()
+    scanned = 0
+    for source in sitemaps:
+        for loc, _ in iter_sitemap(source, fetcher, pacer, follow):
+            scanned += 1
+            key = canonical_url(loc)
+            if key in seen or not matcher.search(loc):
+                continue
+            seen.add(key)
+            if key in outline:
+                category, subcategory, title = outline[key]
+                mapped.append((position[key], {"category": category, "subcategory": subcategory,
+                                               "title": title, "link": loc}))
+            elif include_unmapped:
+                unmapped.append({"category": "", "subcategory": "", "title": _title_from_url(loc), "link": loc})
+
+    missing = sum(1 for url in outline if matcher.search(url) and url not in seen)
+    print(f"Sitemaps: {scanned} URLs scanned, {len(seen)} matched, {len(mapped)} on the index, "
+          f"{len(seen) - len(mapped)} not on it ({'kept' if include_unmapped else 'skipped'}), "
+          f"{missing} index links not in the sitemaps")
+    mapped.sort(key=lambda pair: pair[0])
+    return [record for _, record in mapped] + unmapped
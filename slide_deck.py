@@ -0,0 +1,164 @@
+import json
+import re
+import threading
+
+# Everything a deck page may already hold about all of its slides, in one round trip: the JSON
+# it was rendered from and every slide element present in the DOM (hidden ones included)
+DECK_JS = r"""
+var payloads = [];
+document.querySelectorAll('script[type="application/json"], script[type="application/ld+json"]').forEach(function (s) {
+    payloads.push(s.textContent);
+});
+arguments[0].forEach(function (name) {
+    try { if (window[name]) { payloads.push(JSON.stringify(window[name])); } } catch (e) {}
+});
+
+function clean(el) { return el ? el.textContent.replace(/\s+/g, " ").trim() : ""; }
+function absolute(src) { try { return src ? new URL(src, location.href).href : ""; } catch (e) { return src; } }
+
+var slides = [];
+var seen = [];
+document.querySelectorAll("div.crs-slide__copy").forEach(function (copy) {
+    // The slide is the nearest ancestor that also holds the figure
+    var slide = copy.parentElement;
+    while (slide && slide !== document.body && !slide.querySelector("figure")) { slide = slide.parentElement; }
+    if (!slide || slide === document.body || seen.indexOf(slide) !== -1) { return; }
+    seen.push(slide);
+    var img = slide.querySelector("figure img.crs-slide_image, figure img");
+    var heading = slide.querySelector(".crs-slide__title, .crs-slide_title, h1, h2, h3");
+    var paras = [];
+    copy.querySelectorAll("p").forEach(function (p) { var t = clean(p); if (t) { paras.push(t); } });
+    slides.push({
+        heading: clean(heading),
+        image_url: img ? absolute(img.getAttribute("data-src") || img.currentSrc || img.getAttribute("src")) : "",
+        caption: clean(slide.querySelector("figure figcaption cite.crs-slide_credit, figure figcaption")),
+        text: paras.join(" ")
+    });
+});
+var header = document.querySelector("h1.crs-header__title, h2.crs-header__title");
+return {payloads: payloads, slides: slides, header: clean(header)};
+"""
+
+STATE_GLOBALS = ("__NEXT_DATA__", "__INITIAL_STATE__", "__PRELOADED_STATE__", "slideshowData", "slideData")
+
+HEADING_KEYS = ("heading", "title", "headline", "slideTitle")
+IMAGE_KEYS = ("image_url", "imageUrl", "imageSrc", "image", "img", "contentUrl", "src", "url")
+CAPTION_KEYS = ("caption", "credit", "imageCredit", "imageCaption")
+TEXT_KEYS = ("text", "body", "copy", "content", "description")
+_TAG = re.compile(r"<[^>]+>")
+
+
+def _clean(value):
+    return " ".join(_TAG.sub(" ", value).split()) if isinstance(value, str) else ""
+
+
+def _first(d, keys):
+    for key in keys:
+        value = d.get(key)
+        if isinstance(value, dict):
+            # {"image": {"url": ..., "caption": ...}} style nesting
+            value = _first(value, ("url", "src", "href"))
+        if isinstance(value, str) and value.strip():
+            return value
+    return ""
+
+
+def _image_of(d):
+    image = _first(d, IMAGE_KEYS)
+    return image if re.search(r"\.(jpe?g|png|gif|webp|svg)(\?|$)|/image", image, re.I) else ""
+
+
+def _is_slide(d):
+    return isinstance(d, dict) and bool(_first(d, HEADING_KEYS) or _first(d, TEXT_KEYS))
+
+
+def normalize_slide(d):
+    caption = _first(d, CAPTION_KEYS)
+    image = d.get("image")
+    if not caption and isinstance(image, dict):
+        caption = _first(image, CAPTION_KEYS)
+    return {
+        "heading": _clean(_first(d, HEADING_KEYS)),
+        "image_url": _image_of(d),
+        "caption": _clean(caption),
+        "text": _clean(_first(d, TEXT_KEYS)),
+    }
+
+
+def slides_from_payload(data):
+    """The largest list in a JSON document that reads as slides, as heading/image_url/caption/text
+    records; None if none does.
+
+    A slide list is mostly headed or texted entries, at least half of them with an image and at
+    least half with copy, which keeps "related slideshows" teasers (title + thumbnail) out.
+    """
+    best = None
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+            hits = [d for d in node if _is_slide(d)]
+            if len(hits) < 2 or len(hits) < 0.8 * len(node):
+                continue
+            with_image = sum(1 for d in hits if _image_of(d))
+            with_copy = sum(1 for d in hits if _first(d, TEXT_KEYS))
+            if with_image * 2 >= len(hits) and with_copy * 2 >= len(hits):
+                if best is None or len(hits) > len(best):
+                    best = hits
+    return [normalize_slide(d) for d in best] if best else None
+
+
+class DeckReader:
+    """Reads every slide of a deck at once instead of paging through it.
+
+    read(driver) makes one script call: the deck JSON the page ships (inline JSON scripts and
+    state globals) is preferred, then the slide elements already in the DOM when there is more
+    than one. It returns None when neither has the deck, so the caller pages through it.
+    """
+
+    def __init__(self):
+        self.stats = {"payload": 0, "dom": 0, "clicked": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def read(self, driver):
+        try:
+            found = driver.execute_script(DECK_JS, list(STATE_GLOBALS)) or {}
+        except Exception as e:
+            print(f"⚠️ Could not read the deck data: {e}")
+            return None
+
+        best = None
+        for text in found.get("payloads", []):
+            try:
+                slides = slides_from_payload(json.loads(text))
+            except (TypeError, ValueError):
+                continue
+            if slides and (best is None or len(slides) > len(best)):
+                best = slides
+        if best:
+            self._count("payload")
+            return best
+
+        slides = found.get("slides", [])
+        # The first slide's title is often only in the page header; the others need their own
+        if len(slides) > 1 and all(s["heading"] for s in slides[1:]):
+            if not slides[0]["heading"]:
+                slides[0]["heading"] = found.get("header", "")
+            self._count("dom")
+            return slides
+        return None
+
+    def clicked(self):
+        self._count("clicked")
+
+    def summary(self):
+        s = self.stats
+        print(f"Decks: {s['payload']} read from the page data, {s['dom']} from the slide DOM, "
+              f"{s['clicked']} paged through")
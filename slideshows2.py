@@ -1,4 +1,7 @@
 import json
+import asyncio
+import argparse
+from functools import partial
 import time
 import random
 import undetected_chromedriver as uc
@@ -6,15 +9,58 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from browser_startup import launch_chrome
+from resource_blocking import ResourceBlocker, enable_performance_logging
+from async_crawl import AsyncCrawler, BrowserBackend, collect
+from session_store import SessionStore, resume_session, manual_login
+from managed_driver import ManagedDriver, DriverStats, BrowserLost
+from rate_limit import AdaptiveRateLimiter
+from page_check import PageRejected, RetryQueue, OK, LOGIN_WALL
+from slide_deck import DeckReader
+from page_cache import PageCache, render_snapshot, remember_page
+from driver_calls import skip_page_count
 
 INPUT_FILE = "medscape_slideshows.json"
 OUTPUT_FILE = "slideshows_with_slides.json"
 MAX_RETRIES = 3
 
-CHROME_PROFILE_PATH = r"C:\Users\Mandegar\AppData\Local\Google\Chrome\User Data\Default"
+SITE_URL = "https://www.medscape.com"
 PROFILE_DIRECTORY = "Default"
 
-def extract_slides(driver):
+sessions = SessionStore()
+
+# Slide images are part of the output, so decks keep them and only drop ads, fonts and media
+blocker = ResourceBlocker("slideshow-decks")
+# Paces deck loads per host from how the site is responding
+pacer = AdaptiveRateLimiter()
+# Decks that loaded as a challenge, login or error page, tried again after a backoff
+rejected_shows = RetryQueue()
+# Whole decks from the data the page ships, instead of one click per slide
+deck_reader = DeckReader()
+
+def extract_slides(driver, cache=None, url=None):
+    """Every slide of the open deck; pages through it only when the page doesn't carry the whole deck"""
+    slides = deck_reader.read(driver)
+    if slides:
+        # The page alone gives the deck back, so a cached copy is as good as the next visit
+        remember_page(driver, cache, url)
+        return slides
+    deck_reader.clicked()
+    return page_through_slides(driver)
+
+def read_cached_deck(driver, cache, show):
+    """Slides of a cached deck page shown in the browser; None when there is no entry or it
+    doesn't hold the whole deck"""
+    cached = cache.get(show["link"]) if cache is not None else None
+    if cached is None:
+        return None
+    render_snapshot(driver, show["link"], cached.html)
+    slides = deck_reader.read(driver)
+    if slides:
+        skip_page_count()
+    return slides
+
+def page_through_slides(driver):
     slides = []
     last_heading = None
     last_page_num = None
@@ -104,7 +150,86 @@ def save_progress(results):
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=4, ensure_ascii=False)
 
+def create_driver(profile_path=None, headless=False):
+    options = uc.ChromeOptions()
+    if profile_path:
+        options.add_argument(f"--user-data-dir={profile_path}")
+        options.add_argument(f"--profile-directory={PROFILE_DIRECTORY}")
+    if headless:
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("--start-maximized")
+    enable_performance_logging(options)
+    driver = launch_chrome(options, headless=headless)
+    blocker.attach(driver)
+    return driver
+
+def copy_login(source, target, url=SITE_URL):
+    """Give a profile-less browser the cookies of the first browser (a profile can only be open once)"""
+    target.get(url)
+    for cookie in source.get_cookies():
+        try:
+            target.add_cookie(cookie)
+        except Exception:
+            pass
+
+def scrape_show(driver, show, cache=None):
+    """Open one slideshow and extract its slides, retrying on timeouts; None if every attempt failed"""
+    slides = read_cached_deck(driver, cache, show)
+    if slides:
+        show["slides"] = slides
+        print(f"📦 Read {len(slides)} slides of {show['title']} from the page cache")
+        return show
+    retries = 0
+    while retries < MAX_RETRIES:
+        try:
+            url = show["link"]
+            print(f"🔗 Opening: {url}")
+            verdict = pacer.get(driver, url)
+            if verdict != OK:
+                raise PageRejected(url, verdict)
+
+            WebDriverWait(driver, 20).until(
+                EC.visibility_of_element_located((By.CSS_SELECTOR, "h1.crs-header__title, h2.crs-header__title"))
+            )
+
+            slides = extract_slides(driver, cache, url)
+            show["slides"] = slides
+            print(f"✅ Extracted {len(slides)} slides from {show['title']}")
+            blocker.page_report(driver, show['title'])
+            return show
+
+        except TimeoutException:
+            retries += 1
+            print(f"⚠️ Timeout on {show['title']}, retry {retries}/{MAX_RETRIES}")
+            # Counts as trouble, so the next attempt waits for a longer backoff
+            pacer.record(show["link"], ok=False)
+        except PageRejected as e:
+            # Waiting for the header would only time out; come back to it later instead
+            print(f"🚫 {show['title']} loaded a {e.verdict} page")
+            if e.verdict == LOGIN_WALL:
+                sessions.restore(driver, SITE_URL)
+            rejected_shows.push(show, e.verdict)
+            return None
+    return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract slides from Medscape slideshows.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of browsers extracting decks at once through the asyncio engine")
+    parser.add_argument("--rate", type=float, default=0.5,
+                        help="deck loads per second per host to start from in concurrent mode (the pacer adapts it)")
+    parser.add_argument("--chrome-profile",
+                        help="Chrome user data directory that is already logged in (instead of the saved session)")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the browsers headless with the saved login session (log in once without it first)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore the on-disk page cache and load every deck from the site")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+
     # Load JSON
     with open(INPUT_FILE, "r", encoding="utf-8") as f:
         slideshows = json.load(f)
@@ -116,39 +241,85 @@ def main():
 
     # Overwrite old output to start fresh
     results = []
+    order = {show["link"]: i for i, show in enumerate(slideshows)}
+    cache = None if args.no_cache else PageCache()
+
+    if args.headless and not args.chrome_profile and sessions.load() is None:
+        print("⚠️ No saved login session for a headless run. Run once without --headless to log in.")
+        return
 
     # Setup Chrome
-    options = uc.ChromeOptions()
-    options.add_argument(f"--user-data-dir={CHROME_PROFILE_PATH}")
-    options.add_argument(f"--profile-directory={PROFILE_DIRECTORY}")
-    options.add_argument("--start-maximized")
-    driver = uc.Chrome(options=options)
+    driver = create_driver(args.chrome_profile, args.headless)
+    if args.chrome_profile:
+        # The profile is logged in already; save its session for the other browsers and later runs
+        driver.get(SITE_URL)
+        sessions.save(driver)
+    elif not resume_session(driver, sessions, SITE_URL):
+        manual_login(driver, sessions, "⏳ Please log in manually in the browser. Press ENTER here when done...")
 
-    for show in slideshows:
-        retries = 0
-        while retries < MAX_RETRIES:
-            try:
-                url = show["link"]
-                print(f"🔗 Opening: {url}")
-                driver.get(url)
+    # Browsers are recycled every few hundred decks and restarted with the saved login after a crash
+    driver_stats = DriverStats()
+    relaunch = partial(create_driver, headless=args.headless)
+    restore_login = partial(sessions.restore, url=SITE_URL)
+    managed = ManagedDriver(relaunch, setup=restore_login, driver=driver, pass_wait=False, stats=driver_stats)
 
-                WebDriverWait(driver, 20).until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, "h1.crs-header__title, h2.crs-header__title"))
-                )
+    if args.concurrency > 1:
+        drivers = [managed]
+        for _ in range(args.concurrency - 1):
+            extra = create_driver(headless=args.headless)
+            if not sessions.restore(extra, SITE_URL):
+                copy_login(driver, extra)
+            drivers.append(ManagedDriver(relaunch, setup=restore_login, driver=extra, pass_wait=False, stats=driver_stats))
 
-                slides = extract_slides(driver)
-                show["slides"] = slides
-                results.append(show)
+        def on_result(show, data, error):
+            if error is not None:
+                print(f"⚠️ Failed on {show['title']}: {error}")
+            elif data is not None:
+                results.append(data)
                 save_progress(results)
-                print(f"✅ Extracted {len(slides)} slides from {show['title']}")
-                break
 
-            except TimeoutException:
-                retries += 1
-                print(f"⚠️ Timeout on {show['title']}, retry {retries}/{MAX_RETRIES}")
-                time.sleep(random.uniform(3, 6))
+        backend = BrowserBackend(drivers, lambda slot, show: slot.run(scrape_show, show, cache))
+        # scrape_show loads through the adaptive pacer, which --rate starts at; a second limiter here
+        # would cap the crawl at whichever of the two is slower
+        pacer.initial_delay = 1 / args.rate
+        crawler = AsyncCrawler(backend, concurrency=len(drivers), per_host=len(drivers), rate=None)
+        asyncio.run(collect(crawler, slideshows, on_result))
+        for extra in drivers[1:]:
+            extra.quit()
+    else:
+        for show in slideshows:
+            try:
+                data = managed.run(scrape_show, show, cache)
+            except BrowserLost as e:
+                print(f"⚠️ Failed on {show['title']}: {e}")
+                continue
+            if data is not None:
+                results.append(data)
+                save_progress(results)
+
+    # Decks rejected again are pushed back by scrape_show until they run out of attempts
+    for show, attempts in rejected_shows.drain():
+        print(f"🔁 Retrying {show['title']} after {attempts} rejected load(s)")
+        try:
+            data = managed.run(scrape_show, show, cache)
+        except BrowserLost as e:
+            print(f"⚠️ Failed on {show['title']}: {e}")
+            continue
+        if data is not None:
+            results.append(data)
+            save_progress(results)
+    # Concurrent decks and retried ones finish out of order; the output keeps the input's
+    results.sort(key=lambda show: order.get(show["link"], len(order)))
+    save_progress(results)
 
-    driver.quit()
+    blocker.summary()
+    pacer.summary()
+    rejected_shows.summary()
+    deck_reader.summary()
+    driver_stats.summary()
+    if cache is not None:
+        cache.summary()
+    managed.quit()
     print(f"🎉 Finished! Data saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
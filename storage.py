@@ -0,0 +1,87 @@
+import csv
+import json
+import os
+
+
+def _dedup_preserve(seq):
+    seen = set()
+    out = []
+    for x in seq:
+        if x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+
+class JsonlWriter:
+    """Append-only writer: one JSON record per line, flushed as soon as it is written."""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.count = 0
+        self._f = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record):
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self.count += 1
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_jsonl(path):
+    """Yield records from a JSONL file, skipping a truncated last line left by a crash."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping malformed line in {path}")
+
+
+def flatten_article_row(row, body_field):
+    """Flatten an article record (References as {"citation", "urls"} dicts) into one CSV row."""
+    flat_citations = " || ".join([r["citation"] for r in row.get("References", [])])
+    # flatten all URLs from all references
+    all_urls = []
+    for r in row.get("References", []):
+        all_urls.extend(r.get("urls", []))
+    return {
+        "title": row["title"],
+        "link": row["link"],
+        body_field: row.get(body_field, ""),
+        "Images": " ; ".join(row.get("Images", [])),
+        "References": flat_citations,
+        "ReferenceURLs": " ; ".join(_dedup_preserve(all_urls))
+    }
+
+
+def finalize_outputs(jsonl_path, json_path, csv_path, body_field):
+    """Build the pretty JSON and the flattened CSV once from the JSONL stream."""
+    records = list(read_jsonl(jsonl_path))
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=4)
+
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        fieldnames = ["title", "link", body_field, "Images", "References", "ReferenceURLs"]
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in records:
+            writer.writerow(flatten_article_row(row, body_field))
+
+    print(f"Finalized {len(records)} records into {json_path} and {csv_path}")
+    return records
@@ -0,0 +1,121 @@
+import json
+import os
+import random
+import threading
+import time
+
+
+class StrategyCache:
+    """Learns which extraction strategy works for a kind of page and tries it first.
+
+    Each (key, strategy) pair keeps an exponentially decayed success score, so recent pages
+    weigh most and the order adapts when the site template changes. A success of the
+    learned-first strategy is returned straight away, skipping the strategies the given
+    order puts before it. Since those might have succeeded too (and the given order prefers
+    them), a `verify` share of such skips still runs them: when one succeeds its result is
+    returned and the disagreement is counted and learned from. With probability `explore`
+    the given order is used outright, so a strategy that fell behind gets re-tested. Scores
+    and what failing strategies cost can be persisted to a JSON file between runs.
+    """
+
+    def __init__(self, decay=0.8, explore=0.05, verify=0.05, path=None):
+        self.decay = decay
+        self.explore = explore
+        self.verify = verify
+        self.path = path
+        self.scores = {}
+        self.failure_seconds = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self.scores = saved.get("scores", {})
+            self.failure_seconds = saved.get("failure_seconds", {})
+
+    def order(self, key, strategies):
+        """Strategies sorted by learned score; unseen ones rank as 0.5 and ties keep the given order."""
+        if random.random() < self.explore:
+            return list(strategies)
+        scores = self.scores.get(key, {})
+        return sorted(strategies, key=lambda name: -scores.get(name, 0.5))
+
+    def record(self, key, strategy, success, elapsed=None):
+        with self._lock:
+            scores = self.scores.setdefault(key, {})
+            scores[strategy] = self.decay * scores.get(strategy, 0.5) + (1 - self.decay) * (1.0 if success else 0.0)
+            if not success and elapsed is not None:
+                failures = self.failure_seconds.setdefault(key, {})
+                failures[strategy] = self.decay * failures.get(strategy, elapsed) + (1 - self.decay) * elapsed
+
+    def _attempt(self, key, name, fn, succeeded):
+        start = time.perf_counter()
+        result = fn()
+        ok = succeeded(result)
+        self.record(key, name, ok, time.perf_counter() - start)
+        return result, ok
+
+    def run(self, key, attempts, succeeded=bool):
+        """Try (name, fn) attempts in learned order and return the first result that succeeded(),
+        or the last attempt's result when none did."""
+        preference = [name for name, _ in attempts]
+        fns = dict(attempts)
+        ordered = self.order(key, preference)
+        tried = set()
+        result = None
+        for i, name in enumerate(ordered):
+            result, ok = self._attempt(key, name, fns[name], succeeded)
+            tried.add(name)
+            if not ok:
+                continue
+            skipped = [p for p in preference[:preference.index(name)] if p not in tried]
+            if skipped and random.random() < self.verify:
+                for earlier in skipped:
+                    earlier_result, earlier_ok = self._attempt(key, earlier, fns[earlier], succeeded)
+                    if earlier_ok:
+                        # The skip would have changed the output, so it counts against the learned strategy
+                        self.record(key, name, False)
+                        self._count(key, hit=False, mismatch=True)
+                        return earlier_result
+                self._count(key, hit=(i == 0), verified=True)
+                return result
+            self._count(key, hit=(i == 0), skipped=skipped)
+            return result
+        self._count(key, hit=False)
+        return result
+
+    def _count(self, key, hit, skipped=(), verified=False, mismatch=False):
+        with self._lock:
+            stats = self.stats.setdefault(key, {"runs": 0, "hits": 0, "verified": 0, "mismatches": 0,
+                                                "seconds_saved": 0.0, "saved_by": {}})
+            stats["runs"] += 1
+            if hit:
+                stats["hits"] += 1
+            if verified or mismatch:
+                stats["verified"] += 1
+            if mismatch:
+                stats["mismatches"] += 1
+            for strategy in skipped:
+                # What the skipped strategy usually costs when it fails
+                seconds = self.failure_seconds.get(key, {}).get(strategy, 0.0)
+                stats["seconds_saved"] += seconds
+                stats["saved_by"][strategy] = stats["saved_by"].get(strategy, 0.0) + seconds
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"scores": self.scores, "failure_seconds": self.failure_seconds}, f, indent=1)
+
+    def report(self):
+        if not self.stats:
+            return
+        print("Extraction strategy cache:")
+        for key, stats in sorted(self.stats.items()):
+            rate = 100 * stats["hits"] / stats["runs"] if stats["runs"] else 0
+            scores = self.scores.get(key, {})
+            best = max(scores, key=scores.get) if scores else "-"
+            saved = ", ".join(f"{strategy} {seconds:.1f}s" for strategy, seconds in sorted(stats["saved_by"].items()))
+            print(f"  {key}: {stats['runs']} runs, {rate:.0f}% first-try hits, preferred: {best}, "
+                  f"~{stats['seconds_saved']:.1f}s saved by skipping ({saved or 'nothing skipped'}), "
+                  f"{stats['mismatches']}/{stats['verified']} verified skips were wrong")
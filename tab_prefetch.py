@@ -0,0 +1,156 @@
+from collections import deque
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from page_check import check_page, CHALLENGE, ERROR
+from managed_driver import BrowserLost
+
+
+class TabPrefetcher:
+    """Pipelines page loads through extra tabs of one browser.
+
+    pages(items) keeps the next `depth` links loading in background tabs and switches the
+    driver to each page once it is its turn, so navigation overlaps with extraction of the
+    current page at the cost of a few renderer processes instead of whole browsers.
+    `prepare(driver)` runs in every new tab before its page is requested (CDP settings such
+    as resource blocking are per tab). Tabs are closed as soon as their page is done. With a
+    `pacer` (rate_limit.AdaptiveRateLimiter) every tab waits for its slot before loading and
+    reports back once its page is up.
+    """
+
+    def __init__(self, driver, depth=2, prepare=None, load_timeout=30, pacer=None):
+        self.driver = driver
+        self.depth = depth
+        self.prepare = prepare
+        self.load_timeout = load_timeout
+        self.pacer = pacer
+        self.home = driver.current_window_handle
+        self.stats = {"pages": 0, "ready_on_switch": 0}
+
+    def _new_tab(self):
+        before = set(self.driver.window_handles)
+        try:
+            # Opens without stealing focus; chromedriver uses target ids as window handles
+            target = self.driver.execute_cdp_cmd("Target.createTarget", {"url": "about:blank", "background": True})
+            if target["targetId"] in self.driver.window_handles:
+                return target["targetId"]
+        except Exception:
+            self.driver.execute_script("window.open('about:blank', '_blank');")
+        new = [h for h in self.driver.window_handles if h not in before]
+        return new[0]
+
+    def _open(self, url):
+        """Start loading url in a new tab and return to the current one without waiting."""
+        current = self.driver.current_window_handle
+        handle = self._new_tab()
+        self.driver.switch_to.window(handle)
+        if self.prepare:
+            self.prepare(self.driver)
+        if self.pacer is not None:
+            self.pacer.wait(url)
+        self.driver.execute_script("window.location.href = arguments[0];", url)
+        self.driver.switch_to.window(current)
+        return handle
+
+    def _close(self, handle):
+        try:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        except Exception:
+            pass
+        try:
+            self.driver.switch_to.window(self.home)
+        except Exception:
+            # The browser is gone; whoever runs the pipeline finds out and restarts it
+            pass
+
+    def pages(self, items, url=lambda item: item["link"]):
+        """Yield each item with the driver switched to its fully loaded tab."""
+        upcoming = iter(items)
+        loading = deque()
+
+        def refill(limit):
+            while len(loading) < limit:
+                item = next(upcoming, None)
+                if item is None:
+                    return
+                loading.append((item, self._open(url(item))))
+
+        # The first page plus `depth` behind it
+        refill(self.depth + 1)
+        try:
+            while loading:
+                item, handle = loading.popleft()
+                self.driver.switch_to.window(handle)
+                if self.driver.execute_script("return document.readyState") == "complete":
+                    self.stats["ready_on_switch"] += 1
+                else:
+                    try:
+                        WebDriverWait(self.driver, self.load_timeout).until(
+                            lambda d: d.execute_script("return document.readyState") == "complete"
+                        )
+                    except TimeoutException:
+                        print(f"Page still loading after {self.load_timeout}s, extracting anyway: {url(item)}")
+                if self.pacer is not None:
+                    verdict = check_page(self.driver)
+                    self.pacer.record(url(item), ok=verdict != ERROR, challenged=verdict == CHALLENGE)
+                # The next pages start loading while this one is extracted
+                refill(self.depth)
+                self.driver.switch_to.window(handle)
+                self.stats["pages"] += 1
+                yield item
+                self._close(handle)
+        finally:
+            for _, handle in loading:
+                self._close(handle)
+
+    def summary(self):
+        s = self.stats
+        print(f"Tab prefetch: {s['pages']} pages, {s['ready_on_switch']} already loaded when their turn came")
+
+
+def run_prefetched(managed, items, process, depth=2, prepare=None, pacer=None, url=lambda item: item["link"]):
+    """Call process(driver, wait, item) for every item with its page loaded by a TabPrefetcher.
+
+    The browser is the one `managed` (a ManagedDriver) holds, recycled between pages like
+    ManagedDriver.run does. When it dies, whether in process() or while the prefetcher switches
+    tabs, it is restarted and the pipeline resumes with the item in flight; an item that loses
+    the browser more than `managed.retries` times is given up. process() is expected to handle
+    its own errors.
+    """
+    pending = deque(items)
+    stats = {"pages": 0, "ready_on_switch": 0}
+    lost = {}
+    while pending:
+        if managed.driver is None:
+            managed.start()
+        prefetcher = TabPrefetcher(managed.driver, depth, prepare=prepare, pacer=pacer)
+        prefetcher.stats = stats
+        pages = prefetcher.pages(list(pending), url=url)
+        due = None
+        try:
+            for item in pages:
+                process(managed.driver, managed.wait, item)
+                if not managed.healthy():
+                    raise BrowserLost("browser session lost")
+                pending.popleft()
+                due = managed.count_page()
+                if due:
+                    break
+        except Exception as e:
+            pages.close()
+            item = pending[0]
+            lost[url(item)] = lost.get(url(item), 0) + 1
+            print(f"Prefetch pipeline stopped at {url(item)}: {e}")
+            managed.stats.add("restarts")
+            managed.restart("browser session lost" if not managed.healthy() else "prefetch pipeline failed")
+            if lost[url(item)] > managed.retries:
+                print(f"Giving up on {url(item)} after losing the browser {lost[url(item)]} times")
+                pending.popleft()
+            else:
+                managed.stats.add("retries")
+            continue
+        # Closing the generator closes the tabs still loading; their items stay pending
+        pages.close()
+        if due:
+            managed.recycle(due)
+    print(f"Tab prefetch: {stats['pages']} pages, {stats['ready_on_switch']} already loaded when their turn came")
@@ -0,0 +1,36 @@
+import os
+
+from article_html import parse_article_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+URL = "https://emedicine.medscape.com/article/100-overview"
+
+
+def _article():
+    with open(os.path.join(FIXTURES, "article.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_content_skips_ads_and_hidden_blocks():
+    content = parse_article_html(_article(), URL)["content"]
+    assert content.split("\n") == ["Overview", "Cardioversion restores sinus rhythm.", "First step", "First step"]
+
+
+def test_images_are_absolute_and_deduplicated():
+    assert parse_article_html(_article(), URL)["images"] == [
+        "https://img.medscapestatic.com/pi/1.jpg",
+        "https://emedicine.medscape.com/images/2.png",
+    ]
+
+
+def test_references_prefer_the_modal_over_tooltips():
+    references = parse_article_html(_article(), URL)["references"]
+    assert references == [
+        {"citation": "Smith J. Electrical cardioversion. PubMed again", "urls": ["https://pubmed.gov/1"]},
+        {"citation": "Jones A. Outcomes. Link", "urls": ["https://emedicine.medscape.com/ref/2"]},
+    ]
+
+
+def test_tooltips_are_used_without_a_modal():
+    page = _article().replace('id="references-layer"', 'id="other-layer"')
+    assert parse_article_html(page, URL)["references"] == [{"citation": "Tooltip only citation", "urls": []}]
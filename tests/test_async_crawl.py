@@ -0,0 +1,43 @@
+import asyncio
+
+from async_crawl import AsyncCrawler, HttpBackend, collect
+
+
+class _Backend:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def fetch(self, item):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        if item["link"].endswith("bad"):
+            raise ValueError("boom")
+        return item["link"].upper()
+
+
+def test_crawl_without_rate_limit_respects_slots():
+    backend = _Backend()
+    items = [{"link": f"https://example.com/{i}"} for i in range(6)] + [{"link": "https://example.com/bad"}]
+    results = {}
+    crawler = AsyncCrawler(backend, concurrency=2, per_host=3, rate=None)
+    asyncio.run(collect(crawler, items, lambda item, result, error: results.update({item["link"]: result or error})))
+    assert backend.peak == 2
+    assert results["https://example.com/0"] == "HTTPS://EXAMPLE.COM/0"
+    assert isinstance(results["https://example.com/bad"], ValueError)
+
+
+def test_http_backend_fetches_through_the_pacer(fixture_server):
+    from http_fetch import HttpFetcher
+    from rate_limit import AdaptiveRateLimiter
+
+    pacer = AdaptiveRateLimiter(delay=0.01, min_delay=0.001, min_jitter=0)
+    backend = HttpBackend(HttpFetcher(), lambda item, result: result.status, pacer)
+    items = [{"link": f"{fixture_server}/article.html"}, {"link": f"{fixture_server}/missing.html"}]
+    results = {}
+    crawler = AsyncCrawler(backend, concurrency=2, per_host=2, rate=None)
+    asyncio.run(collect(crawler, items, lambda item, result, error: results.update({item["link"]: result})))
+    assert sorted(results.values()) == [200, 404]
+    assert pacer._state(fixture_server).stats["requests"] == 2
@@ -0,0 +1,40 @@
+import json
+
+from calculator_data import CalculatorDataCapture, find_questions, normalize_question, state_from_html
+from page_cache import PageCache
+
+
+def test_cached_page_returns_the_questions_captured_with_it(tmp_path):
+    cache = PageCache(str(tmp_path))
+    captured = [{"question": "Age", "options": [{"label": "<65", "points": 0}, {"label": ">=65", "points": 1}]}]
+    # The rendered page holds no app state; the questions came from an XHR response
+    cache.put("https://example.com/calc", "<html><body>Age</body></html>", extracted={"questions": captured})
+    capture = CalculatorDataCapture()
+    assert capture.from_cached(cache.get("https://example.com/calc")) == captured
+    assert capture.stats["html"] == 1
+
+
+def test_questions_are_found_in_state_assignments_and_json_scripts():
+    state = {"calculator": {"id": 7, "inputs": [
+        {"questionText": "<b>Age</b>", "type": "select", "answers": [{"text": "<65", "score": 0}, {"text": ">=65", "score": 1}]},
+        {"questionText": "Creatinine", "inputType": "number", "units": "mg/dL"},
+    ]}}
+    html = ('<script>window.__INITIAL_STATE__ = ' + json.dumps(state) + ';</script>'
+            '<script type="application/json">{"menu": [{"label": "Home"}, {"label": "News"}]}</script>')
+
+    assert len(state_from_html(html)) == 2
+    questions = CalculatorDataCapture().from_html(html)
+    assert [q["question"] for q in questions] == ["Age", "Creatinine"]
+    assert questions[0]["type"] == "select"
+    assert questions[0]["options"] == [{"label": "<65", "points": 0}, {"label": ">=65", "points": 1}]
+    assert questions[1]["unit"] == "mg/dL" and "options" not in questions[1]
+    assert questions[1]["data"] == state["calculator"]["inputs"][1]
+
+
+def test_option_lists_need_real_questions():
+    assert find_questions({"nav": [{"label": "Home"}, {"label": "News"}]}) is None
+    # A lone numeric input is not a calculator; a lone multiple choice question is
+    assert find_questions({"inputs": [{"text": "Weight", "unit": "kg"}]}) is None
+    question = normalize_question({"text": "Smoker", "options": ["Yes", "No"], "value": True})
+    assert question["options"] == [{"label": "Yes"}, {"label": "No"}]
+    assert find_questions({"q": [{"text": "Smoker", "options": ["Yes", "No"]}]})[0]["question"] == "Smoker"
@@ -0,0 +1,27 @@
+from http_fetch import HttpFetcher
+from rate_limit import AdaptiveRateLimiter
+
+
+def test_fetch_reads_pages_from_a_live_server(fixture_server):
+    fetcher = HttpFetcher()
+    result = fetcher.fetch(f"{fixture_server}/article.html")
+    assert result.status == 200
+    assert "Cardioversion" in result.html
+    assert not result.blocked
+    assert fetcher.stats == {"fetched": 1, "blocked": 0, "errors": 0}
+
+
+def test_missing_pages_are_blocked_but_not_throttling(fixture_server):
+    pacer = AdaptiveRateLimiter(delay=0.01, min_delay=0.001, min_jitter=0)
+    url = f"{fixture_server}/missing.html"
+    result = pacer.fetch(HttpFetcher(), url)
+    assert result.status == 404
+    assert result.blocked
+    # A 404 is the page's problem, not the site asking us to slow down
+    assert pacer.delay(url) < 0.01
+
+
+def test_network_errors_return_none():
+    fetcher = HttpFetcher(timeout=1)
+    assert fetcher.fetch("http://127.0.0.1:1/") is None
+    assert fetcher.stats["errors"] == 1
@@ -0,0 +1,132 @@
+from http_fetch import FetchResult
+import json
+import os
+
+from incremental import ChangeProbe, ValidatorStore, content_hash, keep_previous, load_previous, plan_incremental
+from storage import JsonlWriter, read_jsonl
+
+ARTICLE = """<html><head><title>{title}</title></head><body>
+<div class="refsection_content"><h2>Overview</h2><p>{text}</p></div>
+</body></html>"""
+
+
+class _Fetcher:
+    def __init__(self, pages, headers=None):
+        self.pages = pages
+        self.headers = headers or {}
+        self.requests = []
+
+    def fetch(self, url, headers=None):
+        self.requests.append((url, headers))
+        if url not in self.pages:
+            return None
+        if headers and headers.get("If-None-Match") == self.headers.get("ETag"):
+            return FetchResult(url, 304, "", 0.01, self.headers)
+        return FetchResult(url, 200, self.pages[url], 0.01, self.headers)
+
+
+def _item(n):
+    return {"title": f"Article {n}", "link": f"https://example.test/{n}"}
+
+
+def _page(n, text):
+    return ARTICLE.format(title=f"Article {n}", text=text)
+
+
+def test_content_hash_ignores_whitespace_layout():
+    assert content_hash("Overview\nSome  text") == content_hash("Overview Some text ")
+    assert content_hash("Overview Some text") != content_hash("Overview Other text")
+
+
+def test_plan_splits_new_changed_and_unchanged(tmp_path):
+    store = ValidatorStore(str(tmp_path / "validators.json"))
+    store.set(_item(1)["link"], {"content_hash": content_hash("Overview\nSame text")})
+    store.set(_item(2)["link"], {"content_hash": content_hash("Overview\nOld text")})
+    fetcher = _Fetcher({_item(n)["link"]: _page(n, text) for n, text in
+                        [(1, "Same text"), (2, "New text"), (3, "Brand new")]})
+    previous = {_item(n)["link"]: dict(_item(n), Content="...") for n in (1, 2, 4)}
+
+    to_scrape, reused, report = plan_incremental([_item(1), _item(2), _item(3)], previous,
+                                                 ChangeProbe(fetcher, "Content"), store)
+
+    assert [item["link"] for item in to_scrape] == [_item(2)["link"], _item(3)["link"]]
+    assert reused == [previous[_item(1)["link"]]]
+    assert report == {"new": 1, "changed": 1, "unchanged": 1, "seeded": 0, "removed": 1}
+
+
+def test_conditional_get_answers_unchanged():
+    fetcher = _Fetcher({_item(1)["link"]: _page(1, "text")}, headers={"ETag": '"v1"'})
+    status, _ = ChangeProbe(fetcher, "Content").check(_item(1)["link"], {"etag": '"v1"'})
+    assert status == "unchanged"
+    assert fetcher.requests[0][1] == {"If-None-Match": '"v1"'}
+
+
+def test_first_run_seeds_instead_of_reporting_changes(tmp_path):
+    store = ValidatorStore(str(tmp_path / "validators.json"))
+    fetcher = _Fetcher({_item(1)["link"]: _page(1, "Parsed text"), _item(2)["link"]: _page(2, "Same text")})
+    previous = {_item(1)["link"]: dict(_item(1), Content="Overview\nBrowser text with extras"),
+                _item(2)["link"]: dict(_item(2), Content="Overview\n Same text")}
+
+    to_scrape, reused, report = plan_incremental([_item(1), _item(2)], previous, ChangeProbe(fetcher, "Content"), store)
+
+    assert to_scrape == []
+    assert len(reused) == 2
+    assert (report["seeded"], report["unchanged"], report["changed"]) == (1, 1, 0)
+    # The stored hash is the parsed one, so the next run compares like with like
+    assert store.get(_item(1)["link"])["content_hash"] == content_hash("Overview\nParsed text")
+
+
+def test_validators_of_failed_rescrapes_are_not_stored(tmp_path):
+    path = str(tmp_path / "validators.json")
+    store = ValidatorStore(path)
+    old = {"content_hash": content_hash("Overview\nOld text")}
+    for n in (1, 2):
+        store.set(_item(n)["link"], dict(old))
+    fetcher = _Fetcher({_item(n)["link"]: _page(n, "New text") for n in (1, 2)})
+    previous = {_item(n)["link"]: dict(_item(n), Content="Overview\nOld text") for n in (1, 2)}
+    to_scrape, _, report = plan_incremental([_item(1), _item(2)], previous, ChangeProbe(fetcher, "Content"), store)
+    assert report["changed"] == 2
+
+    jsonl = str(tmp_path / "articles.jsonl")
+    with JsonlWriter(jsonl) as writer:
+        # Article 1 was re-extracted, article 2 failed
+        writer.write(dict(_item(1), Content="Overview\nNew text"))
+        written = {r["link"] for r in read_jsonl(jsonl)}
+        kept = keep_previous(to_scrape, previous, written, writer, report)
+    store.commit(written)
+    store.save(written | kept)
+
+    assert kept == {_item(2)["link"]}
+    assert [r["link"] for r in read_jsonl(jsonl)] == [_item(1)["link"], _item(2)["link"]]
+    reloaded = ValidatorStore(path)
+    assert reloaded.get(_item(1)["link"])["content_hash"] == content_hash("Overview New text")
+    assert reloaded.get(_item(2)["link"]) == old
+
+
+def test_undecidable_pages_are_rescraped_without_staging(tmp_path):
+    store = ValidatorStore(str(tmp_path / "validators.json"))
+    old = {"content_hash": content_hash("Overview\nText")}
+    store.set(_item(1)["link"], dict(old))
+    challenge = "<html><head><title>Just a moment...</title></head><body></body></html>"
+    fetcher = _Fetcher({_item(2)["link"]: challenge})
+    previous = {_item(n)["link"]: dict(_item(n), Content="Overview\nText") for n in (1, 2)}
+
+    to_scrape, reused, report = plan_incremental([_item(1), _item(2)], previous, ChangeProbe(fetcher, "Content"), store)
+
+    assert (len(to_scrape), reused, report["changed"]) == (2, [], 2)
+    assert store.staged == {}
+    assert store.get(_item(1)["link"]) == old
+
+
+def test_load_previous_reads_the_newer_output(tmp_path):
+    json_path, jsonl_path = str(tmp_path / "a.json"), str(tmp_path / "a.jsonl")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump([dict(_item(1), Content="final")], f)
+    assert load_previous(json_path, jsonl_path) == {_item(1)["link"]: dict(_item(1), Content="final")}
+
+    # A run that crashed before finalizing left a newer JSONL stream
+    with JsonlWriter(jsonl_path) as writer:
+        writer.write(dict(_item(1), Content="streamed"))
+        writer.write({"title": "no link"})
+    os.utime(json_path, (0, 0))
+    assert load_previous(json_path, jsonl_path) == {_item(1)["link"]: dict(_item(1), Content="streamed")}
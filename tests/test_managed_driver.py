@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from driver_calls import skip_page_count
+from managed_driver import BrowserLost, ManagedDriver
+
+
+class _Driver:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("session gone")
+        return "complete"
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _managed(launched, **kwargs):
+    def launch():
+        driver = _Driver()
+        launched.append(driver)
+        return driver
+    return ManagedDriver(launch, max_rss_mb=0, pass_wait=False, **kwargs)
+
+
+def test_recycles_after_max_pages_but_not_on_cache_hits():
+    launched = []
+    managed = _managed(launched, max_pages=2)
+
+    def cached(driver):
+        skip_page_count()
+        return "cached"
+
+    for _ in range(5):
+        assert managed.run(cached) == "cached"
+    assert len(launched) == 1
+    managed.run(lambda driver: "live")
+    managed.run(lambda driver: "live")
+    assert len(launched) == 2
+    assert managed.stats.metrics()["recycled_pages"] == 1
+
+
+def test_raises_once_every_attempt_lost_the_browser():
+    launched = []
+    managed = _managed(launched, retries=1)
+
+    def crash(driver):
+        driver.alive = False
+        return None
+
+    with pytest.raises(BrowserLost):
+        managed.run(crash)
+    assert managed.stats.metrics()["restarts"] == 2
+
+
+def test_retries_on_a_fresh_browser():
+    launched = []
+    managed = _managed(launched, retries=1)
+
+    def crash_first(driver):
+        if len(launched) == 1:
+            driver.alive = False
+        return "ok"
+
+    assert managed.run(crash_first) == "ok"
+    assert managed.stats.metrics()["retries"] == 1
@@ -0,0 +1,127 @@
+import os
+
+from page_cache import PageCache, canonical_url
+
+
+def _blobs(cache):
+    return os.listdir(os.path.join(cache.directory, "blobs"))
+
+
+def test_canonical_url_drops_tracking_and_fragment():
+    assert canonical_url("HTTPS://Example.com/a/?utm_source=x&b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+
+
+def test_round_trip_and_ttl(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=3600)
+    cache.put("https://example.com/a", "<html>a</html>", headers={"ETag": '"v1"'})
+    page = cache.get("https://example.com/a?utm_medium=mail")
+    assert page.html == "<html>a</html>"
+    assert page.meta["etag"] == '"v1"'
+    cache.ttl = -1
+    assert cache.get("https://example.com/a") is None
+
+
+def test_restoring_a_url_releases_its_old_blob(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=3000)
+    for i in range(5):
+        cache.put("https://example.com/a", f"<html>{i}</html>" + "x" * 800)
+    assert len(_blobs(cache)) == 1
+    assert cache.stats["evictions"] == 0
+    assert cache.get("https://example.com/a").html.startswith("<html>4</html>")
+    assert cache._total_bytes == os.path.getsize(os.path.join(cache.directory, "blobs", _blobs(cache)[0]))
+
+
+def test_shared_blob_survives_until_its_last_entry_goes(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.com/a", "same")
+    cache.put("https://example.com/b", "same")
+    cache.put("https://example.com/a", "changed")
+    assert cache.get("https://example.com/b").html == "same"
+    assert len(_blobs(cache)) == 2
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=2500)
+    cache.put("https://example.com/old", "o" * 1000)
+    cache.put("https://example.com/new", "n" * 1000)
+    cache.put("https://example.com/newest", "w" * 1000)
+    assert cache.get("https://example.com/old") is None
+    assert cache.get("https://example.com/newest") is not None
+    assert cache._total_bytes <= 2500
+
+
+def test_orphan_blobs_are_cleaned_on_open(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.com/a", "kept")
+    with open(os.path.join(cache.directory, "blobs", "0" * 64 + ".html"), "w") as f:
+        f.write("orphan")
+    reopened = PageCache(str(tmp_path))
+    assert len(_blobs(reopened)) == 1
+    assert reopened._total_bytes == len("kept")
+
+
+class _Driver:
+    def __init__(self, html):
+        self.page_source = html
+
+
+def test_remember_page_skips_challenge_pages(tmp_path):
+    from page_cache import remember_page
+    cache = PageCache(str(tmp_path))
+    challenge = "<html><head><title>Just a moment...</title></head><body>" + "x" * 6000 + "</body></html>"
+    remember_page(_Driver(challenge), cache, "https://example.com/a")
+    assert cache.get("https://example.com/a") is None
+    article = "<html><head><title>Appendicitis</title></head><body>" + "x" * 6000 + "</body></html>"
+    remember_page(_Driver(article), cache, "https://example.com/a")
+    assert cache.get("https://example.com/a") is not None
+
+
+class _BrowsingDriver:
+    """Navigates to canned pages and answers the page_check fingerprint script."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.url = None
+        self.html = ""
+
+    def get(self, url):
+        self.url = url
+        self.html = self.pages.get(url, "")
+
+    def execute_script(self, script, *args):
+        if args:
+            self.html = args[0]
+            return None
+        title = self.html.split("<title>")[1].split("</title>")[0] if "<title>" in self.html else ""
+        return {"title": title, "url": self.url, "size": len(self.html), "head": self.html[:20000]}
+
+
+def test_open_cached_returns_the_verdict_of_the_loaded_page(tmp_path):
+    from page_cache import open_cached
+    from page_check import CHALLENGE, OK
+    challenge = "<html><head><title>Just a moment...</title></head><body>" + "x" * 6000 + "</body></html>"
+    article = "<html><head><title>Appendicitis</title></head><body>" + "x" * 6000 + "</body></html>"
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.com/b", article)
+    driver = _BrowsingDriver({"https://example.com/a": challenge})
+    assert open_cached(driver, cache, "https://example.com/a") == (False, CHALLENGE)
+    assert open_cached(driver, cache, "https://example.com/b") == (True, OK)
+    assert "Appendicitis" in driver.html
+
+
+def test_extracted_data_is_kept_with_the_entry(tmp_path):
+    cache = PageCache(str(tmp_path))
+    questions = [{"question": "Age", "options": [{"label": "<65", "points": 0}]}]
+    cache.put("https://example.com/calc", "<html>rendered</html>", extracted={"questions": questions})
+    assert PageCache(str(tmp_path)).get("https://example.com/calc").meta["extracted"] == {"questions": questions}
+
+
+def test_snapshot_drops_executable_scripts_but_keeps_json_data():
+    from page_cache import render_snapshot
+    driver = _BrowsingDriver({})
+    html = ('<html><head><script src="/app.js"></script><script>window.x = 1;</script>'
+            '<script type="application/json" id="deck">{"slides": []}</script></head><body>deck</body></html>')
+    render_snapshot(driver, "https://example.com/deck", html)
+    assert "app.js" not in driver.html and "window.x" not in driver.html
+    assert '<script type="application/json" id="deck">{"slides": []}</script>' in driver.html
+    assert '<base href="https://example.com/deck">' in driver.html
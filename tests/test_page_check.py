@@ -0,0 +1,52 @@
+from http_fetch import FetchResult
+from page_check import CHALLENGE, OK, RetryQueue, check_html
+
+PADDING = "x" * 6000
+
+
+def test_check_html_classifies_pages():
+    assert check_html(f"<html><title>Appendicitis</title>{PADDING}</html>", "https://example.com/a") == OK
+    assert check_html(f"<html><title>Just a moment...</title>{PADDING}</html>", "https://example.com/a") == CHALLENGE
+
+
+def test_retry_queue_gives_up_after_max_attempts_rejections():
+    queue = RetryQueue(base_delay=0, max_attempts=3)
+    item = {"link": "https://example.com/a", "title": "A"}
+    assert queue.push(item, CHALLENGE)
+    assert queue.push(item, CHALLENGE)
+    assert not queue.push(item, CHALLENGE)
+    assert queue.gave_up == [(item, CHALLENGE)]
+    assert [attempts for _, attempts in queue.drain()] == [1, 2]
+
+
+def test_retry_queue_drains_items_pushed_back_while_draining():
+    queue = RetryQueue(base_delay=0, max_attempts=2)
+    item = {"link": "https://example.com/a"}
+    queue.push(item, CHALLENGE)
+    seen = []
+    for pending, attempts in queue.drain():
+        seen.append(attempts)
+        queue.push(pending, CHALLENGE)
+    assert seen == [1]
+    assert len(queue.gave_up) == 1
+    assert queue.stats == {CHALLENGE: 2}
+
+
+def test_challenge_words_in_an_ordinary_page_are_not_a_challenge():
+    # Cloudflare injects this script into normal pages; the article may quote an error message
+    page = ("<html><head><title>Appendicitis</title>"
+            "<script src='/cdn-cgi/challenge-platform/scripts/jsd/main.js'></script></head>"
+            f"<body><p>The portal showed 'Access Denied' to the resident.</p>{PADDING}</body></html>")
+    assert check_html(page, "https://example.com/a") == OK
+    assert not FetchResult("https://example.com/a", 200, page, 0.1).blocked
+
+
+def test_challenge_structure_is_recognised_without_a_challenge_title():
+    page = (f"<html><head><title>example.com</title></head><body>"
+            f"<form id=\"challenge-form\" action=\"/?__cf_chl_f_tk=x\" method=\"POST\"></form>{PADDING}</body></html>")
+    assert check_html(page, "https://example.com/a") == CHALLENGE
+    assert FetchResult("https://example.com/a", 200, page, 0.1).blocked
+    datadome = (f"<html><head><title>example.com</title></head><body>"
+                f"<iframe src=\"https://geo.captcha-delivery.com/captcha/?initialCid=x\"></iframe>{PADDING}</body></html>")
+    assert check_html(datadome, "https://example.com/a") == CHALLENGE
+    assert check_html(f"<html><title>Access Denied</title>{PADDING}</html>", "https://example.com/a") == CHALLENGE
@@ -0,0 +1,43 @@
+from rate_limit import AdaptiveRateLimiter
+
+URL = "https://example.com/page"
+
+
+def _pacer():
+    return AdaptiveRateLimiter(delay=4.0, min_delay=0.5, min_jitter=0)
+
+
+def test_clean_responses_speed_up_to_the_floor():
+    pacer = _pacer()
+    for _ in range(50):
+        pacer.record(URL, 1.0)
+    assert pacer.delay(URL) == 0.5
+
+
+def test_errors_and_challenges_back_off():
+    pacer = _pacer()
+    pacer.record(URL, ok=False)
+    assert pacer.delay(URL) == 8.0
+    pacer.record(URL, challenged=True)
+    assert pacer.delay(URL) == 32.0
+    pacer.record(URL, status=429)
+    assert pacer.delay(URL) == 64.0
+
+
+def test_each_channel_is_judged_against_its_own_latency():
+    pacer = _pacer()
+    pacer.record(URL, 0.1, channel="http")
+    pacer.record(URL, 3.0, channel="browser")
+    delay = pacer.delay(URL)
+    # A browser load is far slower than an HTTP fetch, but not slower than other browser loads
+    pacer.record(URL, 3.2, channel="browser")
+    assert pacer.delay(URL) < delay
+    delay = pacer.delay(URL)
+    pacer.record(URL, 1.0, channel="http")
+    assert pacer.delay(URL) == delay * 1.5
+
+
+def test_wait_reserves_the_next_slot():
+    pacer = AdaptiveRateLimiter(delay=0.05, min_jitter=0)
+    assert pacer.wait(URL) == 0.0
+    assert pacer.wait(URL) > 0.0
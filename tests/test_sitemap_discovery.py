@@ -0,0 +1,81 @@
+import os
+
+from http_fetch import HttpFetcher
+from rate_limit import AdaptiveRateLimiter
+from sitemap_discovery import discover_links, index_links, index_outline, iter_sitemap
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SITEMAPS = os.path.join(FIXTURES, "sitemaps")
+PROCEDURES = "https://emedicine.medscape.com/clinical_procedures"
+OVERVIEW = r"^https?://emedicine\.medscape\.com/article/\d+-overview$"
+BASE = "https://reference.medscape.com/guide/medical-calculators"
+CALCULATOR = r"^https?://reference\.medscape\.com/calculator/"
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_index_links_reads_only_the_category_blocks():
+    records = index_links(_fixture("calculator_index.html"), BASE, CALCULATOR)
+    assert [(r["category"], r["subcategory"], r["title"]) for r in records] == [
+        ("Cardiology", "", "CHADS2"),
+        ("Cardiology", "", "HAS-BLED"),
+        ("Cardiology", "Heart Failure", "NYHA Class"),
+        ("Nephrology", "", "eGFR"),
+    ]
+    assert records[0]["link"] == "https://reference.medscape.com/calculator/1/chads2"
+
+
+def test_index_links_without_pattern_keeps_non_calculator_list_entries():
+    titles = [r["title"] for r in index_links(_fixture("calculator_index.html"), BASE)]
+    assert "News about kidneys" in titles
+    assert "Featured calculator" not in titles
+    assert "About" not in titles
+
+
+def test_index_outline_is_keyed_on_canonical_url():
+    outline = index_outline(_fixture("calculator_index.html"), BASE)
+    assert outline["https://reference.medscape.com/calculator/2/has-bled"] == ("Cardiology", "", "HAS-BLED")
+
+
+def test_iter_sitemap_reads_urlsets_and_follows_indexes_into_gzipped_files():
+    entries = list(iter_sitemap(os.path.join(SITEMAPS, "index.xml")))
+    locs = [loc for loc, _ in entries]
+    assert locs[:2] == ["https://emedicine.medscape.com/article/100-overview",
+                        "https://emedicine.medscape.com/article/100-treatment"]
+    assert "https://emedicine.medscape.com/article/400-overview" in locs
+    assert "https://img.medscapestatic.com/pi/1.jpg" in locs
+    assert dict(entries)["https://emedicine.medscape.com/article/200-overview"] == "2026-01-03"
+
+
+def test_iter_sitemap_follow_limits_the_child_sitemaps():
+    locs = [loc for loc, _ in iter_sitemap(os.path.join(SITEMAPS, "index.xml"), follow=r"articles")]
+    assert len(locs) == 6
+    assert not any("img." in loc for loc in locs)
+
+
+def test_discover_links_maps_sitemap_urls_to_index_categories():
+    outline = index_outline(_fixture("procedures_index.html"), PROCEDURES)
+    records = discover_links([os.path.join(SITEMAPS, "index.xml")], OVERVIEW, outline)
+    # Index order, each URL once, only the ones on the index
+    assert [(r["category"], r["title"]) for r in records] == [("Cardiology", "Pericardiocentesis"),
+                                                             ("Cardiology", "Cardioversion")]
+
+
+def test_discover_links_can_keep_urls_missing_from_the_index():
+    outline = index_outline(_fixture("procedures_index.html"), PROCEDURES)
+    records = discover_links([os.path.join(SITEMAPS, "index.xml")], OVERVIEW, outline, include_unmapped=True)
+    unmapped = [r for r in records if not r["category"]]
+    assert [r["link"] for r in unmapped] == ["https://emedicine.medscape.com/article/300-overview",
+                                             "https://emedicine.medscape.com/article/400-overview"]
+    assert unmapped[0]["title"] == "Overview"
+
+
+def test_iter_sitemap_over_http(fixture_server):
+    pacer = AdaptiveRateLimiter(delay=0.01, min_jitter=0)
+    locs = [loc for loc, _ in iter_sitemap(f"{fixture_server}/sitemaps/index.xml", HttpFetcher(), pacer,
+                                           follow=r"articles")]
+    assert len(locs) == 6
+    assert "https://emedicine.medscape.com/article/300-overview" in locs
@@ -0,0 +1,36 @@
+from slide_deck import slides_from_payload
+
+
+def _slide(n, **extra):
+    slide = {"title": f"Slide {n}", "body": f"<p>Copy of   slide {n}</p>", "imageUrl": f"https://img.test/{n}.jpg"}
+    slide.update(extra)
+    return slide
+
+
+def test_reads_the_slide_list_out_of_nested_page_data():
+    data = {"props": {"pageProps": {"slideshow": {"slides": [_slide(1), _slide(2), _slide(3)]}}}}
+    assert slides_from_payload(data) == [
+        {"heading": f"Slide {n}", "image_url": f"https://img.test/{n}.jpg", "caption": "", "text": f"Copy of slide {n}"}
+        for n in (1, 2, 3)
+    ]
+
+
+def test_nested_image_objects_give_url_and_caption():
+    slides = [{"headline": f"Slide {n}", "description": "Text",
+               "image": {"url": f"https://img.test/{n}.png?w=800", "credit": "Photo: Lab"}} for n in (1, 2)]
+    assert slides_from_payload({"slides": slides})[1] == {
+        "heading": "Slide 2", "image_url": "https://img.test/2.png?w=800", "caption": "Photo: Lab", "text": "Text"}
+
+
+def test_related_teasers_are_not_taken_for_the_deck():
+    teasers = [{"title": f"Related {n}", "image": f"https://img.test/t{n}.jpg", "url": f"/show/{n}"} for n in range(6)]
+    assert slides_from_payload({"related": teasers}) is None
+    # The real deck wins even when the teaser list is longer
+    deck = slides_from_payload({"related": teasers, "slides": [_slide(1), _slide(2)]})
+    assert [s["heading"] for s in deck] == ["Slide 1", "Slide 2"]
+
+
+def test_non_image_urls_are_not_slide_images():
+    slides = slides_from_payload({"slides": [_slide(1), _slide(2), _slide(3, imageUrl="https://example.test/next")]})
+    assert [s["image_url"] for s in slides][2] == ""
+    assert slides_from_payload({"slides": [_slide(1)]}) is None
@@ -0,0 +1,45 @@
+import csv
+import json
+
+from storage import JsonlWriter, finalize_outputs, read_jsonl
+
+RECORDS = [
+    {"title": "Heart", "link": "https://example.test/heart", "Content": "Chambers", "Images": ["a.jpg", "b.jpg"],
+     "References": [{"citation": "Smith 2020", "urls": ["https://doi.test/1", "https://pubmed.test/1"]},
+                    {"citation": "Jones 2021", "urls": ["https://doi.test/1"]}]},
+    {"title": "Lung – lobes", "link": "https://example.test/lung", "Content": "Lobes"},
+]
+
+
+def test_jsonl_round_trip_and_append(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with JsonlWriter(path) as writer:
+        writer.write(RECORDS[0])
+    with JsonlWriter(path, append=True) as writer:
+        writer.write(RECORDS[1])
+        assert writer.count == 1
+    assert list(read_jsonl(path)) == RECORDS
+
+
+def test_read_skips_a_truncated_last_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(json.dumps(RECORDS[0]) + "\n\n" + '{"title": "Lu', encoding="utf-8")
+    assert list(read_jsonl(str(path))) == [RECORDS[0]]
+    assert list(read_jsonl(str(tmp_path / "missing.jsonl"))) == []
+
+
+def test_finalize_writes_json_and_flattened_csv(tmp_path):
+    jsonl, json_path, csv_path = (str(tmp_path / name) for name in ("a.jsonl", "a.json", "a.csv"))
+    with JsonlWriter(jsonl) as writer:
+        for record in RECORDS:
+            writer.write(record)
+
+    assert finalize_outputs(jsonl, json_path, csv_path, "Content") == RECORDS
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f) == RECORDS
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0] == {"title": "Heart", "link": "https://example.test/heart", "Content": "Chambers",
+                       "Images": "a.jpg ; b.jpg", "References": "Smith 2020 || Jones 2021",
+                       "ReferenceURLs": "https://doi.test/1 ; https://pubmed.test/1"}
+    assert (rows[1]["title"], rows[1]["Images"], rows[1]["References"]) == ("Lung – lobes", "", "")
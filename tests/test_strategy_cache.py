@@ -0,0 +1,83 @@
+import random
+
+from strategy_cache import StrategyCache
+
+
+def _attempt(calls, name, result):
+    def fn():
+        calls.append(name)
+        return result
+    return fn
+
+
+def test_learned_first_success_skips_the_earlier_strategies():
+    cache = StrategyCache(explore=0, verify=0)
+    calls = []
+    for _ in range(5):
+        cache.run("refs", [("modal", _attempt(calls, "modal", [])), ("tooltips", _attempt(calls, "tooltips", ["t"]))])
+    assert cache.order("refs", ["modal", "tooltips"]) == ["tooltips", "modal"]
+    calls.clear()
+    assert cache.run("refs", [("modal", _attempt(calls, "modal", [])),
+                              ("tooltips", _attempt(calls, "tooltips", ["t"]))]) == ["t"]
+    assert calls == ["tooltips"]
+
+
+def test_learned_first_failure_falls_back():
+    cache = StrategyCache(explore=0, verify=0)
+    cache.scores["refs"] = {"modal": 0.1, "tooltips": 0.9}
+    calls = []
+    assert cache.run("refs", [("modal", _attempt(calls, "modal", ["m"])),
+                              ("tooltips", _attempt(calls, "tooltips", []))]) == ["m"]
+    assert calls == ["tooltips", "modal"]
+
+
+def test_verified_skip_returns_the_preferred_result_and_learns():
+    cache = StrategyCache(explore=0, verify=1)
+    cache.scores["refs"] = {"modal": 0.4, "tooltips": 0.6}
+    calls = []
+    assert cache.run("refs", [("modal", _attempt(calls, "modal", ["m"])),
+                              ("tooltips", _attempt(calls, "tooltips", ["t"]))]) == ["m"]
+    assert calls == ["tooltips", "modal"]
+    assert cache.stats["refs"]["mismatches"] == 1
+    # Counted as a failure on top of its own success: 0.6 -> 0.68 -> 0.544
+    assert round(cache.scores["refs"]["tooltips"], 3) == 0.544
+
+
+def test_time_saved_counts_what_skipped_strategies_cost_when_failing():
+    cache = StrategyCache(explore=0, verify=0)
+    cache.scores["refs"] = {"modal": 0.1, "tooltips": 0.9}
+    cache.failure_seconds["refs"] = {"modal": 20.0}
+    for _ in range(3):
+        cache.run("refs", [("modal", lambda: []), ("tooltips", lambda: ["t"])])
+    assert cache.stats["refs"]["seconds_saved"] == 60.0
+    assert cache.stats["refs"]["saved_by"] == {"modal": 60.0}
+    assert cache.stats["refs"]["hits"] == 3
+
+
+def test_first_choice_success_skips_the_rest():
+    cache = StrategyCache(explore=0)
+    calls = []
+    assert cache.run("k", [("a", _attempt(calls, "a", "A")), ("b", _attempt(calls, "b", "B"))]) == "A"
+    assert calls == ["a"]
+
+
+def test_no_success_returns_last_result():
+    cache = StrategyCache(explore=0)
+    assert cache.run("k", [("a", lambda: None), ("b", lambda: [])]) == []
+
+
+def test_exploration_uses_the_given_order():
+    random.seed(1)
+    cache = StrategyCache(explore=1, verify=0)
+    cache.scores["k"] = {"a": 0.1, "b": 0.9}
+    assert cache.run("k", [("a", lambda: "A"), ("b", lambda: "B")]) == "A"
+
+
+def test_scores_and_failure_costs_persist(tmp_path):
+    path = tmp_path / "strategies.json"
+    cache = StrategyCache(explore=0, path=str(path))
+    cache.run("k", [("a", lambda: None), ("b", lambda: "B")])
+    cache.save()
+    reloaded = StrategyCache(path=str(path))
+    assert reloaded.scores == cache.scores
+    assert set(reloaded.failure_seconds["k"]) == {"a"}
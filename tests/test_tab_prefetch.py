@@ -0,0 +1,115 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from managed_driver import ManagedDriver
+from tab_prefetch import run_prefetched
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver._check()
+        self.driver.current_window_handle = handle
+
+
+class _TabbedDriver:
+    """Just enough of a WebDriver for TabPrefetcher: tabs, navigation by script, readyState."""
+
+    def __init__(self):
+        self.alive = True
+        self.tabs = {"home": None}
+        self.current_window_handle = "home"
+        self.switch_to = _SwitchTo(self)
+        self._next = 0
+
+    def _check(self):
+        if not self.alive:
+            raise RuntimeError("session gone")
+
+    @property
+    def window_handles(self):
+        self._check()
+        return list(self.tabs)
+
+    def execute_cdp_cmd(self, cmd, params):
+        self._check()
+        if cmd == "Target.createTarget":
+            self._next += 1
+            handle = f"tab{self._next}"
+            self.tabs[handle] = None
+            return {"targetId": handle}
+        return {}
+
+    def execute_script(self, script, *args):
+        self._check()
+        if args:
+            self.tabs[self.current_window_handle] = args[0]
+        return "complete"
+
+    def close(self):
+        self._check()
+        del self.tabs[self.current_window_handle]
+
+    def quit(self):
+        self.alive = False
+
+
+def _managed(launched, **kwargs):
+    def launch():
+        driver = _TabbedDriver()
+        launched.append(driver)
+        return driver
+    return ManagedDriver(launch, max_rss_mb=0, **kwargs)
+
+
+def _items(n):
+    return [{"link": f"https://example.test/{i}"} for i in range(n)]
+
+
+def test_processes_every_item_on_its_own_loaded_tab():
+    launched = []
+    seen = []
+    run_prefetched(_managed(launched), _items(4),
+                   lambda driver, wait, item: seen.append(driver.tabs[driver.current_window_handle]), depth=2)
+    assert seen == [item["link"] for item in _items(4)]
+    assert len(launched) == 1
+
+
+def test_a_crash_restarts_the_browser_and_requeues_the_rest():
+    launched = []
+    seen = []
+
+    def process(driver, wait, item):
+        if item["link"].endswith("/1") and len(launched) == 1:
+            driver.alive = False
+            return
+        seen.append(item["link"])
+
+    managed = _managed(launched)
+    run_prefetched(managed, _items(4), process, depth=2)
+    assert seen == [item["link"] for item in _items(4)]
+    assert len(launched) == 2
+    assert managed.stats.metrics()["restarts"] == 1
+
+
+def test_an_item_that_keeps_crashing_is_given_up():
+    launched = []
+    seen = []
+
+    def process(driver, wait, item):
+        if item["link"].endswith("/1"):
+            driver.alive = False
+            return
+        seen.append(item["link"])
+
+    run_prefetched(_managed(launched, retries=1), _items(3), process, depth=1)
+    assert seen == ["https://example.test/0", "https://example.test/2"]
+
+
+def test_recycles_between_pages():
+    launched = []
+    run_prefetched(_managed(launched, max_pages=2), _items(5), lambda driver, wait, item: None, depth=2)
+    assert len(launched) == 3
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from worker_pool import run_worker_pool
+
+
+class _Driver:
+    def execute_script(self, script):
+        return "complete"
+
+    def quit(self):
+        pass
+
+
+def test_results_reach_the_collector_for_every_item():
+    collected = {}
+    items = [{"title": str(i), "n": i} for i in range(5)]
+    run_worker_pool(items, _Driver, lambda driver, wait, item: item["n"] * 10,
+                    lambda idx, item, record: collected.update({idx: record}), workers=2, max_rss_mb=0)
+    assert collected == {i: i * 10 for i in range(5)}
+
+
+def test_raises_when_no_worker_can_start():
+    def launch():
+        raise RuntimeError("chrome not found")
+
+    with pytest.raises(RuntimeError, match="3 of 3 items unprocessed"):
+        run_worker_pool([{"title": "a"}, {"title": "b"}, {"title": "c"}], launch,
+                        lambda driver, wait, item: item, lambda idx, item, record: None, workers=2)
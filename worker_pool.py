@@ -0,0 +1,71 @@
+import queue
+import threading
+import traceback
+from managed_driver import ManagedDriver, DEFAULT_MAX_PAGES, DEFAULT_MAX_RSS_MB
+
+_WORKER_DONE = object()
+
+
+def run_worker_pool(items, create_driver, process_item, on_result, workers=2, setup=None, wait_timeout=20,
+                    max_pages=DEFAULT_MAX_PAGES, max_rss_mb=DEFAULT_MAX_RSS_MB, stats=None):
+    """Process items with N independent browsers.
+
+    Every worker owns its own driver and pulls (index, item) pairs from a shared queue.
+    process_item(driver, wait, item) returns the record for an item (or None to drop it);
+    records are handed to on_result(index, item, record) on the calling thread only,
+    so the collector never needs its own locking. Each worker's browser is a ManagedDriver,
+    recycled after max_pages items or past max_rss_mb and restarted (then `setup` again) on a crash.
+    Raises RuntimeError once every worker has stopped with items still queued (e.g. no browser
+    could be started), after the records that were finished have been handed to on_result.
+    """
+    if not items:
+        return
+    tasks = queue.Queue()
+    for idx, item in enumerate(items):
+        tasks.put((idx, item))
+    results = queue.Queue()
+
+    def worker(worker_id):
+        managed = ManagedDriver(create_driver, setup=setup, max_pages=max_pages, max_rss_mb=max_rss_mb,
+                                wait_timeout=wait_timeout, stats=stats)
+        try:
+            managed.start()
+            while True:
+                try:
+                    idx, item = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                print(f"[worker {worker_id}] Processing {idx + 1}/{len(items)}: {item.get('title', '')}")
+                try:
+                    record = managed.run(process_item, item)
+                except Exception as e:
+                    print(f"[worker {worker_id}] Error processing {item.get('link', '')}: {e}")
+                    print(f"Stack trace: {traceback.format_exc()}")
+                    record = None
+                results.put((idx, item, record))
+        except Exception as e:
+            print(f"[worker {worker_id}] Worker stopped: {e}")
+        finally:
+            managed.quit()
+            results.put(_WORKER_DONE)
+
+    workers = max(1, min(workers, len(items)))
+    threads = [threading.Thread(target=worker, args=(i + 1,), daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    finished = 0
+    while finished < len(threads):
+        msg = results.get()
+        if msg is _WORKER_DONE:
+            finished += 1
+            continue
+        idx, item, record = msg
+        if record is not None:
+            on_result(idx, item, record)
+
+    for t in threads:
+        t.join()
+
+    if not tasks.empty():
+        raise RuntimeError(f"All {workers} workers stopped with {tasks.qsize()} of {len(items)} items unprocessed")